@@ -0,0 +1,54 @@
+"""
+Benchmark of the path search engines (see lib/Map/PathFinder.py).
+
+Runs the same random building to building queries with every engine, compares the routes with the original engine
+and prints the time per query. "heap" must give identical routes, "graph" stops at the shortest path so its routes
+can only be shorter.
+
+Usage:
+    python benchmark/pathfinding.py [OSM file] [number of queries] [seed]
+"""
+import sys
+import os
+import time
+import random
+# adds the root of the git dir to the import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lib.Map.Map as mmap
+from lib.Map.PathFinder import ENGINES
+
+def route(result):
+    # the length is summed from the vectors, searchPath reports the distance 1 m short (the origin starts with g = -1)
+    distance, sequence = result
+    if sequence is None:
+        return None, None
+    return sum(vector.distance for vector in sequence.sequence), [vector.extract() for vector in sequence.sequence]
+
+def main():
+    osmFile = sys.argv[1] if len(sys.argv) > 1 else "osmData/sumidaku.osm"
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    osmMap = mmap.readFile(osmFile, "", (10,10))
+    print(osmMap)
+    buildings = [building for building in osmMap.buildings if building.node is not None]
+    rng = random.Random(seed)
+    pairs = [(rng.choice(buildings).node, rng.choice(buildings).node) for i in range(queries)]
+
+    results = {}
+    for name, engine in ENGINES.items():
+        start = time.perf_counter()
+        results[name] = [route(engine(osmMap, origin, destination)) for origin, destination in pairs]
+        elapsed = time.perf_counter() - start
+        print(f"{name:>6} : {elapsed:8.3f} s total, {elapsed / queries * 1000:8.3f} ms per query")
+        results[name + "_time"] = elapsed
+
+    reference = results["list"]
+    for name in ENGINES:
+        mismatches = sum(1 for a, b in zip(reference, results[name]) if a[1] != b[1])
+        found = [(a[0], b[0]) for a, b in zip(reference, results[name]) if a[1] is not None and b[1] is not None]
+        ratio = sum(b for a, b in found) / sum(a for a, b in found) if len(found) > 0 else 1.0
+        print(f"{name:>6} : {mismatches} routes differ from list, total distance x{ratio:.4f}, speedup x{results['list_time'] / results[name + '_time']:.1f}")
+
+if __name__ == "__main__":
+    main()
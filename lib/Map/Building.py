@@ -10,23 +10,41 @@ class Building:
         - coordinate : the coordinate of the building's centroid
     """
     idCounter = itertools.count().__next__
-    def __init__(self, way):
+    @classmethod
+    def reserveIds(cls, lastId):
+        """
+        [Method] reserveIds
+        Make sure the ids generated from now on are greater than an id already in use, for example by restored buildings
+
+        Parameter:
+            - lastId: [int] the greatest id in use
+        """
+        nextId = cls.idCounter()
+        cls.idCounter = itertools.count(max(nextId, lastId + 1)).__next__
+
+    def __init__(self, way, buildingId = None, coordinate = None):
         """
         [Constructor]
         Initialize the building building
 
         Parameter:
             - way: [Way] the building outline from Open Street Map
+            - buildingId: [int] id of the building (a new id is generated if None)
+            - coordinate: [Coordinate] precalculated centroid (calculated from the outline if None)
         """
-        self.buildingId = self.idCounter()
+        if buildingId is None:
+            buildingId = self.idCounter()
+        self.buildingId = buildingId
         self.way = way
-        lat,lon = 0,0
-        for node in way.nodes[:-1]:
-            lat += node.coordinate.lat
-            lon += node.coordinate.lon
-        lat = lat/(way.nodes.__len__()-1)
-        lon = lon/(way.nodes.__len__()-1)
-        self.coordinate = Coordinate(lat,lon)
+        if coordinate is None:
+            lat,lon = 0,0
+            for node in way.nodes[:-1]:
+                lat += node.coordinate.lat
+                lon += node.coordinate.lon
+            lat = lat/(way.nodes.__len__()-1)
+            lon = lon/(way.nodes.__len__()-1)
+            coordinate = Coordinate(lat,lon)
+        self.coordinate = coordinate
         self.closestRoad = None
         self.entryPoint = None
         self.entryPointNode = None
@@ -0,0 +1,84 @@
+class ClipArea():
+    """
+    [Class] ClipArea
+    Area used to clip the map while the OSM file is read: nodes outside of the area are not loaded, and ways without loaded nodes are dropped.
+    The area is a bounding box, a polygon, or both (a point must be inside both).
+    
+    Properties:
+        - bbox    : (float,float,float,float) (min lat, min lon, max lat, max lon) of the area
+        - polygon : [array] list of (lat,lon) vertices of the polygon, None for a plain bounding box
+    """
+    def __init__(self, bbox = None, polygon = None):
+        """
+        [Constructor]
+        Initialize the clip area
+        
+        Parameter:
+            - bbox    : (float,float,float,float) (min lat, min lon, max lat, max lon)
+            - polygon : [array] list of (lat,lon) vertices, the polygon is closed automatically
+        """
+        if bbox is None and polygon is None:
+            raise ValueError("a clip area needs a bounding box or a polygon")
+        self.polygon = None
+        if polygon is not None:
+            self.polygon = [(float(lat), float(lon)) for lat, lon in polygon]
+            if len(self.polygon) > 1 and self.polygon[0] == self.polygon[-1]:
+                self.polygon.pop()
+            if len(self.polygon) < 3:
+                raise ValueError("a clip polygon needs at least 3 vertices")
+            lats = [lat for lat, lon in self.polygon]
+            lons = [lon for lat, lon in self.polygon]
+            polygonBox = (min(lats), min(lons), max(lats), max(lons))
+            if bbox is None:
+                bbox = polygonBox
+            else:
+                bbox = (max(bbox[0], polygonBox[0]), max(bbox[1], polygonBox[1]), min(bbox[2], polygonBox[2]), min(bbox[3], polygonBox[3]))
+        self.bbox = tuple(float(value) for value in bbox)
+        if self.bbox[0] > self.bbox[2] or self.bbox[1] > self.bbox[3]:
+            raise ValueError(f"empty clip area {self.bbox}")
+        
+    def contains(self, lat, lon):
+        """
+        [Method] contains
+        Check if a coordinate is inside the area. The bounding box is checked first, the polygon test (even-odd rule) only runs inside of it.
+        
+        Parameter:
+            - lat : [float] latitude
+            - lon : [float] longitude
+        
+        Return: [Bool]
+        """
+        if lat < self.bbox[0] or lat > self.bbox[2] or lon < self.bbox[1] or lon > self.bbox[3]:
+            return False
+        if self.polygon is None:
+            return True
+        inside = False
+        previousLat, previousLon = self.polygon[-1]
+        for vertexLat, vertexLon in self.polygon:
+            if (vertexLat > lat) != (previousLat > lat):
+                crossing = vertexLon + (lat - vertexLat) * (previousLon - vertexLon) / (previousLat - vertexLat)
+                if lon < crossing:
+                    inside = not inside
+            previousLat, previousLon = vertexLat, vertexLon
+        return inside
+    
+    def describe(self):
+        """
+        [Method] describe
+        Return: [string] a stable description of the area, used in the cache keys
+        """
+        description = "bbox=" + ",".join(repr(value) for value in self.bbox)
+        if self.polygon is not None:
+            description += ";polygon=" + ",".join(f"{lat!r}:{lon!r}" for lat, lon in self.polygon)
+        return description
+    
+    def __str__(self):
+        """
+        [Method] __str__
+        Generate the summarized clip area string and return it.
+        """
+        tempstring = f"[ClipArea]\n"
+        tempstring = tempstring + f" bounding box = {self.bbox}\n"
+        if self.polygon is not None:
+            tempstring = tempstring + f" polygon vertices = {len(self.polygon)}\n"
+        return tempstring
@@ -0,0 +1,332 @@
+"""
+Contraction hierarchies over the map graph (see RoadGraph).
+
+Preprocessing contracts the nodes one by one, in the order given by the edge difference heuristic (shortcuts added - edges removed
++ contracted neighbors), lazily updated. When a node is contracted, a shortcut is added between two of its remaining neighbors
+unless a witness search finds a path that is not longer without the node. Every node gets the rank of its contraction and only
+the upward edges (to higher ranked nodes) are kept, together with the middle node of every shortcut to unpack the paths.
+A query is a bidirectional Dijkstra on the upward graph. The map graph is undirected, so both directions use the same edges.
+
+The hierarchy is stored in the Snapshot file layout, keyed on a fingerprint of the graph (see RoadGraph.fingerprint).
+"""
+import heapq
+import math
+import numpy as np
+from pathlib import Path
+from . import Snapshot
+
+VERSION = 1
+WITNESS_SETTLED_LIMIT = 60
+
+def witnessDistances(adjacency, contracted, source, excluded, maxDistance):
+    """
+    [Function] witnessDistances
+    Bounded Dijkstra used to look for witness paths, it ignores the contracted nodes and the node being contracted.
+
+    Parameter:
+        - adjacency   : [array] list of {neighbor: weight} dictionaries
+        - contracted  : [array] list of Bool, True for contracted nodes
+        - source      : [int] start node
+        - excluded    : [int] node being contracted
+        - maxDistance : [float] the search stops past this distance
+
+    Return: [Dict] node -> distance of the settled and reached nodes (upper bounds of the real distances)
+    """
+    distances = {source: 0.0}
+    queue = [(0.0, source)]
+    settled = 0
+    while len(queue) > 0 and settled < WITNESS_SETTLED_LIMIT:
+        distance, current = heapq.heappop(queue)
+        if distance > distances.get(current, math.inf):
+            continue
+        if distance > maxDistance:
+            break
+        settled += 1
+        for neighbor, weight in adjacency[current].items():
+            if neighbor == excluded or contracted[neighbor]:
+                continue
+            cost = distance + weight
+            if cost < distances.get(neighbor, math.inf):
+                distances[neighbor] = cost
+                heapq.heappush(queue, (cost, neighbor))
+    return distances
+
+def neededShortcuts(adjacency, contracted, node):
+    """
+    [Function] neededShortcuts
+    Find the shortcuts required to contract a node.
+
+    Parameter:
+        - adjacency  : [array] list of {neighbor: weight} dictionaries
+        - contracted : [array] list of Bool, True for contracted nodes
+        - node       : [int] the node
+
+    Return: [array] list of (u, w, weight) shortcuts, u < w
+    """
+    neighbors = [(neighbor, weight) for neighbor, weight in adjacency[node].items() if not contracted[neighbor]]
+    shortcuts = []
+    for i, (u, weightU) in enumerate(neighbors):
+        others = neighbors[i + 1:]
+        if len(others) == 0:
+            continue
+        maxDistance = weightU + max(weight for neighbor, weight in others)
+        witness = witnessDistances(adjacency, contracted, u, node, maxDistance)
+        for w, weightW in others:
+            through = weightU + weightW
+            if witness.get(w, math.inf) > through:
+                shortcuts.append((min(u, w), max(u, w), through))
+    return shortcuts
+
+class ContractionHierarchy():
+    """
+    [Class] ContractionHierarchy
+    Contraction hierarchy of a RoadGraph, answers shortest path queries with a bidirectional search on the upward graph.
+    
+    Properties:
+        - fingerprint : [string] fingerprint of the graph it was built from
+        - rank        : [np.array] int32 contraction order of every node
+        - indptr      : [np.array] int64 CSR pointer of the upward edges
+        - indices     : [np.array] int32 upward neighbor (higher rank)
+        - weights     : [np.array] float64 edge length in meters
+        - middle      : [np.array] int32 middle node of the shortcut, -1 for the edges of the graph
+        - shortcuts   : [int] number of shortcuts
+    """
+    def __init__(self, fingerprint, rank, indptr, indices, weights, middle):
+        """
+        [Constructor]
+        Initialize the hierarchy from its arrays, use build() or load() to create one.
+        """
+        self.fingerprint = fingerprint
+        self.rank = rank
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.middle = middle
+        self.shortcuts = int((np.asarray(middle) >= 0).sum())
+        self.upward = None
+        
+    @classmethod
+    def build(cls, graph):
+        """
+        [Method] build
+        Contract every node of the graph.
+        
+        Parameter:
+            - graph : [RoadGraph] the graph
+        
+        Return: [ContractionHierarchy] the hierarchy
+        """
+        count = len(graph)
+        indices = graph.indices.tolist()
+        weights = graph.weights.tolist()
+        pointer = graph.indptr.tolist()
+        adjacency = [{} for i in range(count)]
+        for u in range(count):
+            for position in range(pointer[u], pointer[u + 1]):
+                v, weight = indices[position], weights[position]
+                if u == v:
+                    continue
+                # the connections are symmetric, keep the shortest edge of both directions
+                if weight < adjacency[u].get(v, math.inf):
+                    adjacency[u][v] = weight
+                    adjacency[v][u] = weight
+        middle = {}
+        contracted = [False] * count
+        deletedNeighbors = [0] * count
+        rank = np.zeros(count, dtype=np.int32)
+
+        def priority(node):
+            shortcuts = neededShortcuts(adjacency, contracted, node)
+            degree = sum(1 for neighbor in adjacency[node] if not contracted[neighbor])
+            return len(shortcuts) - degree + deletedNeighbors[node]
+
+        queue = [(priority(node), node) for node in range(count)]
+        heapq.heapify(queue)
+        order = 0
+        while len(queue) > 0:
+            value, node = heapq.heappop(queue)
+            if contracted[node]:
+                continue
+            # lazy update, contract the node only if it is still the best one
+            current = priority(node)
+            if len(queue) > 0 and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))
+                continue
+            for u, w, weight in neededShortcuts(adjacency, contracted, node):
+                if weight < adjacency[u].get(w, math.inf):
+                    adjacency[u][w] = weight
+                    adjacency[w][u] = weight
+                    middle[(u, w)] = node
+            contracted[node] = True
+            rank[node] = order
+            order += 1
+            for neighbor in adjacency[node]:
+                if not contracted[neighbor]:
+                    deletedNeighbors[neighbor] += 1
+
+        upward = [[(v, weight, middle.get((min(u, v), max(u, v)), -1)) for v, weight in adjacency[u].items() if rank[v] > rank[u]] for u in range(count)]
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(edges) for edges in upward])
+        return cls(graph.fingerprint(), rank,
+                   indptr,
+                   np.array([v for edges in upward for v, weight, m in edges], dtype=np.int32),
+                   np.array([weight for edges in upward for v, weight, m in edges], dtype=np.float64),
+                   np.array([m for edges in upward for v, weight, m in edges], dtype=np.int32))
+        
+    def save(self, path):
+        """
+        [Method] save
+        Write the hierarchy to a file
+        
+        Parameter:
+            - path : [string] path to the file
+        """
+        header = {"type": "contractionHierarchy", "version": VERSION, "fingerprint": self.fingerprint}
+        arrays = {"rank": self.rank, "indptr": self.indptr, "indices": self.indices, "weights": self.weights, "middle": self.middle}
+        Snapshot.writeArrays(path, header, arrays)
+        
+    @classmethod
+    def load(cls, path, fingerprint = None):
+        """
+        [Method] load
+        Load a hierarchy written by save
+        
+        Parameter:
+            - path        : [string] path to the file
+            - fingerprint : [string] fingerprint of the graph, None to skip the check
+        
+        Return: [ContractionHierarchy] the hierarchy, None if the file does not exist or was built from another graph
+        """
+        if path is None or not Path(path).is_file():
+            return None
+        try:
+            header = Snapshot.readHeader(path)
+            if header is None or header.get("type") != "contractionHierarchy" or header.get("version") != VERSION:
+                return None
+            if fingerprint is not None and header.get("fingerprint") != fingerprint:
+                return None
+            header, arrays = Snapshot.readArrays(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(header["fingerprint"], arrays["rank"], arrays["indptr"], arrays["indices"], arrays["weights"], arrays["middle"])
+    
+    def upwardLists(self):
+        """
+        [Method] upwardLists
+        Python dictionaries view of the upward graph for the query loops, built on the first call and kept.
+        
+        Return: [array] list of {neighbor: (weight, middle)} per node
+        """
+        if self.upward is None:
+            indices = self.indices.tolist()
+            weights = self.weights.tolist()
+            middle = self.middle.tolist()
+            pointer = self.indptr.tolist()
+            self.upward = [{indices[p]: (weights[p], middle[p]) for p in range(pointer[i], pointer[i + 1])} for i in range(len(pointer) - 1)]
+        return self.upward
+    
+    def query(self, origin, destination):
+        """
+        [Method] query
+        Shortest path between two nodes.
+        
+        Parameter:
+            - origin      : [int] origin node index
+            - destination : [int] destination node index
+        
+        Return: ([float],[array],[array]) distance in meters, node indices of the path and length of every edge of the path,
+                (None, None, None) if the destination cannot be reached
+        """
+        upward = self.upwardLists()
+        if origin == destination:
+            return 0.0, [origin], []
+        distances = ({origin: 0.0}, {destination: 0.0})
+        parents = ({origin: None}, {destination: None})
+        queues = ([(0.0, origin)], [(0.0, destination)])
+        settled = (set(), set())
+        best = math.inf
+        meeting = None
+        side = 0
+        while len(queues[0]) > 0 or len(queues[1]) > 0:
+            if len(queues[side]) == 0 or queues[side][0][0] >= best:
+                if len(queues[1 - side]) == 0 or queues[1 - side][0][0] >= best:
+                    break
+                side = 1 - side
+                continue
+            distance, current = heapq.heappop(queues[side])
+            if current in settled[side]:
+                side = 1 - side
+                continue
+            settled[side].add(current)
+            other = distances[1 - side].get(current)
+            if other is not None and distance + other < best:
+                best = distance + other
+                meeting = current
+            for neighbor, (weight, middle) in upward[current].items():
+                cost = distance + weight
+                if cost < distances[side].get(neighbor, math.inf):
+                    distances[side][neighbor] = cost
+                    parents[side][neighbor] = current
+                    heapq.heappush(queues[side], (cost, neighbor))
+            side = 1 - side
+        if meeting is None:
+            return None, None, None
+        up = []
+        current = meeting
+        while current is not None:
+            up.append(current)
+            current = parents[0][current]
+        up.reverse()
+        down = []
+        current = parents[1][meeting]
+        while current is not None:
+            down.append(current)
+            current = parents[1][current]
+        path = [origin]
+        lengths = []
+        hierarchyPath = up + down
+        for start, end in zip(hierarchyPath[:-1], hierarchyPath[1:]):
+            self.unpack(start, end, path, lengths)
+        return best, path, lengths
+    
+    def unpack(self, start, end, path, lengths):
+        """
+        [Method] unpack
+        Replace an edge of the upward graph by the edges of the graph it stands for and append them to a path.
+        
+        Parameter:
+            - start, end : [int] the edge (start is already the last node of the path)
+            - path       : [array] node indices of the path, end is appended
+            - lengths    : [array] edge lengths of the path
+        """
+        upward = self.upwardLists()
+        stack = [(start, end)]
+        while len(stack) > 0:
+            a, b = stack.pop()
+            low, high = (a, b) if self.rank[a] < self.rank[b] else (b, a)
+            weight, middle = upward[low][high]
+            if middle < 0:
+                path.append(b)
+                lengths.append(weight)
+            else:
+                # the second half is expanded after the first one
+                stack.append((middle, b))
+                stack.append((a, middle))
+    
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] memory used by the arrays of the hierarchy in bytes
+        """
+        return sum(np.asarray(array).nbytes for array in (self.rank, self.indptr, self.indices, self.weights, self.middle))
+    
+    def __str__(self):
+        """
+        [Method] __str__
+        Generate the summarized hierarchy information string and return it.
+        """
+        tempstring = f"[ContractionHierarchy]\n"
+        tempstring = tempstring + f" number of nodes = {len(self.rank)}\n"
+        tempstring = tempstring + f" number of upward edges = {len(self.indices)}\n"
+        tempstring = tempstring + f" number of shortcuts = {self.shortcuts}\n"
+        return tempstring
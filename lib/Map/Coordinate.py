@@ -1,4 +1,4 @@
-import geopy.distance as distance
+from . import Projection
 
 class Coordinate():  
     
@@ -93,17 +93,19 @@ class Coordinate():
         temp = Coordinate(self.lat*scale,self.lon*scale)
         return temp
        
-    def calculateDistance(self,targetCoordinate):
+    def calculateDistance(self,targetCoordinate,projection = None,precision = Projection.PROJECTED):
         """
         [Method] calculateDistance
         calculateDistance to other coordinate
         
         Parameter:
             - targetCoordinate : [Coordinate] target Coordinate.
+            - projection : [LocalProjection] projection of the map (Map.projection), None to use a projection around the two coordinates
+            - precision : [string] precision mode of the map (Map.precision, see Projection)
             
         Return: [Double] Distance in Meter
         """
-        return distance.distance(self.getLatLon(), targetCoordinate.getLatLon()).km * 1000
+        return Projection.distance(self.getLatLon(), targetCoordinate.getLatLon(), projection, precision)
     
     def getVectorDistance(self,targetCoordinate):
         """
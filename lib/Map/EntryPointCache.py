@@ -0,0 +1,81 @@
+"""
+Binary cache of the building entry points (see Map.calculateEntryPoints), stored with the Snapshot file layout.
+The header records the cache version, the hash of the map it was generated from and the grid size,
+a cache that does not match the current map is ignored and rewritten.
+"""
+import numpy as np
+from pathlib import Path
+from . import Snapshot
+
+VERSION = 1
+
+def isValid(header, mapHash, gridSize):
+    """
+    [Function] isValid
+    Check if a cache header matches the map.
+
+    Parameter:
+        - header   : [Dict] the cache header
+        - mapHash  : [string] hash of the map
+        - gridSize : [(int,int)] grid size
+
+    Return: [Bool]
+    """
+    return (header is not None
+            and header.get("type") == "entryPoints"
+            and header.get("version") == VERSION
+            and header.get("mapHash") == mapHash
+            and tuple(header.get("gridSize", ())) == tuple(gridSize))
+
+def load(path, mapHash, gridSize):
+    """
+    [Function] load
+    Load the cached entry points as arrays.
+
+    Parameter:
+        - path     : [string] path to the cache file
+        - mapHash  : [string] hash of the map
+        - gridSize : [(int,int)] grid size
+
+    Return: [Dict] the arrays (wayIds, roadNames, lat, lon), None if the cache does not exist or does not match the map
+    """
+    if path is None or path == "" or not Path(path).is_file():
+        return None
+    try:
+        header = Snapshot.readHeader(path)
+        if not isValid(header, mapHash, gridSize):
+            return None
+        header, arrays = Snapshot.readArrays(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    result = {}
+    result["wayIds"] = Snapshot.unpackStrings(arrays["wayIds"], arrays["wayIdsOffsets"])
+    result["roadNames"] = Snapshot.unpackStrings(arrays["roadNames"], arrays["roadNamesOffsets"])
+    result["lat"] = np.array(arrays["lat"])
+    result["lon"] = np.array(arrays["lon"])
+    return result
+
+def save(path, mapHash, gridSize, buildings):
+    """
+    [Function] save
+    Write the entry points of the buildings into the cache in one bulk operation.
+    Buildings without entry points are skipped.
+
+    Parameter:
+        - path      : [string] path to the cache file
+        - mapHash   : [string] hash of the map
+        - gridSize  : [(int,int)] grid size
+        - buildings : [array] list of buildings
+    """
+    buildings = [building for building in buildings if building.entryPoint is not None and building.closestRoad is not None]
+    arrays = {}
+    arrays["wayIds"], arrays["wayIdsOffsets"] = Snapshot.packStrings([building.way.osmId for building in buildings])
+    arrays["roadNames"], arrays["roadNamesOffsets"] = Snapshot.packStrings([building.closestRoad.name for building in buildings])
+    arrays["lat"] = np.array([building.entryPoint.lat for building in buildings], dtype=np.float64)
+    arrays["lon"] = np.array([building.entryPoint.lon for building in buildings], dtype=np.float64)
+    header = {}
+    header["type"] = "entryPoints"
+    header["version"] = VERSION
+    header["mapHash"] = mapHash
+    header["gridSize"] = list(gridSize)
+    Snapshot.writeArrays(path, header, arrays)
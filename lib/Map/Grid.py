@@ -1,6 +1,5 @@
 import numpy as np
 from .Coordinate import Coordinate
-import numpy as np
 
 class Grid():  
     """
@@ -67,26 +66,28 @@ class Grid():
         """
         self.roads.append(road)
     
-    def remapBuilding(self, buildConnFile = None, connectionDict = {}):
+    def remapBuilding(self, connectionDict = {}):
         """
         [Method] remapBuilding
-        Method to give each building their entry points.
+        Method to give each building their precalculated entry points.
        
         Parameter:
-            - buildConnFile = [FileIO] a file to cache the connections between the roads and buildings 
             - connectionDict = [Dict] a dictionary of the building entry points
                 | Key = [wayID] str, 
-                    | min_dist: [int] the distance from the building's centroid to the closest point on the road 
+                    | road: [Road] the road closest to the building's centroid
                     | entryCoordinate: [Coordinate] coordinate on the road that act as the connecting point
+                    
+        Return: [array] list of buildings that do not have a precalculated entry point (see Map.calculateEntryPoints)
         """
-
+        missing = []
         for building in self.buildings:
             if building.way.osmId in connectionDict:
                 #if building have precalculated entry point, load the precalculated entry point.
                 self.loadEntryPoint(building, connectionDict[building.way.osmId])
             else:
-                #if not, recalculate the entry point of this building.
-                self.calculateEntryPoint(building, buildConnFile)
+                #if not, the entry point of this building needs to be calculated.
+                missing.append(building)
+        return missing
 
     def loadEntryPoint(self, building, entryPoint):
         """
@@ -95,40 +96,16 @@ class Grid():
        
         Parameter:
             - building = [Building] The building
-            - connectionDict = [Dict] a dictionary of the building entry points
-                | Key = [wayID] str, 
-                    | min_dist: [int] the distance from the building's centroid to the closest point on the road 
-                    | entryCoordinate: [Coordinate] coordinate on the road that act as the connecting point
+            - entryPoint = [Dict] the building entry point
+                | road: [Road] the road closest to the building's centroid
+                | entryCoordinate: [Coordinate] coordinate on the road that act as the connecting point
         to do : Move it to building class?
         """
-        closest_coord = entryPoint["min_dist"]
-        closest = self.roads[closest_coord]
+        closest = entryPoint["road"]
         building.closestRoad = closest
         closest.addBuilding(building)
         building.entryPoint = entryPoint["entryCoordinate"]
 
-
-    def calculateEntryPoint(self, building, file = None):
-        """
-        [Method] calculateEntryPoint
-        calculate the building's entry point from the road
-       
-        Parameter:
-            - building = [Building] The building
-            - file = [FileIO] a file to write the connections between the roads and buildings 
-        to do : Move it to building class?
-        """
-        road_min_dist = np.argmin([road.distanceToCoordinate(building.coordinate) for road in self.roads])
-        closest = self.roads[road_min_dist]
-        building.closestRoad = closest
-        closest.addBuilding(building)
-        building.entryPoint = closest.getClosestCoordinate(building.coordinate)
-        
-        if file != None:
-            # write the calculated point to the file
-            line = f"{building.way.osmId};{road_min_dist};{building.entryPoint.lat};{building.entryPoint.lon}\n"
-            file.write(line)
-
     def addBuildingSettings(self,setting):
         """
         [Method] addBuildingSettings
@@ -0,0 +1,205 @@
+"""
+Landmark lower bounds for the A* search (ALT: A*, landmarks and triangle inequality).
+
+A few landmark nodes are picked on the border of the graph with the farthest point heuristic and the shortest distance from
+every landmark to every node is stored. For any landmark L the triangle inequality gives d(v,t) >= |d(L,t) - d(L,v)|, the best
+of these bounds is a much tighter heuristic than the straight line distance when the roads go around rivers or dead ends.
+The map graph is undirected, so one distance table per landmark is enough.
+
+The tables are stored in the Snapshot file layout, keyed on a fingerprint of the graph (see RoadGraph.fingerprint).
+"""
+import heapq
+import math
+import numpy as np
+from pathlib import Path
+from . import Snapshot
+
+VERSION = 1
+DEFAULT_COUNT = 8
+# number of landmarks used by one query, the ones giving the best bound at the origin
+ACTIVE_LANDMARKS = 4
+
+def graphDistances(graph, source):
+    """
+    [Function] graphDistances
+    Dijkstra from one node over the whole graph
+
+    Parameter:
+        - graph  : [RoadGraph] the graph
+        - source : [int] index of the source node
+
+    Return: [np.array] float64 distance in meters from the source to every node, inf if the node cannot be reached
+    """
+    adjacency, positions = graph.adjacencyLists()
+    distance = [math.inf] * len(graph)
+    distance[source] = 0.0
+    queue = [(0.0, source)]
+    while len(queue) > 0:
+        current, node = heapq.heappop(queue)
+        if current > distance[node]:
+            continue
+        for neighbor, weight in adjacency[node]:
+            cost = current + weight
+            if cost < distance[neighbor]:
+                distance[neighbor] = cost
+                heapq.heappush(queue, (cost, neighbor))
+    return np.array(distance, dtype=np.float64)
+
+class Landmarks():
+    """
+    [Class] Landmarks
+    Landmark nodes and their distance tables
+
+    Properties:
+        - fingerprint : [string] fingerprint of the graph the tables were computed on
+        - nodes       : [np.array] int32 graph index of every landmark
+        - distances   : [np.array] float64 (landmarks, nodes) distance from every landmark to every node, inf if unreachable
+        - table       : [array] Python lists view of the distances per node, -1 for unreachable (None until rows() is called)
+    """
+    def __init__(self, fingerprint, nodes, distances):
+        """
+        [Constructor]
+        Initialize the landmarks from their arrays, use build() or load() to create them.
+        """
+        self.fingerprint = fingerprint
+        self.nodes = nodes
+        self.distances = distances
+        self.table = None
+
+    @classmethod
+    def build(cls, graph, count = DEFAULT_COUNT):
+        """
+        [Method] build
+        Pick the landmarks with the farthest point heuristic and compute their distance tables. The search starts from the road
+        node closest to the middle of the map, the first landmark is the node farthest from it and every next landmark is the node
+        farthest from the landmarks already picked. Nodes that cannot be reached from the start are ignored.
+
+        Parameter:
+            - graph : [RoadGraph] the graph
+            - count : [int] number of landmarks
+
+        Return: [Landmarks] the landmarks
+        """
+        candidates = np.nonzero(graph.isRoad)[0]
+        if len(candidates) == 0:
+            candidates = np.arange(len(graph))
+        x, y = graph.x[candidates], graph.y[candidates]
+        start = int(candidates[np.argmin((x - x.mean()) ** 2 + (y - y.mean()) ** 2)])
+        closest = graphDistances(graph, start)
+        reachable = np.isfinite(closest)
+        closest = np.where(reachable, closest, -1.0)
+        nodes = []
+        distances = []
+        for i in range(min(count, int(reachable.sum()))):
+            landmark = int(np.argmax(closest))
+            if i > 0 and closest[landmark] <= 0:
+                break
+            nodes.append(landmark)
+            distances.append(graphDistances(graph, landmark))
+            closest = np.where(reachable, np.minimum(closest if i > 0 else np.inf, distances[-1]), -1.0)
+        table = np.array(distances, dtype=np.float64).reshape(len(nodes), len(graph))
+        return cls(graph.fingerprint(), np.array(nodes, dtype=np.int32), table)
+
+    def save(self, path):
+        """
+        [Method] save
+        Write the landmarks to a file
+
+        Parameter:
+            - path : [string] path to the file
+        """
+        header = {"type": "landmarks", "version": VERSION, "fingerprint": self.fingerprint}
+        Snapshot.writeArrays(path, header, {"nodes": self.nodes, "distances": self.distances})
+
+    @classmethod
+    def load(cls, path, fingerprint = None):
+        """
+        [Method] load
+        Load landmarks written by save
+
+        Parameter:
+            - path        : [string] path to the file
+            - fingerprint : [string] fingerprint of the graph, None to skip the check
+
+        Return: [Landmarks] the landmarks, None if the file does not exist or was built from another graph
+        """
+        if path is None or not Path(path).is_file():
+            return None
+        try:
+            header = Snapshot.readHeader(path)
+            if header is None or header.get("type") != "landmarks" or header.get("version") != VERSION:
+                return None
+            if fingerprint is not None and header.get("fingerprint") != fingerprint:
+                return None
+            header, arrays = Snapshot.readArrays(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(header["fingerprint"], arrays["nodes"], arrays["distances"])
+
+    def rows(self):
+        """
+        [Method] rows
+        Python lists view of the distance tables for the search loops, built on the first call and kept.
+
+        Return: [array] list of the landmark distances of every node, -1 if the node cannot be reached from the landmark
+        """
+        if self.table is None:
+            self.table = np.where(np.isfinite(self.distances), self.distances, -1.0).T.tolist()
+        return self.table
+
+    def bound(self, origin, destination, active = None):
+        """
+        [Method] bound
+        Lower bound of the distance between two nodes
+
+        Parameter:
+            - origin      : [int] index of the origin node
+            - destination : [int] index of the destination node
+            - active      : [array] positions of the landmarks to use, all of them if None
+
+        Return: [float] the bound in meters, inf if the nodes are not connected
+        """
+        rows = self.rows()
+        origins, destinations = rows[origin], rows[destination]
+        best = 0.0
+        for i in (range(len(origins)) if active is None else active):
+            a, b = origins[i], destinations[i]
+            if a < 0 or b < 0:
+                if a >= 0 or b >= 0:
+                    # only one of them can be reached from the landmark: they are in different components
+                    return math.inf
+                continue
+            if abs(a - b) > best:
+                best = abs(a - b)
+        return best
+
+    def activeLandmarks(self, origin, destination, count = ACTIVE_LANDMARKS):
+        """
+        [Method] activeLandmarks
+        Pick the landmarks giving the best bounds for a query, the search only evaluates those.
+
+        Parameter:
+            - origin      : [int] index of the origin node
+            - destination : [int] index of the destination node
+            - count       : [int] number of landmarks to keep
+
+        Return: [array] positions of the landmarks
+        """
+        rows = self.rows()
+        origins, destinations = rows[origin], rows[destination]
+        bounds = [abs(a - b) if a >= 0 and b >= 0 else 0.0 for a, b in zip(origins, destinations)]
+        return sorted(range(len(bounds)), key = lambda i: -bounds[i])[:count]
+
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] memory used by the arrays in bytes (the Python lists view is not included)
+        """
+        return self.nodes.nbytes + self.distances.nbytes
+
+    def __len__(self):
+        """
+        [Method] __len__
+        Return: [int] number of landmarks
+        """
+        return len(self.nodes)
@@ -0,0 +1,89 @@
+import osmium
+
+ROADS = "roads"
+BUILDINGS = "buildings"
+AMENITIES = "amenities"
+LEISURES = "leisures"
+NATURALS = "naturals"
+LAYERS = (ROADS, BUILDINGS, AMENITIES, LEISURES, NATURALS)
+
+def wayLayer(tags):
+    """
+    [Function] wayLayer
+    Get the layer of a way from its tags, with the same priority as Map.constructMap (building, natural, leisure, amenity, highway).
+    
+    Parameter:
+        - tags : osmium tag list (or dictionary) of the way
+    
+    Return: [string] the layer, None if the way would end up in Map.others
+    """
+    if 'building' in tags:
+        return BUILDINGS
+    if 'natural' in tags:
+        return NATURALS
+    if 'leisure' in tags:
+        return LEISURES
+    if 'amenity' in tags:
+        return AMENITIES
+    if 'highway' in tags:
+        return ROADS
+    return None
+
+class LayerFilter(osmium.SimpleHandler):
+    """
+    [Class] LayerFilter
+    First pass of the usage filtered ingestion: reads only the ways of the OSM file and collects the ids of the nodes referenced by
+    the ways of the wanted layers. The second pass (Map) only creates those nodes and ways.
+    
+    Properties:
+        - layers          : [set] the wanted layers (see LAYERS)
+        - referencedNodes : [set] Open Street Map ids (int) of the nodes referenced by the wanted ways
+        - num_ways        : Number of wanted ways.
+    """
+    def __init__(self, layers):
+        """
+        [Constructor]
+        Initialize the filter
+        
+        Parameter:
+            - layers : [array] names of the wanted layers, a subset of LAYERS
+        """
+        osmium.SimpleHandler.__init__(self)
+        self.layers = set(layers)
+        unknown = self.layers.difference(LAYERS)
+        if len(unknown) > 0:
+            raise ValueError(f"unknown layers {sorted(unknown)}, expected a subset of {list(LAYERS)}")
+        self.referencedNodes = set()
+        self.num_ways = 0
+        
+    def way(self, w):
+        """
+        [Method] way
+        Do not use this method, this is an override method from osmium to read the ways.
+        """
+        if wayLayer(w.tags) in self.layers:
+            self.num_ways += 1
+            self.referencedNodes.update(node.ref for node in w.nodes)
+            
+    def wants(self, tags):
+        """
+        [Method] wants
+        Check if a way belongs to a wanted layer
+        
+        Parameter:
+            - tags : osmium tag list of the way
+        
+        Return: [Bool]
+        """
+        return wayLayer(tags) in self.layers
+    
+    def __str__(self):
+        """
+        [Method] __str__
+        Generate the summarized filter information string and return it.
+        """
+        tempstring = f"[LayerFilter]\n"
+        tempstring = tempstring + f" layers = {sorted(self.layers)}\n"
+        tempstring = tempstring + f" number of ways = {self.num_ways}\n"
+        tempstring = tempstring + f" number of referenced nodes = {len(self.referencedNodes)}\n"
+        return tempstring
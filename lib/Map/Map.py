@@ -1,8 +1,5 @@
-import xml.etree.ElementTree as ET
 import osmium
 import numpy as np
-import geopy.distance as distance
-from pathlib import Path
 import csv
 import random
 from .Node import  Node
@@ -12,7 +9,22 @@ from .Road import genName
 from .Building import Building
 from .Grid import Grid
 from .Coordinate import Coordinate
-from .PathFinder import searchPath
+from .Clip import ClipArea
+from .LayerFilter import LayerFilter
+from .PathFinder import ENGINES, treePaths
+from .RoadGraph import RoadGraph
+from .ContractionHierarchy import ContractionHierarchy
+from .Landmarks import Landmarks
+from .RouteTree import RouteTree
+from .RouteTreeCache import RouteTreeCache
+from .RouteCache import RouteCache, NO_ROUTE
+from .RouteStore import RouteStore
+from .Route import Route
+from .RouteCursor import RouteCursor
+from .SpatialIndex import SegmentIndex
+from . import Snapshot
+from . import EntryPointCache
+from . import Projection
 class Map(osmium.SimpleHandler):
     """
     [Class] Map
@@ -21,6 +33,8 @@ class Map(osmium.SimpleHandler):
     Properties:
         - origin        : [Coordinate] map's origin coordinate
         - end           : [Coordinate] map's end coordinate
+        - dataOrigin    : [Coordinate] south-west corner of the loaded nodes
+        - dataEnd       : [Coordinate] north-east corner of the loaded nodes
         - num_nodes     : Number of Nodes.
         - nodesDict     : Dictionary of all nodes. The key used are the Open Street Map ID.
         - nodes         : List of all nodes.
@@ -42,23 +56,39 @@ class Map(osmium.SimpleHandler):
         - amenities     : List of all amenities.
         
         - grids         : [(int,int)] Two dimensional array of grids
+        - graph         : [RoadGraph] array backed graph of all nodes (None until buildGraph() is called)
+        - roadIndex     : [SegmentIndex] spatial index over the roads (None until buildRoadIndex() is called)
         
         - others        : List of other openstreetmap ways that yet to be categorized.
         - gridCellHeight   : height of 1 grid in latitude
         - gridCellWidth   : width of 1 grid in longitude
         - gridsize      : tuple of 2 integer that shows how many grids we have
+        - mapHash       : [string] hash of the source OSM file, used to validate the caches (None if unknown)
+        - projection    : [LocalProjection] local projection around the map origin used to compute distances
+        - precision     : [string] how the distances of this map are computed, "projected" or "geodesic" (see Projection)
+        - clip          : [ClipArea] area the map is clipped to while the file is read (None to load everything)
+        - layerFilter   : [LayerFilter] layers to load and the nodes they reference, only set while the file is read (None to load everything)
+        - searchEngine  : [string] name of the path search engine used by findPath (see PathFinder.ENGINES)
+        - contraction   : [ContractionHierarchy] contraction hierarchy of the graph used by the "ch" engine (None until buildContractionHierarchy() is called)
+        - landmarks     : [Landmarks] landmark distance tables used by the "alt" engine (None until buildLandmarks() is called)
+        - routeTrees    : [RouteTreeCache] memory bounded cache of the shortest path trees used by the "tree" engine
+        - routeCache    : [RouteCache] memory bounded cache of the routes returned by findPath, keyed by origin and destination
+        - routeStore    : [RouteStore] disk backed store of the routes shared by the runs on the same map (None until openRouteStore() is called)
     """
-    def __init__(self,grid = (10,10)):
+    def __init__(self,grid = (10,10),precision = Projection.PROJECTED):
         """
         [Constructor]    
         Generate Empty Map.
         
         Parameter:
             - grid = grid size, default value = (10,10)
+            - precision = [string] "projected" (default) or "geodesic", see Projection
         """
         osmium.SimpleHandler.__init__(self)
         self.origin = Coordinate(0.0,0.0)
         self.end = Coordinate(0.0,0.0)
+        self.dataOrigin = None
+        self.dataEnd = None
         
         self.num_nodes = 0
         self.nodesDict = {}
@@ -87,26 +117,69 @@ class Map(osmium.SimpleHandler):
         self.gridCellHeight = None
         self.gridCellWidth = None
         self.gridSize = grid
+        self.graph = None
+        self.roadIndex = None
+        self.mapHash = None
+        self.projection = None
+        self.precision = Projection.checkPrecision(precision)
+        self.clip = None
+        self.layerFilter = None
+        self.searchEngine = "tree"
+        self.contraction = None
+        self.landmarks = None
+        self.routeTrees = RouteTreeCache()
+        self.routeCache = RouteCache()
+        self.routeStore = None
         
     def node(self, n):
         """
         [Method] node
         Do not use this method, this is an override method from osmium to generate nodes.
-        """
+        Nodes outside of the clip area and nodes not referenced by a way of the wanted layers are skipped.
+        """
+        if self.layerFilter is not None and n.id not in self.layerFilter.referencedNodes:
+            return
+        if self.clip is not None:
+            location = n.location
+            if not location.valid() or not self.clip.contains(location.lat, location.lon):
+                return
         self.num_nodes += 1
         temp =  Node()
         temp.fill(n)
         self.nodesDict[f"n{n.id}"] = temp
         self.nodes.append(temp)
+        self.extendDataBounds(temp.coordinate)
+        
+    def extendDataBounds(self, coordinate):
+        """
+        [Method] extendDataBounds
+        Grow the bounding box of the loaded data so it contains the coordinate. Used as the map boundary when the file has no header bounds.
+        
+        Parameter:
+            - coordinate : [Coordinate] coordinate of a loaded node
+        """
+        if self.dataOrigin is None:
+            self.dataOrigin = Coordinate(coordinate.lat, coordinate.lon)
+            self.dataEnd = Coordinate(coordinate.lat, coordinate.lon)
+            return
+        self.dataOrigin.lat = min(self.dataOrigin.lat, coordinate.lat)
+        self.dataOrigin.lon = min(self.dataOrigin.lon, coordinate.lon)
+        self.dataEnd.lat = max(self.dataEnd.lat, coordinate.lat)
+        self.dataEnd.lon = max(self.dataEnd.lon, coordinate.lon)
         
     def way(self, n):
         """
         [Method] way
         Do not use this method, this is an override method from osmium to generate ways.
+        Ways that are not in the wanted layers and ways without any loaded node (completely outside of the clip area) are skipped.
         """
-        self.num_ways += 1
+        if self.layerFilter is not None and not self.layerFilter.wants(n.tags):
+            return
         temp =  Way()
         temp.fill(n,self.nodesDict)
+        if len(temp.nodes) == 0:
+            return
+        self.num_ways += 1
         self.waysDict[f"n{n.id}"] = temp
         self.ways.append(temp)
         
@@ -128,18 +201,54 @@ class Map(osmium.SimpleHandler):
     def setBounds(self,filepath):
         """
         [Method] setBounds
-        Re-read the filepath to setup the boundary
+        Setup the boundary from the bounding box in the OSM file header. Only the header is read, the file is not parsed again.
+        If the header has no bounding box, the extent of the loaded nodes is used instead. When the map is clipped, the boundary is
+        limited to the clip area.
         
         Parameter:
             - filepath : path to the OSM file
         """
-        tree = ET.parse(filepath)
-        root = tree.getroot()
-        for child in root:
-            if (child.tag == 'bounds'):
-                self.origin = Coordinate(float(child.attrib['minlat']),float(child.attrib['minlon']))
-                self.end = Coordinate(float(child.attrib['maxlat']),float(child.attrib['maxlon']))
-                break
+        reader = osmium.io.Reader(str(filepath), osmium.osm.osm_entity_bits.NOTHING)
+        try:
+            box = reader.header().box()
+        finally:
+            reader.close()
+        if box.valid():
+            self.origin = Coordinate(box.bottom_left.lat, box.bottom_left.lon)
+            self.end = Coordinate(box.top_right.lat, box.top_right.lon)
+        elif self.dataOrigin is not None:
+            self.origin = Coordinate(self.dataOrigin.lat, self.dataOrigin.lon)
+            self.end = Coordinate(self.dataEnd.lat, self.dataEnd.lon)
+        if self.clip is not None:
+            minLat, minLon, maxLat, maxLon = self.clip.bbox
+            if box.valid() or self.dataOrigin is not None:
+                minLat, minLon = max(minLat, self.origin.lat), max(minLon, self.origin.lon)
+                maxLat, maxLon = min(maxLat, self.end.lat), min(maxLon, self.end.lon)
+            if minLat > maxLat or minLon > maxLon:
+                minLat, minLon, maxLat, maxLon = self.clip.bbox
+            self.origin = Coordinate(minLat, minLon)
+            self.end = Coordinate(maxLat, maxLon)
+        self.activateProjection()
+        
+    def activateProjection(self):
+        """
+        [Method] activateProjection
+        Create the local projection around the map origin, the projection used for the distances of this map (see distance()).
+        """
+        self.projection = Projection.LocalProjection(self.origin.lat, self.origin.lon)
+        
+    def distance(self, latLon1, latLon2):
+        """
+        [Method] distance
+        Distance between two (lat,lon) tuples in the projection and precision mode of this map
+        
+        Parameter:
+            - latLon1 = (float,float) first coordinate
+            - latLon2 = (float,float) second coordinate
+            
+        Return: [float] distance in meters
+        """
+        return Projection.distance(latLon1, latLon2, self.projection, self.precision)
                 
     def generateGrid(self):
         """
@@ -184,6 +293,9 @@ class Map(osmium.SimpleHandler):
         """
         for x in self.ways:
             if 'building' in x.tags.keys():
+                if len(set(id(node) for node in x.nodes)) < 3:
+                    # degenerate outline (broken data or clipped away), there is no centroid
+                    continue
                 build = Building(x)
                 if(self.gridCellHeight is not None and self.gridCellWidth is not None):
                     if build.coordinate.lat < self.origin.lat or build.coordinate.lon < self.origin.lon or build.coordinate.lat > self.end.lat or build.coordinate.lon > self.end.lon: 
@@ -228,13 +340,16 @@ class Map(osmium.SimpleHandler):
             - road: Open Street Map Road.
         """
         startingNode = None
-        for node in road.nodes:
+        for position, node in enumerate(road.nodes):
+            if position in road.gaps:
+                # the nodes in between were not loaded, do not connect across the gap
+                startingNode = None
             if (startingNode is not None):
                 startingNode.addConnection(node)
                 node.addConnection(startingNode)           
                 roadObject = self.roadsDict.get(genName(startingNode,node)[0])
                 if roadObject is None:
-                    roadObject = Road(startingNode,node,road)
+                    roadObject = Road(startingNode,node,road,self.distance(startingNode.coordinate.getLatLon(),node.coordinate.getLatLon()))
                     self.roadsDict[roadObject.name] = roadObject
                     self.roads.append(roadObject)  
                     if (roadObject.start.grid is not None):
@@ -256,18 +371,20 @@ class Map(osmium.SimpleHandler):
         Method to recalculate building to the right grid and also map it to the road
 
         Parameter:
-            - buildConnFileName = [str] the name of the file used to cache the connections between the roads and buildings
+            - buildConnFileName = [str] the name of the binary file used to cache the connections between the roads and buildings ("" to disable).
+                                  The cache is only used if it was generated from the same map (see Map.mapHash) with the same grid size.
         """
-        file = None
         connectionDict = {}
-        if buildConnFileName != "":
-            Path(buildConnFileName).touch()
-            file = open(buildConnFileName, "r+")
-            connectionDict = self.buildConnectionDict(file)
+        if buildConnFileName != "" and self.mapHash is not None:
+            connectionDict = self.buildConnectionDict(EntryPointCache.load(buildConnFileName, self.mapHash, self.gridSize))
         
+        missing = []
         for i in range(0,self.gridSize[1]):
             for j in range(0,self.gridSize[0]):
-                self.grids[j][i].remapBuilding(file, connectionDict)
+                missing.extend(self.grids[j][i].remapBuilding(connectionDict))
+        self.calculateEntryPoints(missing)
+        if len(missing) > 0 and buildConnFileName != "" and self.mapHash is not None:
+            EntryPointCache.save(buildConnFileName, self.mapHash, self.gridSize, self.buildings)
             
         for i in self.roads:
             generatedNodes = i.generateNodes()
@@ -276,57 +393,428 @@ class Map(osmium.SimpleHandler):
                 self.roadNodesDict[newNodes.osmId] = newNodes
             self.roadNodes.extend(generatedNodes)
 
-        if file != None:
-            file.close()
+    def buildRoadIndex(self):
+        """
+        [Method] buildRoadIndex
+        Build the spatial index over the road segments (see SegmentIndex).
+        
+        Return: [SegmentIndex] the index, segment i is self.roads[i]
+        """
+        count = len(self.roads)
+        startLat = np.fromiter((road.start.coordinate.lat for road in self.roads), dtype=np.float64, count=count)
+        startLon = np.fromiter((road.start.coordinate.lon for road in self.roads), dtype=np.float64, count=count)
+        endLat = np.fromiter((road.destination.coordinate.lat for road in self.roads), dtype=np.float64, count=count)
+        endLon = np.fromiter((road.destination.coordinate.lon for road in self.roads), dtype=np.float64, count=count)
+        self.roadIndex = SegmentIndex(startLat, startLon, endLat, endLon, self.origin.getLatLon())
+        return self.roadIndex
+        
+    def calculateEntryPoints(self, buildings):
+        """
+        [Method] calculateEntryPoints
+        Calculate the entry point of the buildings in one batched pass: the closest point of the closest road in the whole map
+        (not only in the building's grid) becomes the entry point.
+        
+        Parameter:
+            - buildings = [array] list of buildings
+        """
+        if len(buildings) == 0 or len(self.roads) == 0:
+            return
+        if self.roadIndex is None:
+            self.buildRoadIndex()
+        lat, lon = buildingCoordinates(buildings)
+        closestRoads, distances, positions = self.roadIndex.nearest(lat, lon)
+        self.assignEntryPoints(buildings, closestRoads, positions)
+        
+    def assignEntryPoints(self, buildings, closestRoads, positions):
+        """
+        [Method] assignEntryPoints
+        Connect the buildings to their closest road and set their entry point
+        
+        Parameter:
+            - buildings = [array] list of buildings
+            - closestRoads = [np.array] index of the closest road (in self.roads) of every building
+            - positions = [np.array] position of the entry point along the road (0 = start, 1 = destination)
+        """
+        for building, roadIndex, position in zip(buildings, closestRoads.tolist(), positions.tolist()):
+            closest = self.roads[roadIndex]
+            building.closestRoad = closest
+            closest.addBuilding(building)
+            start = closest.start.coordinate
+            vector = closest.destination.coordinate.getVectorDistance(start).newCoordinateWithScale(position)
+            building.entryPoint = start.newCoordinateWithTranslation(vector.lat, vector.lon)
+        
+    def allNodes(self):
+        """
+        [Method] allNodes
+        Get every node of the map: the Open Street Map nodes followed by the nodes generated to connect the buildings to the roads.
+        
+        Return: [array] list of nodes
+        """
+        nodes = list(self.nodes)
+        known = set(id(node) for node in nodes)
+        for node in self.roadNodes:
+            if id(node) not in known:
+                known.add(id(node))
+                nodes.append(node)
+        return nodes
+        
+    def buildGraph(self, arrays = None):
+        """
+        [Method] buildGraph
+        Build the array backed graph (see RoadGraph) from the nodes. This function needs to be called after recalculateGrid()
+        
+        Parameter:
+            - arrays = [Dict] arrays already describing the nodes of allNodes() in order, kept as they are by the graph (see RoadGraph).
+                       None to read everything from the nodes.
+        
+        Return: [RoadGraph] the graph
+        """
+        nodes = self.allNodes()
+        if arrays is not None and len(arrays["lat"]) != len(nodes):
+            arrays = None
+        self.graph = RoadGraph(nodes, self.buildings, self.roadNodes, arrays, self.projection, self.precision)
+        self.routeTrees.clear()
+        self.routeCache.clear()
+        return self.graph
+    
+    def releaseNodes(self):
+        """
+        [Method] releaseNodes
+        Release the ways, tags and agents containers of the nodes that are neither a part of a road nor a building centroid (see
+        Node.release). Their tags are lost, so this function needs to be called after buildGraph() and after the snapshot is saved.
+        
+        Return: [int] number of released nodes
+        """
+        released = np.flatnonzero(~(self.graph.isRoad | self.graph.isBuildingCentroid))
+        for i in released:
+            self.graph.nodes[i].release()
+        return len(released)
+        
+    def routeTree(self, root):
+        """
+        [Method] routeTree
+        Get the shortest path tree rooted at a node (see RouteTree), it is built on the first request and kept in self.routeTrees
+        
+        Parameter:
+            - root = [int] graph index of the root node
+            
+        Return: [RouteTree] the tree
+        """
+        tree = self.routeTrees.get(root)
+        if tree is None:
+            tree = RouteTree.build(self.graph, root)
+            self.routeTrees.put(tree)
+        return tree
+        
+    def setRouteTreeMemory(self, maxBytes):
+        """
+        [Method] setRouteTreeMemory
+        Set the memory budget of the shortest path tree cache, the least recently used trees are dropped to stay within it
+        
+        Parameter:
+            - maxBytes = [int] budget in bytes
+        """
+        self.routeTrees.setMaxBytes(maxBytes)
 
-    def buildConnectionDict(self, file):
+    def buildContractionHierarchy(self, path = None):
         """
-        [Method] buildConnectionDict
-        Method that creates an dictionary in the format: [Dict[wayID: str, ("min_dist": int, "entryCoordinate": Coordinate)]]
-        that maps the wayIDof the building to an entry coordinate and a minimum distance
+        [Method] buildContractionHierarchy
+        Load or build the contraction hierarchy of the graph (see ContractionHierarchy). This function needs to be called after buildGraph()
+        
+        Parameter:
+            - path = [String] file used to cache the hierarchy, it is only loaded if it was built from the same graph. None to disable the cache.
+            
+        Return: [ContractionHierarchy] the hierarchy
+        """
+        fingerprint = self.graph.fingerprint()
+        self.contraction = ContractionHierarchy.load(path, fingerprint)
+        if self.contraction is None:
+            self.contraction = ContractionHierarchy.build(self.graph)
+            if path is not None:
+                self.contraction.save(path)
+        return self.contraction
 
+    def buildLandmarks(self, path = None, count = None):
+        """
+        [Method] buildLandmarks
+        Load or build the landmark distance tables of the graph (see Landmarks). This function needs to be called after buildGraph()
+        
         Parameter:
-            - file = [FileIO] a file to cache the connections between the roads and buildings 
+            - path = [String] file used to store the tables, they are only loaded if they were built from the same graph. None to disable the file.
+            - count = [int] number of landmarks (default Landmarks.DEFAULT_COUNT), stored tables with another count are rebuilt
+            
+        Return: [Landmarks] the landmarks
+        """
+        self.landmarks = Landmarks.load(path, self.graph.fingerprint())
+        if self.landmarks is not None and count is not None and len(self.landmarks) != count:
+            self.landmarks = None
+        if self.landmarks is None:
+            self.landmarks = Landmarks.build(self.graph) if count is None else Landmarks.build(self.graph, count)
+            if path is not None:
+                self.landmarks.save(path)
+        return self.landmarks
 
-        Return: [Dict[wayID: str, ("min_dist": int, "entryCoordinate": Coordinate)]]
+    def buildConnectionDict(self, cache):
         """
+        [Method] buildConnectionDict
+        Method that creates an dictionary in the format: [Dict[wayID: str, ("road": Road, "entryCoordinate": Coordinate)]]
+        that maps the wayID of the building to its closest road and an entry coordinate
 
-        wayIdDict={}
-        for line in file.readlines():
-            if line[-1:] == "\n": # remove \n at the end of line if necessary
-                line = line[:-1]
-            try:
-                wayID, min_dist, lat, lon = line.split(";")
-                coord = Coordinate(float(lat), float(lon))
-                wayIdDict[wayID] = {"min_dist": int(min_dist), "entryCoordinate": coord}
-            except ValueError:
-                # This exception occurs if the split does not return the correct number of arguments
-                # This means that or the csv is invalid or the line is wrong, in any case the process continues
+        Parameter:
+            - cache = [Dict] the arrays loaded by EntryPointCache.load (or None)
+
+        Return: [Dict[wayID: str, ("road": Road, "entryCoordinate": Coordinate)]]
+        """
+        wayIdDict = {}
+        if cache is None:
+            return wayIdDict
+        for wayID, roadName, lat, lon in zip(cache["wayIds"], cache["roadNames"], cache["lat"].tolist(), cache["lon"].tolist()):
+            road = self.roadsDict.get(roadName)
+            if road is None:
+                # should not happen with a valid cache, recalculate the entry point to be safe
                 continue
+            wayIdDict[wayID] = {"road": road, "entryCoordinate": Coordinate(lat, lon)}
         return wayIdDict
         
     def findPath(self,agent,building):
         """
         [Method] findPath
-        A-star function to find the path from the agent location to the building 
+        A-star function to find the path from the agent location to the building. The routes are kept in self.routeCache (and
+        self.routeStore if it is open) and shared, the agent only gets its own RouteCursor. A building that is not in the connected component of the agent is
+        rejected without a search and a failed search is cached, so the same pair is not searched again. An agent that is already
+        at the building gets a route of one node, it is neither searched nor remembered as a failure.
         
         parameter:
             - agent : [Agent] agent (will be changed to node later to make sure the division between map and simulator)
             - building : [Building] the building 
+            
+        Return: ([float],[RouteCursor]) distance in meters and a cursor at the start of the route, (None, None) if there is no path
         """
-        try:
-            distance = 0
-            sequence = agent.currentNode.getMovementSequence(building.node)            
-            if (sequence is None):
-                #print("No previously calculated sequence is found")
-                distance, sequence = searchPath(self,agent.currentNode,building.node)
-                agent.currentNode.addMovementSequence(sequence.clone())           
-            else:
-                #print("found sequence")
-                distance = sequence.totalDistance
-            return distance, sequence
-        except:
+        if agent.currentNode is None or building is None or building.node is None:
             return None, None
+        origin, destination = agent.currentNode.graphIndex, building.node.graphIndex
+        if origin == destination:
+            return 0.0, RouteCursor(Route(self.graph, [origin], [0.0]))
+        if not self.graph.connected(origin, destination):
+            self.routeCache.reject()
+            return None, None
+        route = self.lookupRoute(origin, destination)
+        if (route is None):
+            distance, sequence = ENGINES[self.searchEngine](self,agent.currentNode,building.node)
+            if sequence is None:
+                self.rememberFailure(origin, destination)
+                return None, None
+            route = Route.fromSequence(self.graph, sequence, distance)
+            self.rememberRoute(route)
+        if route is NO_ROUTE:
+            return None, None
+        return route.totalDistance, RouteCursor(route)
+        
+    def findPaths(self, requests):
+        """
+        [Method] findPaths
+        Find the paths of a batch of requests. The requests are deduplicated, the ones that are not in self.routeCache are grouped
+        by destination and every group is answered by one shortest path tree rooted at the destination (see PathFinder.treePaths).
+        A destination requested only once uses the selected search engine, unless it is "tree". Like findPath, the pairs that are
+        not connected are rejected without a search and the failures are cached. An origin that is already at the building gets
+        a route of one node without a search.
+        
+        Parameter:
+            - requests : [array] list of (origin node, destination building) pairs
+            
+        Return: [array] (distance, RouteCursor) for every request, in the order of the requests ((None, None) if there is no path)
+        """
+        routes = {}
+        groups = {}
+        for originNode, building in requests:
+            if building is None or building.node is None or originNode is None:
+                continue
+            key = (originNode.graphIndex, building.node.graphIndex)
+            if key in routes:
+                continue
+            if key[0] == key[1]:
+                routes[key] = Route(self.graph, [key[0]], [0.0])
+                continue
+            if not self.graph.connected(key[0], key[1]):
+                self.routeCache.reject()
+                routes[key] = NO_ROUTE
+                continue
+            routes[key] = self.lookupRoute(key[0], key[1])
+            if routes[key] is None:
+                groups.setdefault(key[1], []).append(originNode)
+        for destination, originNodes in groups.items():
+            destinationNode = self.graph.node(destination)
+            if len(originNodes) == 1 and self.searchEngine != "tree":
+                distance, sequence = ENGINES[self.searchEngine](self, originNodes[0], destinationNode)
+                found = [(distance, Route.fromSequence(self.graph, sequence, distance) if sequence is not None else None)]
+            else:
+                found = [(distance, Route.fromLengths(self.graph, indices, lengths, distance) if indices is not None else None)
+                         for distance, indices, lengths in treePaths(self, originNodes, destinationNode)]
+            for originNode, (distance, route) in zip(originNodes, found):
+                key = (originNode.graphIndex, destination)
+                if route is None:
+                    routes[key] = NO_ROUTE
+                    self.rememberFailure(key[0], key[1])
+                else:
+                    routes[key] = route
+                    self.rememberRoute(route)
+        results = []
+        for originNode, building in requests:
+            route = None
+            if building is not None and building.node is not None and originNode is not None:
+                route = routes.get((originNode.graphIndex, building.node.graphIndex))
+            if route is None or route is NO_ROUTE:
+                results.append((None, None))
+            else:
+                results.append((route.totalDistance, RouteCursor(route)))
+        return results
+        
+    def lookupRoute(self, origin, destination):
+        """
+        [Method] lookupRoute
+        Get a known route from self.routeCache or, if it is not cached, from self.routeStore (the route is then cached)
+        
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+            
+        Return: [Route] the route, NO_ROUTE if the pair is known to have no route, None if the route is not known
+        """
+        route = self.routeCache.get(origin, destination)
+        if route is None and self.routeStore is not None:
+            route = self.routeStore.get(origin, destination)
+            if route is NO_ROUTE:
+                self.routeCache.putFailure(origin, destination)
+            elif route is not None:
+                self.routeCache.put(route)
+        return route
+        
+    def rememberRoute(self, route):
+        """
+        [Method] rememberRoute
+        Add a new route to self.routeCache and self.routeStore
+        
+        Parameter:
+            - route : [Route] the route
+        """
+        self.routeCache.put(route)
+        if self.routeStore is not None:
+            self.routeStore.put(route)
+            
+    def rememberFailure(self, origin, destination):
+        """
+        [Method] rememberFailure
+        Remember in self.routeCache and self.routeStore that there is no route between two nodes
+        
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+        """
+        self.routeCache.putFailure(origin, destination)
+        if self.routeStore is not None:
+            self.routeStore.putFailure(origin, destination)
+        
+    def shareRoute(self, route):
+        """
+        [Method] shareRoute
+        Add a route to self.routeCache, for example a route found by a worker process. If the same route is already cached
+        the cached instance is returned so every agent taking it shares one object. A route that was not cached is also
+        written to self.routeStore.
+        
+        Parameter:
+            - route : [Route] the route
+            
+        Return: [Route] the shared route
+        """
+        shared = self.routeCache.share(route)
+        if shared is route and self.routeStore is not None:
+            self.routeStore.put(route)
+        return shared
+        
+    def shareFailure(self, origin, destination):
+        """
+        [Method] shareFailure
+        Remember a pair without a route found by a worker process in self.routeCache and, if it was not cached as a failure
+        yet, in self.routeStore
+        
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+            
+        Return: [Bool] True if the failure was not cached yet
+        """
+        if self.routeCache.isFailure(origin, destination):
+            return False
+        self.rememberFailure(origin, destination)
+        return True
+        
+    def openRouteStore(self, path, batchSize = None):
+        """
+        [Method] openRouteStore
+        Open the disk backed route store (see RouteStore), findPath consults it before searching. This function needs to be
+        called after buildGraph()
+        
+        Parameter:
+            - path = [String] path to the database file, None to close the store
+            - batchSize = [int] number of new routes written at once (default RouteStore.DEFAULT_BATCH_SIZE)
+            
+        Return: [RouteStore] the store
+        """
+        self.closeRouteStore()
+        if path is not None:
+            self.routeStore = RouteStore(path, self.graph) if batchSize is None else RouteStore(path, self.graph, batchSize)
+        return self.routeStore
+        
+    def flushRouteStore(self):
+        """
+        [Method] flushRouteStore
+        Write the pending new routes to the route store
+        """
+        if self.routeStore is not None:
+            self.routeStore.flush()
+            
+    def closeRouteStore(self):
+        """
+        [Method] closeRouteStore
+        Write the pending new routes and close the route store
+        """
+        if self.routeStore is not None:
+            self.routeStore.close()
+            self.routeStore = None
+            
+    def routeStats(self):
+        """
+        [Method] routeStats
+        Return: [Dict] the counters of self.routeCache and, if it is open, of self.routeStore
+        """
+        stats = self.routeCache.stats()
+        if self.routeStore is not None:
+            stats.update(self.routeStore.stats())
+        return stats
+        
+    def setRouteCacheMemory(self, maxBytes):
+        """
+        [Method] setRouteCacheMemory
+        Set the memory budget of the route cache, the least recently used routes are dropped to stay within it
+        
+        Parameter:
+            - maxBytes = [int] budget in bytes
+        """
+        self.routeCache.setMaxBytes(maxBytes)
+        
+    def setSearchEngine(self, engine):
+        """
+        [Method] setSearchEngine
+        Choose the path search engine used by findPath
+        
+        Parameter:
+            - engine : [string] "tree" (shortest path trees rooted at the destinations, default), "graph" (A* on the RoadGraph with
+                       precomputed edge lengths), "alt" (A* with landmark bounds), "ch" (contraction hierarchy), "heap" (binary heap A* on the nodes)
+                       or "list" (original sorted list A*), see PathFinder.ENGINES
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"unknown search engine {engine}, expected one of {list(ENGINES)}")
+        self.searchEngine = engine
         
     def summarizeRoad(self):
         """
@@ -402,18 +890,110 @@ class Map(osmium.SimpleHandler):
             [Building] the building
         """
         return random.choice(self.buildingsDict[buildingType])
+    
+    def save_snapshot(self, path, key = ""):
+        """
+        [Method] save_snapshot
+        Save the fully constructed map (nodes, roads, generated connector nodes, buildings and grids) into a binary snapshot file.
+        
+        Parameter:
+            - path = [String] path to the snapshot file
+            - key = [String] snapshot key used to invalidate the snapshot, see Snapshot.snapshotKey
+        """
+        Snapshot.saveMap(self, path, key)
+    
+    @classmethod
+    def load_snapshot(cls, path, key = None, precision = Projection.PROJECTED):
+        """
+        [Method] load_snapshot
+        Load a map saved with save_snapshot. The snapshot arrays are memory-mapped.
+        
+        Parameter:
+            - path = [String] path to the snapshot file
+            - key = [String] expected snapshot key, a ValueError is raised if the snapshot was generated with another key. None to skip the check.
+            - precision = [string] precision mode of the loaded map (see Projection), the one the snapshot key was generated with
+            
+        Return:
+            [Map] the map
+        """
+        header, arrays = Snapshot.readArrays(path)
+        if header.get("version") != Snapshot.VERSION:
+            raise ValueError(f"{path} has snapshot version {header.get('version')}, expected {Snapshot.VERSION}")
+        if key is not None and header.get("key") != key:
+            raise ValueError(f"{path} was generated from another map")
+        loadedMap = cls(tuple(header["gridSize"]), precision)
+        graphArrays = Snapshot.restoreMap(loadedMap, header, arrays)
+        loadedMap.activateProjection()
+        loadedMap.mapHash = header.get("mapHash")
+        loadedMap.buildGraph(graphArrays)
+        return loadedMap
+                    
+def buildingCoordinates(buildings):
+    """
+    [Function] buildingCoordinates
+    Get the centroid coordinates of buildings as arrays
+    
+    Parameter:
+        - buildings : [array] list of buildings
+    
+    Return: ([np.array],[np.array]) latitudes and longitudes
+    """
+    lat = np.fromiter((building.coordinate.lat for building in buildings), dtype=np.float64, count=len(buildings))
+    lon = np.fromiter((building.coordinate.lon for building in buildings), dtype=np.float64, count=len(buildings))
+    return lat, lon
                     
-def readFile(OSMfilePath, buildConnFile="",grid = (10,10),buildingCSV = None):
+def readFile(OSMfilePath, buildConnFile="",grid = (10,10),buildingCSV = None, snapshotFile = None, precision = Projection.PROJECTED, bbox = None, polygon = None, layers = None, contractionFile = None, landmarkFile = None):
     """
     [Function] readFile
     Function to generate map fom osm File
     
     parameter:
-        - OSMfilePath : [string] path to the OSM file
+        - OSMfilePath : [string] path to the OSM file (.osm XML or .osm.pbf, any format osmium can read)
+        - buildConnFile : [string] path to the binary file used to cache the building entry points ("" to disable)
         - grid     : [(int,int)] grid size, default value = (10,10)
+        - buildingCSV : [string] path to the building csv used to retag the buildings
+        - snapshotFile : [string] path to the map snapshot. If the snapshot matches the OSM file, the building csv and the grid size it is loaded, 
+                         otherwise the map is generated and saved there. None to disable.
+        - precision : [string] "projected" to compute distances in the local projection of the map (fast, default) or "geodesic" (see Projection)
+        - bbox : (float,float,float,float) (min lat, min lon, max lat, max lon) to clip the map to while the file is read, None to load everything
+        - polygon : [array] list of (lat,lon) vertices of a polygon to clip the map to, None to load everything
+        - layers : [array] layers to load, a subset of ["roads","buildings","amenities","leisures","naturals"] (see LayerFilter).
+                   The file is read twice: the first pass collects the nodes referenced by the ways of these layers, the second pass
+                   only creates those nodes and ways. Untagged ways (Map.others) are dropped. None to load everything in one pass.
+        - contractionFile : [string] path of the contraction hierarchy cache (see Map.buildContractionHierarchy). The hierarchy is loaded
+                            or built with the map when it is set, None to build it on the first "ch" query.
+        - landmarkFile : [string] path of the landmark distance tables (see Map.buildLandmarks). The tables are loaded or built with the map
+                         when it is set, None to build them on the first "alt" query.
     """
-    generatedMap = Map(grid)
+    Projection.checkPrecision(precision)
+    clip = None
+    if bbox is not None or polygon is not None:
+        clip = ClipArea(bbox, polygon)
+    layerFilter = None
+    if layers is not None:
+        layerFilter = LayerFilter(layers)
+    options = clip.describe() if clip is not None else ""
+    if layerFilter is not None:
+        options += ";layers=" + ",".join(sorted(layerFilter.layers))
+    mapHash = Snapshot.mapHash(OSMfilePath, options)
+    snapshotKey = Snapshot.snapshotKey(mapHash, buildingCSV, grid, f"precision={precision}")
+    if snapshotFile and Snapshot.isValidSnapshot(snapshotFile, snapshotKey):
+        loadedMap = Map.load_snapshot(snapshotFile, snapshotKey, precision)
+        if contractionFile:
+            loadedMap.buildContractionHierarchy(contractionFile)
+        if landmarkFile:
+            loadedMap.buildLandmarks(landmarkFile)
+        loadedMap.releaseNodes()
+        return loadedMap
+    generatedMap = Map(grid, precision)
+    generatedMap.mapHash = mapHash
+    generatedMap.clip = clip
+    if layerFilter is not None:
+        layerFilter.apply_file(OSMfilePath)
+        generatedMap.layerFilter = layerFilter
     generatedMap.apply_file(OSMfilePath)
+    # the referenced node ids are only needed by the second pass
+    generatedMap.layerFilter = None
     generatedMap.setBounds(OSMfilePath)
     generatedMap.generateGrid()
     generatedMap.mapNodesToGrid()
@@ -421,4 +1001,12 @@ def readFile(OSMfilePath, buildConnFile="",grid = (10,10),buildingCSV = None):
     generatedMap.recalculateGrid(buildConnFile)
     if buildingCSV is not None:
         generatedMap.generateRandomBuildingType(buildingCSV)
+    generatedMap.buildGraph()
+    if snapshotFile:
+        generatedMap.save_snapshot(snapshotFile, snapshotKey)
+    if contractionFile:
+        generatedMap.buildContractionHierarchy(contractionFile)
+    if landmarkFile:
+        generatedMap.buildLandmarks(landmarkFile)
+    generatedMap.releaseNodes()
     return generatedMap
@@ -12,29 +12,34 @@ class MovementSequence:
         - totalDistance            : [Float] total distance in meters
         - passedThroughDistance    : [Float] distance we traveled in this movementVector
         - currentTraversedDistance : [Float] how far we traversed in this sequence
-        - finished                 : [Bool] is the whole sequence traveled?
+        - finished                 : [Bool] is the whole sequence traveled? (True from the start for an empty sequence)
         - currentNode              : [Node] currentNode traversed
         - lastNode                 : [Node] last node traversed
     """
     
-    def __init__(self,sequence,totalDistance):
+    def __init__(self,sequence,totalDistance,origin=None):
         """
         [Constructor]    
         Generate Unused MovementSequence.
         
         Parameter:
-            - sequence      : [MovementVector] array of MovementVectors
+            - sequence      : [MovementVector] array of MovementVectors, empty if the origin is already the destination
             - totalDistance : [Float] total distance in meters
+            - origin        : [Node] the starting node, only needed (and used) when the sequence is empty
         """
         self.sequence = sequence
-        self.origin = sequence[0].startingNode
-        self.destination = sequence[-1].destinationNode
+        if len(sequence) == 0:
+            self.origin = origin
+            self.destination = origin
+        else:
+            self.origin = sequence[0].startingNode
+            self.destination = sequence[-1].destinationNode
         self.currentActiveVector = None
         self.totalDistance = totalDistance
         self.currentTraversedDistance = 0
-        self.finished = False
-        self.currentNode = sequence[0].startingNode
-        self.lastNode = sequence[0].startingNode
+        self.finished = len(sequence) == 0
+        self.currentNode = self.origin
+        self.lastNode = self.origin
         self.new = True
         
     def step(self,distances):
@@ -49,6 +54,10 @@ class MovementSequence:
             - [float] the leftover of the distance            
         """
         self.new = False
+        if self.currentActiveVector is None and self.sequence.__len__() == 0:
+            # empty sequence, we're already at the destination
+            self.finished = True
+            return distances
         # pop from array of sequence to the current active vector
         if (self.currentActiveVector is None or self.currentActiveVector.finished) and self.sequence.__len__()>0:
             self.currentActiveVector = self.sequence.pop(0)     
@@ -78,6 +87,8 @@ class MovementSequence:
             - (lat,lon) the translation vector in latitude and longitude
             
         """
+        if self.currentActiveVector is None:
+            return (self.origin.coordinate.lat - currentPosition.lat, self.origin.coordinate.lon - currentPosition.lon)
         return self.currentActiveVector.calculateTranslation(currentPosition)
     
     def getCurrentPosition(self):
@@ -89,6 +100,8 @@ class MovementSequence:
             - [Coordinate] current location based on currentActiveVector.
             
         """
+        if self.currentActiveVector is None:
+            return self.origin.coordinate.getLatLon()
         return self.currentActiveVector.currentPosition
     
     def extract(self):
@@ -118,7 +131,7 @@ class MovementSequence:
         temp = []
         for x in self.sequence:
             temp.append(x.clone())
-        return MovementSequence(temp,self.totalDistance)
+        return MovementSequence(temp,self.totalDistance,self.origin)
 
 def reconstruct(nodesDictionary, sequences, totalDistance):
     """
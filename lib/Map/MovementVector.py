@@ -1,4 +1,4 @@
-import geopy.distance as gdistance
+from . import Projection
 class MovementVector:
     """
     [Class] MovementVector
@@ -16,7 +16,7 @@ class MovementVector:
         - finished              : [Bool] is the whole vector traveled?
         - progress              : [Float] passedThroughDistance divided by totalTranslation
     """
-    def __init__(self,startingNode, destinationNode ):
+    def __init__(self,startingNode, destinationNode, distance = None):
         """
         [Constructor]    
         Generate Unused MovementVector.
@@ -24,12 +24,15 @@ class MovementVector:
         Parameter:
             - startingNode    : [Node] the starting node of this movementVector
             - destinationNode : [Node] the destination node of this movementVector
+            - distance        : [Float] precomputed distance in meters (for example the RoadGraph edge weight), calculated if None
         """
         self.startingNode = startingNode
         self.destinationNode = destinationNode
         self.starting = startingNode.coordinate.getLatLon()
         self.destination = destinationNode.coordinate.getLatLon()
-        self.distance = gdistance.distance(self.starting,self.destination).km*1000
+        self.distance = distance
+        if self.distance is None:
+            self.distance = Projection.distance(self.starting,self.destination)
         if(self.distance == 0):
             print(startingNode)
             print(destinationNode)
@@ -103,5 +106,5 @@ class MovementVector:
         return :
             - [MovementVector] copy of this movement vector       
         """
-        return MovementVector(self.startingNode,self.destinationNode)
+        return MovementVector(self.startingNode,self.destinationNode,self.distance)
             
\ No newline at end of file
@@ -1,3 +1,4 @@
+from types import MappingProxyType
 from .Coordinate import Coordinate
 
 class Node():    
@@ -13,9 +14,13 @@ class Node():
         - ways              : A dictionary of Open Street Map Ways.
         - tags              : A dictionary of the Map Feature of this object (check Open Street Map - Map Features).
         - grid              : [Grid] The grid this node is in
-        - movementSequences : [MovementSequence] Dictionary of previously generated movementSequences destination id is the key
         - agents            : [Agents] agents in this node (might replace it later with something)
+        - graphIndex        : [int] index of this node in the map's RoadGraph (None until the graph is built)
     """
+    __slots__ = ("osmId", "coordinate", "isRoad", "connections", "ways", "tags", "grid", "agents", "isBuildingCentroid", "building", "graphIndex")
+    # shared read-only containers of the released nodes (see release)
+    NO_ENTRIES = MappingProxyType({})
+    NO_AGENTS = ()
     
     def __init__(self):
         """
@@ -29,10 +34,10 @@ class Node():
         self.ways = {}
         self.tags = {}
         self.grid = None
-        self.movementSequences = {}
         self.agents = []
         self.isBuildingCentroid = False
         self.building = None
+        self.graphIndex = None
         
     def fill(self, osmNode):
         """
@@ -110,6 +115,8 @@ class Node():
         Parameter:
             - agent = [Object] Any agent
         """
+        if self.agents is Node.NO_AGENTS:
+            self.agents = []
         self.agents.append(agent)
         
     def removeAgent(self,agent):
@@ -121,6 +128,18 @@ class Node():
             - connection = [Node] The node (not osmium "Node", osmium "Node" is deleted after the loop).
         """
         self.agents.remove(agent)
+
+    def release(self):
+        """
+        [Method] release
+        Replace the ways, tags and agents containers by shared empty read-only ones. Used for the nodes that are neither a part of a
+        road nor a building centroid once the map is built, nothing reads these containers afterwards and agents never stand there
+        (the node still accepts an agent, see addAgent).
+        """
+        self.ways = Node.NO_ENTRIES
+        self.tags = Node.NO_ENTRIES
+        if len(self.agents) == 0:
+            self.agents = Node.NO_AGENTS
             
     def __str__(self):        
         """
@@ -148,32 +167,6 @@ class Node():
         """
         return self.coordinate.calculateDistance(targetNode.coordinate)
         
-    def addMovementSequence(self,sequence):
-        """
-        [Method] addMovementSequence
-        save a calculated sequence to our node
-        
-        Parameter:
-            - sequence : [MovementSequence] the movement sequence
-        """
-        #print(sequence.destination.osmId)
-        self.movementSequences[sequence.destination.osmId]  = sequence
-        
-    def getMovementSequence(self,targetNode):
-        """
-        [Method] getMovementSequence
-        get the previously generated movementSequence (return none if not found)
-        
-        Parameter:
-            - targetNode: the destinationNode
-            
-        return: [MovementSequence] a clone of the previously generated movement sequence or None 
-        """
-        #print(targetNode.osmId)
-        if (targetNode.osmId in self.movementSequences.keys()):
-            return self.movementSequences[targetNode.osmId].clone()
-        return None
-
     def setBuilding(self,building):
         self.building = building
         self.isBuildingCentroid = True
\ No newline at end of file
@@ -1,4 +1,5 @@
-import geopy.distance as distance
+import heapq
+import math
 from .MovementVector import MovementVector
 from .MovementSequence import MovementSequence
 
@@ -12,12 +13,14 @@ class AStarNode():
         - h             : [float] the heuristic estimated cost from this node to the target node.
         - f             : [float] lowest cost in the neighbor of this node
         - position      : [Coordinate] the coordinate of this node
+        - osmMap        : [Map] the map, its projection and precision mode are used for the distances (see Map.distance)
         - name          : name of this node
         - node          : [Node] the node object this object refers to
         - visited       : [Bool] is this node visited before?
         - prevNode      : [AStarNode] the previous node
+        - entry         : [int] counter of the latest open list entry of this node (used by searchPathHeap)
     """
-    def __init__(self,node,targetNode):
+    def __init__(self,node,targetNode,osmMap):
         """
         [Constructor]    
         Generate Unvisited AStarNode.
@@ -25,15 +28,18 @@ class AStarNode():
         Parameter:
             - node       : [Node] the OSM node this class represent
             - targetNode : [Node] the OSM node which is this class targeted goal
+            - osmMap     : [Map] the map the nodes belong to
         """
         self.g = 0
         self.h = 0
         self.position = node.coordinate
+        self.osmMap = osmMap
         self.name = node.osmId
         self.node = node
         self.visited = False
         self.prevNode = None
-        dft =  distance.distance(self.position.getLatLon(), targetNode.coordinate.getLatLon()).km * 1000
+        self.entry = None
+        dft =  osmMap.distance(self.position.getLatLon(), targetNode.coordinate.getLatLon())
         self.h = dft
         self.f = self.g + self.h
         self.g = -1
@@ -50,7 +56,7 @@ class AStarNode():
             distanceToPrevious = 0
             distanceFromOrigin = 0
             distanceToPrevious = prevNode.g
-            distanceFromOrigin = distance.distance(self.position.getLatLon(), prevNode.position.getLatLon()).km * 1000
+            distanceFromOrigin = self.osmMap.distance(self.position.getLatLon(), prevNode.position.getLatLon())
             distanceFromOrigin += distanceToPrevious
             if (self.g > distanceFromOrigin or self.g == -1):
                 self.g = distanceFromOrigin
@@ -80,7 +86,7 @@ def searchPath(osmMap, originNode, destinationNode, limit = None):
     distance = -1
     
     #insert starting node as the initial node
-    startingNode = AStarNode(originNode,destinationNode)
+    startingNode = AStarNode(originNode,destinationNode,osmMap)
     workingList.append(startingNode)
     
     #setup known blocked cells
@@ -105,7 +111,7 @@ def searchPath(osmMap, originNode, destinationNode, limit = None):
                 if (temp is None or temp not in visited):
                     #if not created, create it
                     if temp is None:
-                        temp = AStarNode(x,destinationNode)
+                        temp = AStarNode(x,destinationNode,osmMap)
                         quicksearch[temp.name] = temp
                     #calculate value
                     prevValue = temp.f
@@ -120,7 +126,7 @@ def searchPath(osmMap, originNode, destinationNode, limit = None):
                         distance = finalNode.f
                         while backtracking != startingNode:
                             #create movement vector
-                            movement = MovementVector(backtracking.prevNode.node, backtracking.node)
+                            movement = MovementVector(backtracking.prevNode.node, backtracking.node, backtracking.g - backtracking.prevNode.g)
                             backtracking = backtracking.prevNode
                             path.insert(0,movement)
                         found = True
@@ -151,4 +157,342 @@ def searchPath(osmMap, originNode, destinationNode, limit = None):
             break   
     return distance, sequence
 
-   
\ No newline at end of file
+def backtrack(startingNode, finalNode):
+    """
+    [Function] backtrack
+    Create the movement sequence of a path found by the search.
+    
+    Parameter:
+        - startingNode : [AStarNode] the node the search started from
+        - finalNode    : [AStarNode] the node of the destination
+        
+    Return : [MovementSequence] the movementSequence
+    """
+    path = []
+    backtracking = finalNode
+    while backtracking != startingNode:
+        path.append(MovementVector(backtracking.prevNode.node, backtracking.node, backtracking.g - backtracking.prevNode.g))
+        backtracking = backtracking.prevNode
+    path.reverse()
+    return MovementSequence(path, finalNode.f)
+
+def searchPathHeap(osmMap, originNode, destinationNode, limit = None):
+    """
+    [Function] searchPathHeap
+    Same search as searchPath with a binary heap as the open list and a set as the closed list, O(E log V) instead of quadratic.
+    The routes are identical to searchPath: entries with the same f are expanded in insertion order (the heap is keyed on (f, counter)),
+    a node that is updated gets a new entry and the previous one is skipped when it is popped (lazy deletion), and the search stops
+    as soon as the destination is reached from a neighbor.
+        
+    Parameter:
+        - originNode      : [Node] the node we start from.
+        - destinationNode : [Node] the node we want to reach.
+        - limit           : [Float] Distance in meter to ignore nodes that is too far from the previous nodes (default = None)
+        
+    Return :
+        - [Float] Distance in meters (-1 if no path is found)
+        - [MovementSequence] the movementSequence (None if no path is found)
+    """
+    quicksearch = {}
+    visited = set()
+    counter = 0
+    
+    #insert starting node as the initial node
+    startingNode = AStarNode(originNode,destinationNode,osmMap)
+    startingNode.entry = counter
+    workingList = [(startingNode.f, counter, startingNode)]
+    
+    while len(workingList) > 0:
+        f, entry, workingNode = heapq.heappop(workingList)
+        if entry != workingNode.entry:
+            #outdated entry, the node was pushed again later
+            continue
+        workingNode.visited = True
+        visited.add(workingNode)
+        if limit is not None and workingNode.f >= limit:
+            continue
+        for x in workingNode.node.connections:
+            temp = quicksearch.get(x.osmId)
+            if temp is not None and temp in visited:
+                continue
+            if temp is None:
+                temp = AStarNode(x,destinationNode,osmMap)
+                quicksearch[temp.name] = temp
+            temp.calculateFrom(workingNode)
+            
+            #if destination reached
+            if (x == destinationNode):
+                return temp.f, backtrack(startingNode, temp)
+            
+            #(re)insert the node after the entries with the same value
+            counter += 1
+            temp.entry = counter
+            heapq.heappush(workingList, (temp.f, counter, temp))
+    return -1, None
+
+def searchGraph(osmMap, originNode, destinationNode, limit = None):
+    """
+    [Function] searchGraph
+    A* search on the array backed graph of the map (see RoadGraph): the edge lengths are precomputed when the graph is built and
+    the heuristic is the straight line distance between the projected coordinates, so no distance is calculated at query time.
+    The search stops when the destination is taken out of the open list, the path is the shortest one.
+        
+    Parameter:
+        - osmMap          : [Map] the map, Map.graph must be built
+        - originNode      : [Node] the node we start from.
+        - destinationNode : [Node] the node we want to reach.
+        - limit           : [Float] Distance in meter to ignore nodes that is too far from the previous nodes (default = None)
+        
+    Return :
+        - [Float] Distance in meters (-1 if no path is found)
+        - [MovementSequence] the movementSequence (None if no path is found, empty if the origin is already the destination)
+    """
+    graph = osmMap.graph
+    adjacency, positions = graph.adjacencyLists()
+    origin = originNode.graphIndex
+    destination = destinationNode.graphIndex
+    targetX, targetY = positions[destination]
+    scale = graph.heuristicScale
+    distances = {origin: 0.0}
+    previous = {origin: None}
+    closed = set()
+    x, y = positions[origin]
+    workingList = [(math.hypot(x - targetX, y - targetY) * scale, origin)]
+    while len(workingList) > 0:
+        f, current = heapq.heappop(workingList)
+        if current in closed:
+            continue
+        if current == destination:
+            return distances[current], graphSequence(graph, previous, destination)
+        closed.add(current)
+        if limit is not None and f >= limit:
+            continue
+        g = distances[current]
+        for neighbor, weight in adjacency[current]:
+            cost = g + weight
+            if neighbor in closed or cost >= distances.get(neighbor, math.inf):
+                continue
+            distances[neighbor] = cost
+            previous[neighbor] = (current, weight)
+            x, y = positions[neighbor]
+            heapq.heappush(workingList, (cost + math.hypot(x - targetX, y - targetY) * scale, neighbor))
+    return -1, None
+
+def searchLandmarks(osmMap, originNode, destinationNode, limit = None):
+    """
+    [Function] searchLandmarks
+    A* search on the array backed graph of the map like searchGraph, the heuristic is the best of the straight line distance and
+    the landmark lower bounds (see Landmarks). The landmarks are built on the first query if the map does not have them yet
+    (see Map.buildLandmarks). Queries between nodes that are not connected are rejected before the search.
+        
+    Parameter:
+        - osmMap          : [Map] the map, Map.graph must be built
+        - originNode      : [Node] the node we start from.
+        - destinationNode : [Node] the node we want to reach.
+        - limit           : [Float] Distance in meter to ignore nodes that is too far from the previous nodes (default = None)
+        
+    Return :
+        - [Float] Distance in meters (-1 if no path is found)
+        - [MovementSequence] the movementSequence (None if no path is found, empty if the origin is already the destination)
+    """
+    if osmMap.landmarks is None:
+        osmMap.buildLandmarks()
+    graph = osmMap.graph
+    landmarks = osmMap.landmarks
+    adjacency, positions = graph.adjacencyLists()
+    rows = landmarks.rows()
+    origin = originNode.graphIndex
+    destination = destinationNode.graphIndex
+    active = landmarks.activeLandmarks(origin, destination)
+    if landmarks.bound(origin, destination, active) == math.inf:
+        return -1, None
+    targetX, targetY = positions[destination]
+    targetRow = [rows[destination][i] for i in active]
+    scale = graph.heuristicScale
+    distances = {origin: 0.0}
+    previous = {origin: None}
+    closed = set()
+    workingList = [(0.0, origin)]
+    while len(workingList) > 0:
+        f, current = heapq.heappop(workingList)
+        if current in closed:
+            continue
+        if current == destination:
+            return distances[current], graphSequence(graph, previous, destination)
+        closed.add(current)
+        if limit is not None and f >= limit:
+            continue
+        g = distances[current]
+        for neighbor, weight in adjacency[current]:
+            cost = g + weight
+            if neighbor in closed or cost >= distances.get(neighbor, math.inf):
+                continue
+            distances[neighbor] = cost
+            previous[neighbor] = (current, weight)
+            x, y = positions[neighbor]
+            h = math.hypot(x - targetX, y - targetY) * scale
+            row = rows[neighbor]
+            for i, b in zip(active, targetRow):
+                a = row[i]
+                if a >= 0 and b >= 0 and abs(a - b) > h:
+                    h = abs(a - b)
+            heapq.heappush(workingList, (cost + h, neighbor))
+    return -1, None
+
+def graphSequence(graph, previous, destination):
+    """
+    [Function] graphSequence
+    Create the movement sequence of a path found by searchGraph, the vectors reuse the precomputed edge lengths. The sequence
+    is empty if the path is only the destination.
+    
+    Parameter:
+        - graph       : [RoadGraph] the graph
+        - previous    : [Dict] node index -> (previous node index on the path, length of the edge between them)
+        - destination : [int] index of the destination node
+        
+    Return : [MovementSequence] the movementSequence
+    """
+    path = []
+    totalDistance = 0.0
+    current = destination
+    while previous[current] is not None:
+        start, length = previous[current]
+        path.append(MovementVector(graph.node(start), graph.node(current), length))
+        totalDistance += length
+        current = start
+    if len(path) == 0:
+        return MovementSequence([], 0.0, graph.node(destination))
+    path.reverse()
+    return MovementSequence(path, totalDistance)
+
+def searchContraction(osmMap, originNode, destinationNode, limit = None):
+    """
+    [Function] searchContraction
+    Shortest path query on the contraction hierarchy of the map (see ContractionHierarchy), built on the first query if the map
+    does not have one yet (see Map.buildContractionHierarchy).
+        
+    Parameter:
+        - osmMap          : [Map] the map, Map.graph must be built
+        - originNode      : [Node] the node we start from.
+        - destinationNode : [Node] the node we want to reach.
+        - limit           : ignored, kept for the engine interface
+        
+    Return :
+        - [Float] Distance in meters (-1 if no path is found)
+        - [MovementSequence] the movementSequence (None if no path is found, empty if the origin is already the destination)
+    """
+    if osmMap.contraction is None:
+        osmMap.buildContractionHierarchy()
+    graph = osmMap.graph
+    distance, indices, lengths = osmMap.contraction.query(originNode.graphIndex, destinationNode.graphIndex)
+    if distance is None:
+        return -1, None
+    if len(lengths) == 0:
+        return 0.0, MovementSequence([], 0.0, graph.node(indices[0]))
+    path = [MovementVector(graph.node(start), graph.node(end), length) for start, end, length in zip(indices[:-1], indices[1:], lengths)]
+    totalDistance = sum(lengths)
+    return totalDistance, MovementSequence(path, totalDistance)
+
+def treeRoot(destinationNode):
+    """
+    [Function] treeRoot
+    Get the node the route tree of a destination is rooted at: the entry node for a building centroid (every building
+    connected to the same entry node shares the tree), the destination itself otherwise.
+    
+    Parameter:
+        - destinationNode : [Node] the destination
+        
+    Return: [Node] the root node
+    """
+    if destinationNode.isBuildingCentroid and len(destinationNode.connections) == 1:
+        return destinationNode.connections[0]
+    return destinationNode
+
+def treePaths(osmMap, originNodes, destinationNode):
+    """
+    [Function] treePaths
+    Routes from several origins to one destination, all answered by the shortest path tree rooted at the destination
+    (see RouteTree and Map.routeTree).
+        
+    Parameter:
+        - osmMap          : [Map] the map, Map.graph must be built
+        - originNodes     : [array] the nodes we start from.
+        - destinationNode : [Node] the node we want to reach.
+        
+    Return : [array] (distance, indices, lengths) for every origin: distance in meters (-1 if no path is found), graph indices
+             of the nodes of the route and length of every edge (None if no path is found). An origin that is already at the
+             destination gets the explicit empty route (0.0, [origin], []).
+    """
+    graph = osmMap.graph
+    root = treeRoot(destinationNode).graphIndex
+    tree = osmMap.routeTree(root)
+    destination = destinationNode.graphIndex
+    results = []
+    for originNode in originNodes:
+        distance, indices, lengths = tree.path(originNode.graphIndex)
+        if distance is None:
+            results.append((-1, None, None))
+            continue
+        if root != destination and indices[-1] != destination:
+            if len(indices) > 1 and indices[-2] == destination:
+                # the origin is the building of the destination itself, going to the entry node and back is not a path
+                indices, lengths = indices[:-1], lengths[:-1]
+            else:
+                indices.append(destination)
+                lengths.append(graph.edgeLength(root, destination))
+        results.append((float(sum(lengths)), indices, lengths))
+    return results
+
+def searchTree(osmMap, originNode, destinationNode, limit = None):
+    """
+    [Function] searchTree
+    Follow the shortest path tree rooted at the destination (see RouteTree). The tree is built the first time the destination
+    is requested and kept in the memory bounded Map.routeTrees cache, the later queries only follow the next pointers.
+        
+    Parameter:
+        - osmMap          : [Map] the map, Map.graph must be built
+        - originNode      : [Node] the node we start from.
+        - destinationNode : [Node] the node we want to reach.
+        - limit           : ignored, kept for the engine interface
+        
+    Return :
+        - [Float] Distance in meters (-1 if no path is found)
+        - [MovementSequence] the movementSequence (None if no path is found, empty if the origin is already the destination)
+    """
+    graph = osmMap.graph
+    distance, indices, lengths = treePaths(osmMap, [originNode], destinationNode)[0]
+    if indices is None:
+        return -1, None
+    if len(lengths) == 0:
+        return 0.0, MovementSequence([], 0.0, graph.node(indices[0]))
+    path = [MovementVector(graph.node(start), graph.node(end), length) for start, end, length in zip(indices[:-1], indices[1:], lengths)]
+    return distance, MovementSequence(path, distance)
+
+def sameNodeGuard(engine):
+    """
+    [Function] sameNodeGuard
+    Wrap a search engine so a query whose origin is already the destination gets the empty MovementSequence of length 0.0
+    without a search, whatever the engine.
+    
+    Parameter:
+        - engine : [function] search engine, (osmMap, originNode, destinationNode, limit) -> (distance, sequence)
+        
+    Return: [function] the engine with the same interface
+    """
+    def search(osmMap, originNode, destinationNode, limit = None):
+        if originNode is destinationNode:
+            return 0.0, MovementSequence([], 0.0, originNode)
+        return engine(osmMap, originNode, destinationNode, limit)
+    search.__name__ = engine.__name__
+    search.__doc__ = engine.__doc__
+    return search
+
+# search engines that can be selected with Map.setSearchEngine
+ENGINES = {name: sameNodeGuard(engine) for name, engine in {
+    "list": searchPath,
+    "heap": searchPathHeap,
+    "graph": searchGraph,
+    "ch": searchContraction,
+    "alt": searchLandmarks,
+    "tree": searchTree,
+}.items()}
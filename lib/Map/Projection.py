@@ -0,0 +1,170 @@
+"""
+Distance engine of the map.
+
+By default distances are computed in a local equirectangular projection on the WGS84 ellipsoid centered on the map origin:
+    x = N(lat0) * cos(lat0) * (lon - lon0)      N = prime vertical radius of curvature at lat0
+    y = M(lat0) * (lat - lat0)                  M = meridional radius of curvature at lat0
+and the distance is the euclidean distance in (x,y), which only needs a few multiplications.
+
+Error bound: the relative error against the geodesic distance grows with the distance D of the points from the origin
+and with the latitude, approximately (D / 6371 km) * tan(|lat0|). Worst case over the directions for 100 m segments,
+measured against geopy's geodesic:
+    - lat0 = 35.7 (Tokyo)  : < 0.06% within 5 km, < 0.12% within 10 km, < 0.29% within 25 km of the origin
+    - lat0 = 60            : < 0.14% within 5 km, < 0.28% within 10 km, < 0.69% within 25 km of the origin
+For the short road segments used by the simulation the absolute error is a few centimeters.
+
+The projection and the precision mode are attributes of the Map (Map.projection, Map.precision) and are passed explicitly to
+distance() and distances(), every map loaded in the same process keeps its own.
+Geodesic distance (geopy) stays available as an opt-in precision mode, see readFile(precision = ...).
+"""
+import math
+import numpy as np
+import geopy.distance as gdistance
+
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+PROJECTED = "projected"
+GEODESIC = "geodesic"
+
+def metersPerDegree(lat):
+    """
+    [Function] metersPerDegree
+    Length of one degree of latitude and of longitude on the WGS84 ellipsoid (floats or numpy arrays)
+
+    Parameter:
+        - lat : latitude
+
+    Return: (meters per degree of latitude, meters per degree of longitude)
+    """
+    sinLat = np.sin(np.radians(lat))
+    denominator = 1 - WGS84_E2 * sinLat * sinLat
+    meridional = WGS84_A * (1 - WGS84_E2) / denominator ** 1.5
+    primeVertical = WGS84_A / np.sqrt(denominator)
+    return meridional * math.pi / 180, primeVertical * np.cos(np.radians(lat)) * math.pi / 180
+
+class LocalProjection():
+    """
+    [Class] LocalProjection
+    Local equirectangular projection around an origin coordinate.
+
+    Properties:
+        - origin         : (float,float) latitude and longitude of the projection origin
+        - metersPerDegLat: [float] meters per degree of latitude at the origin
+        - metersPerDegLon: [float] meters per degree of longitude at the origin
+    """
+    def __init__(self, lat, lon):
+        """
+        [Constructor]
+        Initialize the projection
+
+        Parameter:
+            - lat : [float] latitude of the origin
+            - lon : [float] longitude of the origin
+        """
+        self.origin = (lat, lon)
+        perLat, perLon = metersPerDegree(lat)
+        self.metersPerDegLat = float(perLat)
+        self.metersPerDegLon = float(perLon)
+
+    def project(self, lat, lon):
+        """
+        [Method] project
+        Project coordinates (floats or numpy arrays) into meters.
+
+        Parameter:
+            - lat : latitude
+            - lon : longitude
+
+        Return: (x, y) east and north in meters from the origin
+        """
+        return (lon - self.origin[1]) * self.metersPerDegLon, (lat - self.origin[0]) * self.metersPerDegLat
+
+    def unproject(self, x, y):
+        """
+        [Method] unproject
+        Reverse of project.
+
+        Return: (lat, lon)
+        """
+        return self.origin[0] + y / self.metersPerDegLat, self.origin[1] + x / self.metersPerDegLon
+
+    def distance(self, latLon1, latLon2):
+        """
+        [Method] distance
+        Distance between two (lat,lon) tuples in meters
+
+        Return: [float] distance in meters
+        """
+        dy = (latLon1[0] - latLon2[0]) * self.metersPerDegLat
+        dx = (latLon1[1] - latLon2[1]) * self.metersPerDegLon
+        return math.sqrt(dx * dx + dy * dy)
+
+    def distances(self, lat1, lon1, lat2, lon2):
+        """
+        [Method] distances
+        Vectorized distance between arrays of coordinates in meters
+
+        Return: [np.array] distances in meters
+        """
+        dy = (np.asarray(lat1) - np.asarray(lat2)) * self.metersPerDegLat
+        dx = (np.asarray(lon1) - np.asarray(lon2)) * self.metersPerDegLon
+        return np.sqrt(dx * dx + dy * dy)
+
+def checkPrecision(precision):
+    """
+    [Function] checkPrecision
+    Check a precision mode
+
+    Parameter:
+        - precision : [string] "projected" (fast local projection) or "geodesic" (geopy ellipsoidal geodesic)
+
+    Return: [string] the precision, a ValueError is raised if it is unknown
+    """
+    if precision not in (PROJECTED, GEODESIC):
+        raise ValueError(f"unknown precision {precision}, expected '{PROJECTED}' or '{GEODESIC}'")
+    return precision
+
+def distance(latLon1, latLon2, projection = None, precision = PROJECTED):
+    """
+    [Function] distance
+    Distance between two (lat,lon) tuples
+
+    Parameter:
+        - latLon1    : (float,float) first coordinate
+        - latLon2    : (float,float) second coordinate
+        - projection : [LocalProjection] the projection of the map (None to use a projection around the points themselves)
+        - precision  : [string] "projected" or "geodesic"
+
+    Return: [float] distance in meters
+    """
+    if precision == GEODESIC:
+        return gdistance.distance(latLon1, latLon2).km * 1000
+    if projection is None:
+        projection = LocalProjection((latLon1[0] + latLon2[0]) / 2, 0.0)
+    return projection.distance(latLon1, latLon2)
+
+def distances(lat1, lon1, lat2, lon2, projection = None, precision = PROJECTED):
+    """
+    [Function] distances
+    Vectorized distance between arrays of coordinates
+
+    Parameter:
+        - lat1, lon1 : [np.array] first coordinates
+        - lat2, lon2 : [np.array] second coordinates
+        - projection : [LocalProjection] the projection of the map (None to use a projection around the points themselves)
+        - precision  : [string] "projected" or "geodesic"
+
+    Return: [np.array] distances in meters
+    """
+    if precision == GEODESIC:
+        return np.array([gdistance.distance(a, b).km * 1000 for a, b in zip(zip(lat1, lon1), zip(lat2, lon2))], dtype=np.float64)
+    if projection is None:
+        lat1 = np.asarray(lat1, dtype=np.float64)
+        lat2 = np.asarray(lat2, dtype=np.float64)
+        perLat, perLon = metersPerDegree((lat1 + lat2) / 2)
+        dy = (lat1 - lat2) * perLat
+        dx = (np.asarray(lon1) - np.asarray(lon2)) * perLon
+        return np.sqrt(dx * dx + dy * dy)
+    return projection.distances(lat1, lon1, lat2, lon2)
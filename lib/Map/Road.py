@@ -1,4 +1,3 @@
-import geopy.distance as distance
 import math
 from .Coordinate import Coordinate
 from .Node import Node
@@ -11,7 +10,8 @@ class Road:
         - name : road name.
         - start : [Node] starting node.
         - destination : [Node] destination node.
-        - distance : road length
+        - way : [Way] the Open Street Map way this road is part of
+        - length : road length in meters
         - buildings : buildings in this road
         - type : road type
         - width : the render width
@@ -19,7 +19,7 @@ class Road:
         - color : the color of the road (renderer related)
         - lanes : the number of lane
     """
-    def __init__(self,origin, dest, way = None):
+    def __init__(self,origin, dest, way = None, length = None):
         """
         [Constructor]
         Initialize road.
@@ -27,9 +27,14 @@ class Road:
         Parameter:
             - origin = [Node] starting node
             - dest = [Node] destination node
+            - way = [Way] the Open Street Map way this road is part of
+            - length = [float] precalculated road length in meters (calculated from the nodes if None)
         """       
         self.name,self.start,self.destination = genName(origin,dest)
-        self.length = self.start.calculateDistance(dest)
+        self.way = way
+        if length is None:
+            length = self.start.calculateDistance(self.destination)
+        self.length = length
         self.buildings = []
         self.type = "Other"
         self.width = 4
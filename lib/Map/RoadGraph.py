@@ -0,0 +1,297 @@
+import sys
+import hashlib
+import numpy as np
+from .Node import Node
+from . import Projection
+
+class RoadGraph():
+    """
+    [Class] RoadGraph
+    Compact, array backed representation of the map graph. Every node gets an integer index, the coordinates and flags are stored
+    in NumPy arrays and the connections are stored as a CSR adjacency (indptr, indices) with precomputed edge lengths.
+    The Node objects stay available as a view through RoadGraph.nodes / RoadGraph.node(), the index of a node is kept in
+    node.graphIndex.
+
+    Properties:
+        - nodes              : [array] list of Node objects, the position in the list is the node index
+        - lat                : [np.array] float64 latitude of every node
+        - lon                : [np.array] float64 longitude of every node
+        - isRoad             : [np.array] bool, True if the node is a part of a road (tagged as road or a member of Map.roadNodes)
+        - isBuildingCentroid : [np.array] bool, True if the node is a building centroid
+        - building           : [np.array] int32, index of the building in Map.buildings for building centroids, -1 otherwise
+        - indptr             : [np.array] int64 CSR pointer, the neighbors of node i are indices[indptr[i]:indptr[i+1]]
+        - indices            : [np.array] int32 CSR neighbor indices
+        - weights            : [np.array] float64 edge lengths in meters, aligned with indices
+        - projection         : [LocalProjection] projection the distances are computed in (see Projection)
+        - precision          : [string] precision mode of the distances, "projected" or "geodesic" (see Projection)
+        - x, y               : [np.array] float64 projected coordinates in meters (see Projection), used by the search heuristic
+        - heuristicScale     : [float] factor applied to the projected straight line distance so the heuristic never overestimates the edge lengths
+        - component          : [np.array] int32 connected component of every node, two nodes are connected if they have the same component
+    """
+    def __init__(self, nodes, buildings = None, roadNodes = None, arrays = None, projection = None, precision = Projection.PROJECTED):
+        """
+        [Constructor]
+        Build the graph from Node objects. The node.connections lists define the edges.
+
+        Parameter:
+            - nodes     : [array] list of Node objects (every node referenced by a connection must be in the list)
+            - buildings : [array] list of Building objects, used to fill the building array
+            - roadNodes : [array] list of Node objects that are part of a road
+            - arrays    : [Dict] arrays already describing the nodes in the same order, for example the memory-mapped arrays of a
+                          snapshot (see Snapshot.restoreMap). The "lat", "lon", "isRoad", "isBuildingCentroid", "indptr" and
+                          "indices" entries are used as they are instead of being read from the Node objects. None to read everything
+                          from the nodes.
+            - projection : [LocalProjection] projection of the map (Map.projection), None to use a projection around the mean coordinate
+            - precision  : [string] precision mode of the map (Map.precision)
+        """
+        self.nodes = list(nodes)
+        count = len(self.nodes)
+        self.precision = Projection.checkPrecision(precision)
+        arrays = {} if arrays is None else arrays
+        for i, node in enumerate(self.nodes):
+            node.graphIndex = i
+        if "lat" in arrays:
+            self.lat = np.asarray(arrays["lat"], dtype=np.float64)
+            self.lon = np.asarray(arrays["lon"], dtype=np.float64)
+        else:
+            self.lat = np.fromiter((node.coordinate.lat for node in self.nodes), dtype=np.float64, count=count)
+            self.lon = np.fromiter((node.coordinate.lon for node in self.nodes), dtype=np.float64, count=count)
+        if "isRoad" in arrays:
+            self.isRoad = np.asarray(arrays["isRoad"], dtype=bool)
+        else:
+            self.isRoad = np.fromiter((node.isRoad for node in self.nodes), dtype=bool, count=count)
+            if roadNodes is not None:
+                self.isRoad[[node.graphIndex for node in roadNodes]] = True
+        if "isBuildingCentroid" in arrays:
+            self.isBuildingCentroid = np.asarray(arrays["isBuildingCentroid"], dtype=bool)
+        else:
+            self.isBuildingCentroid = np.fromiter((node.isBuildingCentroid for node in self.nodes), dtype=bool, count=count)
+        self.building = np.full(count, -1, dtype=np.int32)
+        if buildings is not None:
+            for i, building in enumerate(buildings):
+                if building.node is not None and building.node.graphIndex is not None:
+                    self.building[building.node.graphIndex] = i
+
+        if "indptr" in arrays:
+            self.indptr = np.asarray(arrays["indptr"], dtype=np.int64)
+            self.indices = np.asarray(arrays["indices"], dtype=np.int32)
+        else:
+            self.indptr = np.zeros(count + 1, dtype=np.int64)
+            self.indptr[1:] = np.cumsum(np.fromiter((len(node.connections) for node in self.nodes), dtype=np.int64, count=count))
+            self.indices = np.fromiter((c.graphIndex for node in self.nodes for c in node.connections), dtype=np.int32, count=int(self.indptr[-1]))
+        if projection is None:
+            projection = Projection.LocalProjection(float(self.lat.mean()) if count > 0 else 0.0, float(self.lon.mean()) if count > 0 else 0.0)
+        self.projection = projection
+        sources = np.repeat(np.arange(count, dtype=np.int32), np.diff(self.indptr))
+        self.weights = self.distanceBetween(sources, self.indices)
+
+        self.x, self.y = projection.project(self.lat, self.lon)
+        # the edge lengths are the same projected distances unless they were calculated on the ellipsoid
+        self.heuristicScale = 1.0 if self.precision == Projection.PROJECTED else 0.99
+        self.component = connectedComponents(self.indptr, self.indices)
+        self.adjacency = None
+        self.positions = None
+        self.reverseAdjacency = None
+
+    def __len__(self):
+        """
+        [Method] __len__
+        Return: [int] number of nodes
+        """
+        return len(self.nodes)
+
+    def node(self, index):
+        """
+        [Method] node
+        Get the Node object of an index
+
+        Parameter:
+            - index : [int] node index
+
+        Return: [Node] the node
+        """
+        return self.nodes[index]
+
+    def index(self, node):
+        """
+        [Method] index
+        Get the index of a Node object
+
+        Parameter:
+            - node : [Node] the node
+
+        Return: [int] node index
+        """
+        return node.graphIndex
+
+    def neighbors(self, index):
+        """
+        [Method] neighbors
+        Get the neighbors of a node and the length of the edges leading to them
+
+        Parameter:
+            - index : [int] node index
+
+        Return: ([np.array],[np.array]) neighbor indices and edge lengths in meters
+        """
+        start, end = self.indptr[index], self.indptr[index + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def adjacencyLists(self):
+        """
+        [Method] adjacencyLists
+        Python lists view of the graph for the search loops (indexing numpy arrays element by element is slow in Python).
+        Built on the first call and kept.
+        
+        Return: ([array],[array]) list of (neighbor, edge length) lists per node and list of projected (x, y) per node
+        """
+        if self.adjacency is None:
+            indices = self.indices.tolist()
+            weights = self.weights.tolist()
+            pointer = self.indptr.tolist()
+            self.adjacency = [list(zip(indices[pointer[i]:pointer[i + 1]], weights[pointer[i]:pointer[i + 1]])) for i in range(len(self.nodes))]
+            self.positions = list(zip(self.x.tolist(), self.y.tolist()))
+        return self.adjacency, self.positions
+        
+    def reverseAdjacencyLists(self):
+        """
+        [Method] reverseAdjacencyLists
+        Python lists view of the incoming edges, used by the searches that start from the destination. Built on the first call and kept.
+        
+        Return: [array] list of (previous node, edge length) lists per node
+        """
+        if self.reverseAdjacency is None:
+            self.reverseAdjacency = [[] for i in range(len(self.nodes))]
+            pointer = self.indptr.tolist()
+            indices = self.indices.tolist()
+            weights = self.weights.tolist()
+            for origin in range(len(self.nodes)):
+                for position in range(pointer[origin], pointer[origin + 1]):
+                    self.reverseAdjacency[indices[position]].append((origin, weights[position]))
+        return self.reverseAdjacency
+        
+    def connected(self, origin, destination):
+        """
+        [Method] connected
+        Check in constant time if a path can exist between two nodes
+        
+        Parameter:
+            - origin      : [int] origin node index
+            - destination : [int] destination node index
+            
+        Return: [Bool] True if the nodes are in the same connected component
+        """
+        return self.component[origin] == self.component[destination]
+        
+    def edgeLength(self, origin, destination):
+        """
+        [Method] edgeLength
+        Get the length of the edge between two connected nodes
+
+        Parameter:
+            - origin      : [int] origin node index
+            - destination : [int] destination node index
+
+        Return: [float] the length in meters, None if the nodes are not connected
+        """
+        start, end = self.indptr[origin], self.indptr[origin + 1]
+        position = np.nonzero(self.indices[start:end] == destination)[0]
+        if len(position) == 0:
+            return None
+        return float(self.weights[start + position[0]])
+
+    def distanceBetween(self, origins, destinations):
+        """
+        [Method] distanceBetween
+        Vectorized distance between nodes in the projection and precision mode of the graph
+
+        Parameter:
+            - origins      : [np.array] origin node indices
+            - destinations : [np.array] destination node indices
+
+        Return: [np.array] distances in meters
+        """
+        return Projection.distances(self.lat[origins], self.lon[origins], self.lat[destinations], self.lon[destinations],
+                                    self.projection, self.precision)
+
+    def fingerprint(self):
+        """
+        [Method] fingerprint
+        Hash of the structure and edge lengths of the graph, used to check that data derived from the graph (for example a
+        ContractionHierarchy) belongs to it.
+        
+        Return: [string] hex digest
+        """
+        digest = hashlib.sha256()
+        for array in (self.indptr, self.indices, self.weights):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+        
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] memory used by the arrays of this graph in bytes (the Node view is counted by nodeBytes)
+        """
+        arrays = [self.lat, self.lon, self.isRoad, self.isBuildingCentroid, self.building, self.indptr, self.indices, self.weights, self.x, self.y, self.component]
+        return sum(array.nbytes for array in arrays)
+
+    def nodeBytes(self):
+        """
+        [Method] nodeBytes
+        Return: [int] memory used by the Node view in bytes, the Node objects, their coordinates and their own containers (the
+                shared containers of the released nodes, the objects the containers point to and the ids are not counted)
+        """
+        shared = (Node.NO_ENTRIES, Node.NO_AGENTS)
+        total = sys.getsizeof(self.nodes)
+        for node in self.nodes:
+            total += sys.getsizeof(node) + sys.getsizeof(node.coordinate) + sys.getsizeof(node.connections)
+            for container in (node.ways, node.tags, node.agents):
+                if container is not shared[0] and container is not shared[1]:
+                    total += sys.getsizeof(container)
+        return total
+
+    def __str__(self):
+        """
+        [Method] __str__
+        Generate the summarized graph information string and return it.
+        """
+        tempstring = f"[RoadGraph]\n"
+        tempstring = tempstring + f" number of nodes = {len(self.nodes)}\n"
+        tempstring = tempstring + f" number of edges = {len(self.indices)}\n"
+        tempstring = tempstring + f" number of road nodes = {int(self.isRoad.sum())}\n"
+        tempstring = tempstring + f" number of building centroids = {int(self.isBuildingCentroid.sum())}\n"
+        tempstring = tempstring + f" number of connected components = {int(self.component.max()) + 1 if len(self.component) > 0 else 0}\n"
+        tempstring = tempstring + f" array memory = {self.nbytes()} bytes\n"
+        tempstring = tempstring + f" node view memory = {self.nodeBytes()} bytes\n"
+        return tempstring
+
+def connectedComponents(indptr, indices):
+    """
+    [Function] connectedComponents
+    Label the connected components of a CSR graph (the edges are taken as undirected). Every edge hooks the root of its larger
+    label under the smaller one and the labels are then shortened to their roots (pointer jumping), until no edge joins two labels.
+    
+    Parameter:
+        - indptr  : [np.array] CSR pointer
+        - indices : [np.array] CSR neighbor indices
+        
+    Return: [np.array] int32 component of every node, numbered from 0
+    """
+    count = len(indptr) - 1
+    labels = np.arange(count, dtype=np.int64)
+    sources = np.repeat(np.arange(count, dtype=np.int64), np.diff(indptr))
+    targets = np.asarray(indices, dtype=np.int64)
+    while True:
+        sourceLabels, targetLabels = labels[sources], labels[targets]
+        different = sourceLabels != targetLabels
+        if not different.any():
+            break
+        high = np.maximum(sourceLabels[different], targetLabels[different])
+        low = np.minimum(sourceLabels[different], targetLabels[different])
+        np.minimum.at(labels, high, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return np.unique(labels, return_inverse=True)[1].astype(np.int32)
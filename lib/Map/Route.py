@@ -0,0 +1,132 @@
+import numpy as np
+
+class Route():
+    """
+    [Class] Route
+    Immutable route through the RoadGraph, shared by every agent taking it. The progress of an agent along the route is kept
+    in a RouteCursor, so the route itself is never copied or modified.
+
+    Properties:
+        - graph         : [RoadGraph] the graph the node indices belong to
+        - indices       : [np.array] int32 read only, graph indices of the nodes of the route from the origin to the destination
+        - cumulative    : [np.array] float64 read only, distance in meters from the origin to every node (cumulative[0] = 0)
+        - totalDistance : [float] distance of the route as reported by the search engine
+    """
+    def __init__(self, graph, indices, cumulative, totalDistance = None):
+        """
+        [Constructor]
+        Initialize the route
+
+        Parameter:
+            - graph         : [RoadGraph] the graph
+            - indices       : [array] graph indices of the nodes of the route (a single node if the origin is the destination)
+            - cumulative    : [array] distance in meters from the origin to every node
+            - totalDistance : [float] distance reported for the route, cumulative[-1] if None
+        """
+        self.graph = graph
+        self.indices = np.array(indices, dtype=np.int32)
+        self.cumulative = np.array(cumulative, dtype=np.float64)
+        self.indices.setflags(write = False)
+        self.cumulative.setflags(write = False)
+        self.totalDistance = float(self.cumulative[-1]) if totalDistance is None else totalDistance
+
+    @classmethod
+    def fromLengths(cls, graph, indices, lengths, totalDistance = None):
+        """
+        [Method] fromLengths
+        Build a route from the length of its edges
+
+        Parameter:
+            - graph         : [RoadGraph] the graph
+            - indices       : [array] graph indices of the nodes of the route
+            - lengths       : [array] length of every edge in meters (one less than indices)
+            - totalDistance : [float] distance reported for the route, the sum of the lengths if None
+
+        Return: [Route] the route
+        """
+        cumulative = np.zeros(len(lengths) + 1, dtype=np.float64)
+        np.cumsum(np.asarray(lengths, dtype=np.float64), out = cumulative[1:])
+        return cls(graph, indices, cumulative, totalDistance)
+
+    @classmethod
+    def fromSequence(cls, graph, sequence, totalDistance = None):
+        """
+        [Method] fromSequence
+        Build a route from an unused MovementSequence returned by a search engine, the edge lengths of its vectors are reused.
+        An empty sequence gives the route of one node that is already at its destination.
+
+        Parameter:
+            - graph         : [RoadGraph] the graph
+            - sequence      : [MovementSequence] the sequence
+            - totalDistance : [float] distance reported for the route, sequence.totalDistance if None
+
+        Return: [Route] the route
+        """
+        indices = [vector.startingNode.graphIndex for vector in sequence.sequence]
+        indices.append(sequence.destination.graphIndex)
+        lengths = [vector.distance for vector in sequence.sequence]
+        return cls.fromLengths(graph, indices, lengths, sequence.totalDistance if totalDistance is None else totalDistance)
+
+    @property
+    def origin(self):
+        """
+        [Property] origin
+        Return: [int] graph index of the first node
+        """
+        return int(self.indices[0])
+
+    @property
+    def destination(self):
+        """
+        [Property] destination
+        Return: [int] graph index of the last node
+        """
+        return int(self.indices[-1])
+
+    def node(self, position):
+        """
+        [Method] node
+        Get the Node object at a position of the route
+
+        Parameter:
+            - position : [int] position in the route (0 is the origin)
+
+        Return: [Node] the node
+        """
+        return self.graph.node(int(self.indices[position]))
+
+    def extract(self):
+        """
+        [Method] extract
+        Return the pickle-able form of this route (see restore)
+
+        Return: ([array],[array],float) node indices, cumulative distances and total distance
+        """
+        return (self.indices.tolist(), self.cumulative.tolist(), self.totalDistance)
+
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] memory used by the arrays of this route in bytes
+        """
+        return self.indices.nbytes + self.cumulative.nbytes
+
+    def __len__(self):
+        """
+        [Method] __len__
+        Return: [int] number of nodes in the route
+        """
+        return len(self.indices)
+
+def restore(graph, extracted):
+    """
+    [Function] restore
+    Rebuild a route from Route.extract(), the geometry is not computed again
+
+    Parameter:
+        - graph     : [RoadGraph] the graph
+        - extracted : ([array],[array],float) the extracted route
+
+    Return: [Route] the route
+    """
+    return Route(graph, extracted[0], extracted[1], extracted[2])
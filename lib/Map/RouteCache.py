@@ -0,0 +1,203 @@
+from collections import OrderedDict
+
+# rough memory used by one entry besides its arrays (key tuple, OrderedDict slot, array headers)
+ENTRY_OVERHEAD = 256
+# cached value of the pairs that have no route
+NO_ROUTE = "no route"
+
+class RouteCache():
+    """
+    [Class] RouteCache
+    Memory bounded cache of the routes found by Map.findPath, keyed by the graph indices of the origin and the destination.
+    The cached Route objects are immutable and shared by every agent taking them, the least recently used routes are dropped when
+    the routes take more than maxBytes. Pairs whose search failed are cached as NO_ROUTE so they are not searched again.
+
+    Properties:
+        - maxBytes  : [int] memory budget in bytes
+        - routes    : [OrderedDict] (origin, destination) -> Route or NO_ROUTE, in least recently used order
+        - bytes     : [int] memory used by the cached routes
+        - hits      : [int] number of requests answered from the cache
+        - misses    : [int] number of requests that needed a search
+        - evictions : [int] number of routes dropped to stay within the budget
+        - failures  : [int] number of requests answered by a cached failure (NO_ROUTE)
+        - rejected  : [int] number of requests rejected because the nodes are in different connected components
+    """
+    def __init__(self, maxBytes = 64 * 1024 * 1024):
+        """
+        [Constructor]
+        Initialize an empty cache
+
+        Parameter:
+            - maxBytes : [int] memory budget in bytes
+        """
+        self.maxBytes = maxBytes
+        self.routes = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def get(self, origin, destination):
+        """
+        [Method] get
+        Get the route between two nodes
+
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+
+        Return: [Route] the route, NO_ROUTE if the search already failed, None if it is not cached
+        """
+        key = (origin, destination)
+        route = self.routes.get(key)
+        if route is None:
+            self.misses += 1
+            return None
+        if route is NO_ROUTE:
+            self.failures += 1
+        else:
+            self.hits += 1
+        self.routes.move_to_end(key)
+        return route
+
+    def put(self, route):
+        """
+        [Method] put
+        Add a route to the cache and drop the least recently used routes that do not fit in the budget anymore
+
+        Parameter:
+            - route : [Route] the route
+        """
+        key = (route.origin, route.destination)
+        previous = self.routes.pop(key, None)
+        if previous is not None:
+            self.bytes -= routeBytes(previous)
+        self.routes[key] = route
+        self.bytes += routeBytes(route)
+        self.shrink()
+
+    def putFailure(self, origin, destination):
+        """
+        [Method] putFailure
+        Remember that there is no route between two nodes
+
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+        """
+        key = (origin, destination)
+        previous = self.routes.pop(key, None)
+        if previous is not None:
+            self.bytes -= routeBytes(previous)
+        self.routes[key] = NO_ROUTE
+        self.bytes += routeBytes(NO_ROUTE)
+        self.shrink()
+
+    def isFailure(self, origin, destination):
+        """
+        [Method] isFailure
+        Check if a pair is cached as having no route, the counters and the order of the cache are not changed
+
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+
+        Return: [Bool] True if the pair is cached as NO_ROUTE
+        """
+        return self.routes.get((origin, destination)) is NO_ROUTE
+
+    def reject(self):
+        """
+        [Method] reject
+        Count a request rejected without a search because its nodes are not connected
+        """
+        self.rejected += 1
+
+    def share(self, route):
+        """
+        [Method] share
+        Get the cached instance of a route so the agents taking it share one object, the route is added if it is not cached yet.
+        The hit and miss counters are not changed.
+
+        Parameter:
+            - route : [Route] the route
+
+        Return: [Route] the cached route
+        """
+        key = (route.origin, route.destination)
+        cached = self.routes.get(key)
+        if cached is not None and cached is not NO_ROUTE:
+            self.routes.move_to_end(key)
+            return cached
+        self.put(route)
+        return route
+
+    def setMaxBytes(self, maxBytes):
+        """
+        [Method] setMaxBytes
+        Change the memory budget, routes are dropped right away if they do not fit anymore
+
+        Parameter:
+            - maxBytes : [int] memory budget in bytes
+        """
+        self.maxBytes = maxBytes
+        self.shrink()
+
+    def shrink(self):
+        """
+        [Method] shrink
+        Drop the least recently used routes until the cache fits in the budget (the most recent route is always kept)
+        """
+        while self.bytes > self.maxBytes and len(self.routes) > 1:
+            key, dropped = self.routes.popitem(last = False)
+            self.bytes -= routeBytes(dropped)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        [Method] clear
+        Drop every route, for example after the graph changed
+        """
+        self.routes.clear()
+        self.bytes = 0
+
+    def stats(self):
+        """
+        [Method] stats
+        Return: [Dict] the hits, misses, evictions, failures and rejected counters
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "failures": self.failures, "rejected": self.rejected}
+
+    def __len__(self):
+        """
+        [Method] __len__
+        Return: [int] number of cached routes
+        """
+        return len(self.routes)
+
+    def __str__(self):
+        """
+        [Method] __str__
+        Generate the summarized cache information string and return it.
+        """
+        tempstring = f"[RouteCache]\n"
+        tempstring = tempstring + f" routes = {len(self.routes)} ({self.bytes}/{self.maxBytes} bytes)\n"
+        tempstring = tempstring + f" hits = {self.hits}, misses = {self.misses}, evictions = {self.evictions}\n"
+        tempstring = tempstring + f" cached failures = {self.failures}, rejected = {self.rejected}\n"
+        return tempstring
+
+def routeBytes(route):
+    """
+    [Function] routeBytes
+    Memory used by a cached route
+
+    Parameter:
+        - route : [Route] the cached route or NO_ROUTE
+
+    Return: [int] bytes
+    """
+    if route is NO_ROUTE:
+        return ENTRY_OVERHEAD
+    return route.nbytes() + ENTRY_OVERHEAD
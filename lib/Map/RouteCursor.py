@@ -0,0 +1,127 @@
+import numpy as np
+
+class RouteCursor():
+    """
+    [Class] RouteCursor
+    Progress of one agent along a shared Route. It replaces the per agent MovementSequence: the route is not copied, only the
+    traveled distance is kept and the current node and position are derived from the cumulative distances of the route.
+
+    Properties:
+        - route         : [Route] the route
+        - traveled      : [float] distance traveled from the origin in meters
+        - position      : [int] position in the route of the last node reached
+        - totalDistance : [float] distance of the route as reported by the search engine
+        - finished      : [Bool] is the whole route traveled?
+        - new           : [Bool] True until the first step
+        - currentNode   : [Node] last node reached
+        - lastNode      : [Node] node reached before currentNode
+    """
+    def __init__(self, route):
+        """
+        [Constructor]
+        Put a cursor at the origin of a route
+
+        Parameter:
+            - route : [Route] the route
+        """
+        self.route = route
+        self.traveled = 0.0
+        self.position = 0
+        self.totalDistance = route.totalDistance
+        self.finished = False
+        self.new = True
+        self.currentNode = route.node(0)
+        self.lastNode = self.currentNode
+
+    def step(self, distances):
+        """
+        [Method] step
+        Travel a certain distance along the route, possibly over several nodes. Leftover distance is returned once the destination is reached.
+
+        Parameter:
+            - distances : [Float] distance traveled in meters
+
+        return :
+            - [float] the leftover of the distance
+        """
+        self.new = False
+        cumulative = self.route.cumulative
+        end = float(cumulative[-1])
+        if self.traveled >= end:
+            self.finished = True
+            return distances
+        leftOver = distances - (end - self.traveled)
+        if leftOver > 0:
+            self.traveled = end
+            self.finished = True
+        else:
+            leftOver = 0
+            self.traveled += distances
+        position = int(np.searchsorted(cumulative, self.traveled, side = "right")) - 1
+        if position != self.position:
+            self.lastNode = self.route.node(position - 1)
+            self.position = position
+            self.currentNode = self.route.node(position)
+        return leftOver
+
+    def setProgress(self, traveled, position, finished):
+        """
+        [Method] setProgress
+        Set the progress computed by a batch movement kernel (see Simulation.Movement)
+
+        Parameter:
+            - traveled : [float] distance traveled from the origin in meters
+            - position : [int] position in the route of the last node reached
+            - finished : [Bool] is the whole route traveled?
+        """
+        self.new = False
+        self.traveled = traveled
+        self.finished = finished
+        if position != self.position:
+            self.lastNode = self.route.node(position - 1)
+            self.position = position
+            self.currentNode = self.route.node(position)
+
+    def getCurrentPosition(self):
+        """
+        [Method] getCurrentPosition
+        return the current position of the agent, interpolated between the nodes of the route
+
+        return :
+            - (lat,lon) current position
+        """
+        route = self.route
+        graph = route.graph
+        start = int(route.indices[self.position])
+        if self.position >= len(route) - 1:
+            return (float(graph.lat[start]), float(graph.lon[start]))
+        end = int(route.indices[self.position + 1])
+        length = route.cumulative[self.position + 1] - route.cumulative[self.position]
+        progress = (self.traveled - route.cumulative[self.position]) / length if length > 0 else 0.0
+        lat = graph.lat[start] + progress * (graph.lat[end] - graph.lat[start])
+        lon = graph.lon[start] + progress * (graph.lon[end] - graph.lon[start])
+        return (float(lat), float(lon))
+
+    def getVector(self, currentPosition):
+        """
+        [Method] getVector
+        Calculate the translation required from a coordinate to the current position on the route.
+
+        Parameter:
+            - currentPosition : [Coordinate] current position
+
+        return :
+            - (lat,lon) the translation vector in latitude and longitude
+        """
+        lat, lon = self.getCurrentPosition()
+        return (lat - currentPosition.lat, lon - currentPosition.lon)
+
+    def extract(self):
+        """
+        [Method] extract
+        Return the pickle-able route of this cursor (see Route.restore)
+
+        return :
+            - ([array],[array],float) node indices, cumulative distances and total distance
+        """
+        return self.route.extract()
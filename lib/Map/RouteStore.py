@@ -0,0 +1,181 @@
+"""
+Disk backed store of the routes found by Map.findPath, shared by the runs on the same map.
+
+The routes are kept in a SQLite database keyed by the fingerprint of the map graph (see RoadGraph.fingerprint) and the graph
+indices of the origin and the destination, so one file can hold the routes of several maps. A route is stored as the raw bytes
+of its node indices and cumulative distances (see Route), pairs without a route are stored without data.
+New routes are written in batches. Only the process that opened the store writes, the worker processes forked from it
+open their own read only connection.
+"""
+import os
+import sqlite3
+import numpy as np
+from .Route import Route
+from .RouteCache import NO_ROUTE
+
+DEFAULT_BATCH_SIZE = 1000
+
+class RouteStore():
+    """
+    [Class] RouteStore
+    SQLite route store of one map
+
+    Properties:
+        - path      : [string] path to the database file
+        - key       : [string] fingerprint of the map graph
+        - graph     : [RoadGraph] the graph the routes belong to
+        - batchSize : [int] number of pending routes that triggers a write
+        - pending   : [array] (key, origin, destination, distance, indices, cumulative) rows waiting to be written
+        - hits      : [int] number of requests answered by the store
+        - misses    : [int] number of requests not found in the store
+        - writes    : [int] number of new routes written
+        - owner     : [int] id of the process that opened the store, the only one that writes
+        - connections : [Dict] process id -> sqlite3.Connection opened in that process (the connections inherited from the parent
+                        are kept but never used, closing them in a child could release the locks of the parent)
+    """
+    def __init__(self, path, graph, batchSize = DEFAULT_BATCH_SIZE):
+        """
+        [Constructor]
+        Open (or create) the store
+
+        Parameter:
+            - path      : [string] path to the database file
+            - graph     : [RoadGraph] the graph the routes belong to
+            - batchSize : [int] number of pending routes that triggers a write
+        """
+        self.path = path
+        self.graph = graph
+        self.key = graph.fingerprint()
+        self.batchSize = batchSize
+        self.pending = []
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.owner = os.getpid()
+        self.connections = {}
+        self.connect()
+
+    def connect(self):
+        """
+        [Method] connect
+        Get the connection of the current process, a process forked from the owner opens its own one (SQLite connections
+        cannot be shared between processes).
+
+        Return: [sqlite3.Connection] the connection
+        """
+        connection = self.connections.get(os.getpid())
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout = 60)
+            self.connections[os.getpid()] = connection
+            if os.getpid() == self.owner:
+                connection.execute("CREATE TABLE IF NOT EXISTS routes (mapKey TEXT NOT NULL, origin INTEGER NOT NULL, destination INTEGER NOT NULL, "
+                                   "distance REAL, indices BLOB, cumulative BLOB, PRIMARY KEY (mapKey, origin, destination)) WITHOUT ROWID")
+                connection.commit()
+            else:
+                # the rows pending in the owner are not written by the children
+                self.pending = []
+        return connection
+
+    def get(self, origin, destination):
+        """
+        [Method] get
+        Get the route between two nodes
+
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+
+        Return: [Route] the route, NO_ROUTE if the pair has no route, None if it is not stored
+        """
+        try:
+            row = self.connect().execute("SELECT distance, indices, cumulative FROM routes WHERE mapKey = ? AND origin = ? AND destination = ?",
+                                         (self.key, origin, destination)).fetchone()
+        except sqlite3.OperationalError:
+            # the owner did not create the table yet
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if row[1] is None:
+            return NO_ROUTE
+        return Route(self.graph, np.frombuffer(row[1], dtype=np.int32), np.frombuffer(row[2], dtype=np.float64), row[0])
+
+    def put(self, route):
+        """
+        [Method] put
+        Queue a route to be written, the queue is written once it holds batchSize routes. Ignored in the worker processes.
+
+        Parameter:
+            - route : [Route] the route
+        """
+        if os.getpid() != self.owner:
+            return
+        self.pending.append((self.key, route.origin, route.destination, route.totalDistance, route.indices.tobytes(), route.cumulative.tobytes()))
+        if len(self.pending) >= self.batchSize:
+            self.flush()
+
+    def putFailure(self, origin, destination):
+        """
+        [Method] putFailure
+        Queue a pair without a route to be written. Ignored in the worker processes, they return their failures to the process
+        that opened the store (see Map.shareFailure).
+
+        Parameter:
+            - origin      : [int] graph index of the origin node
+            - destination : [int] graph index of the destination node
+        """
+        if os.getpid() != self.owner:
+            return
+        self.pending.append((self.key, origin, destination, None, None, None))
+        if len(self.pending) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        """
+        [Method] flush
+        Write the pending routes in one transaction, the routes that are already stored are skipped
+        """
+        if os.getpid() != self.owner or len(self.pending) == 0:
+            return
+        connection = self.connect()
+        changes = connection.total_changes
+        with connection:
+            connection.executemany("INSERT OR IGNORE INTO routes VALUES (?, ?, ?, ?, ?, ?)", self.pending)
+        self.writes += connection.total_changes - changes
+        self.pending = []
+
+    def close(self):
+        """
+        [Method] close
+        Write the pending routes and close the connection
+        """
+        self.flush()
+        connection = self.connections.pop(os.getpid(), None)
+        if connection is not None:
+            connection.close()
+
+    def stats(self):
+        """
+        [Method] stats
+        Return: [Dict] the storeHits and storeMisses counters
+        """
+        return {"storeHits": self.hits, "storeMisses": self.misses}
+
+    def __len__(self):
+        """
+        [Method] __len__
+        Return: [int] number of routes stored for this map (the pending routes are not included)
+        """
+        return self.connect().execute("SELECT COUNT(*) FROM routes WHERE mapKey = ?", (self.key,)).fetchone()[0]
+
+    def __str__(self):
+        """
+        [Method] __str__
+        Generate the summarized store information string and return it.
+        """
+        tempstring = f"[RouteStore]\n"
+        tempstring = tempstring + f" path = {self.path}\n"
+        tempstring = tempstring + f" routes = {len(self)}, pending = {len(self.pending)}\n"
+        tempstring = tempstring + f" hits = {self.hits}, misses = {self.misses}, writes = {self.writes}\n"
+        return tempstring
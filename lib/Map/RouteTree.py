@@ -0,0 +1,90 @@
+import heapq
+import math
+import numpy as np
+
+class RouteTree():
+    """
+    [Class] RouteTree
+    Shortest path tree of every node of the graph towards one root node, built with a reverse Dijkstra from the root.
+    The path from any node to the root is found by following the next pointers.
+    
+    Properties:
+        - root     : [int] index of the root node
+        - distance : [np.array] float64 distance in meters from every node to the root, inf if the root cannot be reached
+        - next     : [np.array] int32 next node on the way to the root, -1 for the root and unreachable nodes
+    """
+    def __init__(self, root, distance, next):
+        """
+        [Constructor]
+        Initialize the tree from its arrays, use build() to create one.
+        """
+        self.root = root
+        self.distance = distance
+        self.next = next
+    
+    @classmethod
+    def build(cls, graph, root):
+        """
+        [Method] build
+        Reverse Dijkstra from the root over the whole graph
+        
+        Parameter:
+            - graph : [RoadGraph] the graph
+            - root  : [int] index of the root node
+            
+        Return: [RouteTree] the tree
+        """
+        reverse = graph.reverseAdjacencyLists()
+        count = len(graph)
+        distance = [math.inf] * count
+        next = [-1] * count
+        distance[root] = 0.0
+        queue = [(0.0, root)]
+        while len(queue) > 0:
+            current, node = heapq.heappop(queue)
+            if current > distance[node]:
+                continue
+            for previous, weight in reverse[node]:
+                cost = current + weight
+                if cost < distance[previous]:
+                    distance[previous] = cost
+                    next[previous] = node
+                    heapq.heappush(queue, (cost, previous))
+        return cls(root, np.array(distance, dtype=np.float64), np.array(next, dtype=np.int32))
+    
+    def reaches(self, origin):
+        """
+        [Method] reaches
+        Return: [Bool] True if the root can be reached from the origin node
+        """
+        return bool(np.isfinite(self.distance[origin]))
+    
+    def path(self, origin):
+        """
+        [Method] path
+        Follow the next pointers from a node to the root
+        
+        Parameter:
+            - origin : [int] index of the origin node
+            
+        Return: ([float],[array],[array]) distance in meters, node indices from origin to root and length of every edge,
+                (None, None, None) if the root cannot be reached
+        """
+        if not self.reaches(origin):
+            return None, None, None
+        indices = [origin]
+        lengths = []
+        current = origin
+        while current != self.root:
+            following = int(self.next[current])
+            lengths.append(float(self.distance[current] - self.distance[following]))
+            indices.append(following)
+            current = following
+        return float(self.distance[origin]), indices, lengths
+    
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] memory used by the tree in bytes
+        """
+        return self.distance.nbytes + self.next.nbytes
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+
+class RouteTreeCache():
+    """
+    [Class] RouteTreeCache
+    Memory bounded cache of RouteTrees keyed by their root. The least recently used trees are dropped when the trees take
+    more than maxBytes (the most recent tree is always kept).
+    
+    Properties:
+        - maxBytes  : [int] memory budget in bytes
+        - trees     : [OrderedDict] root -> RouteTree, in least recently used order
+        - bytes     : [int] memory used by the cached trees
+        - hits      : [int] number of requests answered from the cache
+        - misses    : [int] number of requests that needed a new tree
+        - evictions : [int] number of trees dropped to stay within the budget
+    """
+    def __init__(self, maxBytes = 256 * 1024 * 1024):
+        """
+        [Constructor]
+        Initialize an empty cache
+        
+        Parameter:
+            - maxBytes : [int] memory budget in bytes
+        """
+        self.maxBytes = maxBytes
+        self.trees = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, root):
+        """
+        [Method] get
+        Get the tree of a root
+        
+        Parameter:
+            - root : [int] index of the root node
+            
+        Return: [RouteTree] the tree, None if it is not cached
+        """
+        tree = self.trees.get(root)
+        if tree is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.trees.move_to_end(root)
+        return tree
+    
+    def put(self, tree):
+        """
+        [Method] put
+        Add a tree to the cache and drop the least recently used trees that do not fit in the budget anymore
+        
+        Parameter:
+            - tree : [RouteTree] the tree
+        """
+        previous = self.trees.pop(tree.root, None)
+        if previous is not None:
+            self.bytes -= previous.nbytes()
+        self.trees[tree.root] = tree
+        self.bytes += tree.nbytes()
+        self.shrink()
+        
+    def setMaxBytes(self, maxBytes):
+        """
+        [Method] setMaxBytes
+        Change the memory budget, trees are dropped right away if they do not fit anymore
+        
+        Parameter:
+            - maxBytes : [int] memory budget in bytes
+        """
+        self.maxBytes = maxBytes
+        self.shrink()
+        
+    def shrink(self):
+        """
+        [Method] shrink
+        Drop the least recently used trees until the cache fits in the budget (the most recent tree is always kept)
+        """
+        while self.bytes > self.maxBytes and len(self.trees) > 1:
+            root, dropped = self.trees.popitem(last = False)
+            self.bytes -= dropped.nbytes()
+            self.evictions += 1
+            
+    def clear(self):
+        """
+        [Method] clear
+        Drop every tree, for example after the graph changed
+        """
+        self.trees.clear()
+        self.bytes = 0
+        
+    def __len__(self):
+        """
+        [Method] __len__
+        Return: [int] number of cached trees
+        """
+        return len(self.trees)
+    
+    def __str__(self):
+        """
+        [Method] __str__
+        Generate the summarized cache information string and return it.
+        """
+        tempstring = f"[RouteTreeCache]\n"
+        tempstring = tempstring + f" trees = {len(self.trees)} ({self.bytes}/{self.maxBytes} bytes)\n"
+        tempstring = tempstring + f" hits = {self.hits}, misses = {self.misses}, evictions = {self.evictions}\n"
+        return tempstring
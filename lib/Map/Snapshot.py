@@ -0,0 +1,484 @@
+"""
+Binary snapshot of a fully constructed Map.
+
+File layout:
+    - magic      : 8 bytes, b"EPISNAP\\0"
+    - header len : little endian uint64
+    - header     : utf-8 JSON, contains the map scalars and the description (dtype, shape, offset) of every array
+    - arrays     : raw little endian arrays, each aligned to 64 bytes so they can be memory-mapped directly
+"""
+import hashlib
+import json
+import numpy as np
+from pathlib import Path
+from .Node import Node
+from .Way import Way
+from .Road import Road
+from .Building import Building
+from .Coordinate import Coordinate
+
+MAGIC = b"EPISNAP\0"
+VERSION = 1
+ALIGNMENT = 64
+
+WAY_OTHER = 0
+WAY_BUILDING = 1
+WAY_NATURAL = 2
+WAY_LEISURE = 3
+WAY_AMENITY = 4
+WAY_HIGHWAY = 5
+
+def hashFiles(paths, extra = "", algorithm = "sha256"):
+    """
+    [Function] hashFiles
+    Hash the content of several files plus an extra string.
+
+    Parameter:
+        - paths : [array] list of file paths, None entries are ignored
+        - extra : [string] extra data to include in the hash
+
+    Return: [string] hex digest
+    """
+    digest = hashlib.new(algorithm)
+    for path in paths:
+        if path is None:
+            digest.update(b"\0none\0")
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    digest.update(extra.encode("utf-8"))
+    return digest.hexdigest()
+
+def mapHash(osmFilePath, options = ""):
+    """
+    [Function] mapHash
+    Hash of the OSM file, used to invalidate the caches generated from it.
+
+    Parameter:
+        - osmFilePath : [string] path to the OSM file
+        - options     : [string] description of the loader options that change which data is loaded (for example the clip area)
+
+    Return: [string] hex digest
+    """
+    return hashFiles([osmFilePath], options)
+
+def snapshotKey(osmHash, buildingCSV = None, gridSize = (10,10), options = ""):
+    """
+    [Function] snapshotKey
+    Generate the key that identifies a map snapshot: a hash of the OSM file, the building CSV, the grid size and the loader options.
+
+    Parameter:
+        - osmHash     : [string] hash of the OSM file (see mapHash)
+        - buildingCSV : [string] path to the building csv (or None)
+        - gridSize    : [(int,int)] grid size
+        - options     : [string] description of the other options that change the generated map
+
+    Return: [string] the snapshot key
+    """
+    return hashFiles([buildingCSV], f"osm={osmHash};grid={gridSize[0]}x{gridSize[1]};options={options};version={VERSION}")
+
+def writeArrays(path, header, arrays):
+    """
+    [Function] writeArrays
+    Write a header and a dictionary of numpy arrays into a single snapshot file.
+
+    Parameter:
+        - path   : [string] path to the file
+        - header : [Dict] JSON serializable header
+        - arrays : [Dict] name -> numpy array
+    """
+    header = dict(header)
+    specs = {}
+    offset = 0
+    prepared = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.byteorder == ">":
+            array = array.astype(array.dtype.newbyteorder("<"))
+        offset = _align(offset)
+        specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        prepared[name] = array
+        offset += array.nbytes
+    header["arrays"] = specs
+    headerBytes = json.dumps(header).encode("utf-8")
+    dataStart = _align(len(MAGIC) + 8 + len(headerBytes))
+    header["dataStart"] = dataStart
+    headerBytes = json.dumps(header).encode("utf-8")
+    # the data start may move when the header grows, recompute until it is stable
+    while _align(len(MAGIC) + 8 + len(headerBytes)) != dataStart:
+        dataStart = _align(len(MAGIC) + 8 + len(headerBytes))
+        header["dataStart"] = dataStart
+        headerBytes = json.dumps(header).encode("utf-8")
+    tempPath = Path(f"{path}.tmp")
+    with open(tempPath, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(headerBytes)).tobytes())
+        f.write(headerBytes)
+        f.write(b"\0" * (dataStart - f.tell()))
+        for name, array in prepared.items():
+            position = dataStart + specs[name]["offset"]
+            f.write(b"\0" * (position - f.tell()))
+            f.write(array.tobytes())
+    tempPath.replace(path)
+
+def readHeader(path):
+    """
+    [Function] readHeader
+    Read only the header of a snapshot file.
+
+    Parameter:
+        - path : [string] path to the file
+
+    Return: [Dict] the header, or None if the file is not a snapshot
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        length = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+        return json.loads(f.read(length).decode("utf-8"))
+
+def readArrays(path):
+    """
+    [Function] readArrays
+    Open a snapshot file and memory-map its arrays.
+
+    Parameter:
+        - path : [string] path to the file
+
+    Return: ([Dict], [Dict]) the header and a dictionary of read-only memory-mapped arrays
+    """
+    header = readHeader(path)
+    if header is None:
+        raise ValueError(f"{path} is not an Epidemicon snapshot")
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec["dtype"], mode="r", offset=header["dataStart"] + spec["offset"], shape=shape)
+    return header, arrays
+
+def packStrings(strings):
+    """
+    [Function] packStrings
+    Pack a list of strings into a byte array and an offset array.
+
+    Parameter:
+        - strings : [array] list of strings
+
+    Return: ([np.array], [np.array]) utf-8 data (uint8) and offsets (int64, len(strings)+1)
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if len(encoded) > 0:
+        offsets[1:] = np.cumsum([len(s) for s in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def unpackStrings(data, offsets):
+    """
+    [Function] unpackStrings
+    Reverse of packStrings.
+
+    Parameter:
+        - data    : [np.array] utf-8 data
+        - offsets : [np.array] offsets
+
+    Return: [array] list of strings
+    """
+    raw = bytes(data)
+    bounds = offsets.tolist()
+    return [raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+def packCSR(lists):
+    """
+    [Function] packCSR
+    Pack a list of integer lists into a (pointer, values) pair.
+
+    Return: ([np.array], [np.array]) int64 pointer and int32 values
+    """
+    pointer = np.zeros(len(lists) + 1, dtype=np.int64)
+    if len(lists) > 0:
+        pointer[1:] = np.cumsum([len(x) for x in lists])
+    values = np.fromiter((v for x in lists for v in x), dtype=np.int32, count=int(pointer[-1]))
+    return pointer, values
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _wayKind(way):
+    """
+    [Function] _wayKind
+    Find in which list of the map a way ended up after constructMap.
+    """
+    if 'building' in way.tags.keys():
+        return WAY_BUILDING
+    elif 'natural' in way.tags.keys():
+        return WAY_NATURAL
+    elif 'leisure' in way.tags.keys():
+        return WAY_LEISURE
+    elif 'amenity' in way.tags.keys():
+        return WAY_AMENITY
+    elif 'highway' in way.tags.keys():
+        return WAY_HIGHWAY
+    return WAY_OTHER
+
+def saveMap(osmMap, path, key = ""):
+    """
+    [Function] saveMap
+    Write a fully constructed map (after recalculateGrid, and generateRandomBuildingType if used) into a snapshot file.
+
+    Parameter:
+        - osmMap : [Map] the map
+        - path   : [string] path to the snapshot file
+        - key    : [string] the snapshot key (see snapshotKey)
+    """
+    # index every node: osm nodes first, then the nodes generated by Road.generateNodes
+    nodes = osmMap.allNodes()
+    index = {id(node): i for i, node in enumerate(nodes)}
+
+    gridIndex = {}
+    for x in range(0, osmMap.gridSize[0]):
+        for y in range(0, osmMap.gridSize[1]):
+            grid = osmMap.grids[x][y]
+            if grid != 0:
+                gridIndex[id(grid)] = (x, y)
+    nodeGrid = np.full((len(nodes), 2), -1, dtype=np.int32)
+    nodeLat = np.empty(len(nodes), dtype=np.float64)
+    nodeLon = np.empty(len(nodes), dtype=np.float64)
+    nodeFlags = np.zeros(len(nodes), dtype=np.uint8)
+    nodeIds = []
+    nodeTags = []
+    for i, node in enumerate(nodes):
+        nodeLat[i] = node.coordinate.lat
+        nodeLon[i] = node.coordinate.lon
+        nodeFlags[i] = (1 if node.isRoad else 0) | (2 if node.isBuildingCentroid else 0) | (4 if isinstance(node.osmId, int) else 0)
+        nodeIds.append(f"{node.osmId}")
+        nodeTags.append(json.dumps(node.tags) if len(node.tags) > 0 else "")
+        if node.grid is not None and id(node.grid) in gridIndex:
+            nodeGrid[i] = gridIndex[id(node.grid)]
+    connectionPointer, connections = packCSR([[index[id(c)] for c in node.connections] for node in nodes])
+
+    wayIndex = {id(way): i for i, way in enumerate(osmMap.ways)}
+    wayNodePointer, wayNodes = packCSR([[index[id(n)] for n in way.nodes] for way in osmMap.ways])
+    wayKind = np.array([_wayKind(way) for way in osmMap.ways], dtype=np.uint8)
+
+    roadIndex = {id(road): i for i, road in enumerate(osmMap.roads)}
+    roadStart = np.array([index[id(r.start)] for r in osmMap.roads], dtype=np.int32)
+    roadDestination = np.array([index[id(r.destination)] for r in osmMap.roads], dtype=np.int32)
+    roadLength = np.array([r.length for r in osmMap.roads], dtype=np.float64)
+    roadWay = np.array([wayIndex.get(id(r.way), -1) for r in osmMap.roads], dtype=np.int32)
+
+    buildings = osmMap.buildings
+    buildingWay = np.array([wayIndex[id(b.way)] for b in buildings], dtype=np.int32)
+    buildingId = np.array([b.buildingId for b in buildings], dtype=np.int64)
+    buildingCoordinate = np.array([b.coordinate.getLatLon() for b in buildings], dtype=np.float64).reshape(-1, 2)
+    buildingEntry = np.array([b.entryPoint.getLatLon() if b.entryPoint is not None else (np.nan, np.nan) for b in buildings], dtype=np.float64).reshape(-1, 2)
+    buildingNode = np.array([index[id(b.node)] if b.node is not None else -1 for b in buildings], dtype=np.int32)
+    buildingEntryNode = np.array([index[id(b.entryPointNode)] if b.entryPointNode is not None else -1 for b in buildings], dtype=np.int32)
+    buildingRoad = np.array([roadIndex[id(b.closestRoad)] if b.closestRoad is not None else -1 for b in buildings], dtype=np.int32)
+
+    roadNodes = np.array([index[id(n)] for n in osmMap.roadNodes], dtype=np.int32)
+
+    arrays = {}
+    arrays["nodeLat"] = nodeLat
+    arrays["nodeLon"] = nodeLon
+    arrays["nodeFlags"] = nodeFlags
+    arrays["nodeGrid"] = nodeGrid
+    arrays["nodeIds"], arrays["nodeIdsOffsets"] = packStrings(nodeIds)
+    arrays["nodeTags"], arrays["nodeTagsOffsets"] = packStrings(nodeTags)
+    arrays["connectionPointer"] = connectionPointer
+    arrays["connections"] = connections
+    arrays["wayIds"], arrays["wayIdsOffsets"] = packStrings([way.osmId for way in osmMap.ways])
+    arrays["wayTags"], arrays["wayTagsOffsets"] = packStrings([json.dumps(way.tags) for way in osmMap.ways])
+    arrays["wayNodePointer"] = wayNodePointer
+    arrays["wayNodes"] = wayNodes
+    arrays["wayKind"] = wayKind
+    arrays["roadStart"] = roadStart
+    arrays["roadDestination"] = roadDestination
+    arrays["roadLength"] = roadLength
+    arrays["roadWay"] = roadWay
+    arrays["roadNodes"] = roadNodes
+    arrays["buildingWay"] = buildingWay
+    arrays["buildingId"] = buildingId
+    arrays["buildingCoordinate"] = buildingCoordinate
+    arrays["buildingEntry"] = buildingEntry
+    arrays["buildingNode"] = buildingNode
+    arrays["buildingEntryNode"] = buildingEntryNode
+    arrays["buildingRoad"] = buildingRoad
+    arrays["buildingType"], arrays["buildingTypeOffsets"] = packStrings([f"{b.type}" for b in buildings])
+
+    header = {}
+    header["version"] = VERSION
+    header["key"] = key
+    header["mapHash"] = osmMap.mapHash
+    header["origin"] = osmMap.origin.getLatLon()
+    header["end"] = osmMap.end.getLatLon()
+    header["gridSize"] = list(osmMap.gridSize)
+    header["gridCellHeight"] = osmMap.gridCellHeight
+    header["gridCellWidth"] = osmMap.gridCellWidth
+    header["num_nodes"] = osmMap.num_nodes
+    header["num_ways"] = osmMap.num_ways
+    header["osmNodeCount"] = len(osmMap.nodes)
+    writeArrays(path, header, arrays)
+
+def isValidSnapshot(path, key = None):
+    """
+    [Function] isValidSnapshot
+    Check whether a snapshot exists, has the current version and (optionally) matches the key.
+
+    Parameter:
+        - path : [string] path to the snapshot file
+        - key  : [string] the expected snapshot key, None to skip the check
+
+    Return: [Bool]
+    """
+    if path is None or not Path(path).is_file():
+        return False
+    try:
+        header = readHeader(path)
+    except (OSError, ValueError):
+        return False
+    if header is None or header.get("version") != VERSION:
+        return False
+    return key is None or header.get("key") == key
+
+def restoreMap(osmMap, header, arrays):
+    """
+    [Function] restoreMap
+    Fill an empty map (created with the snapshot grid size) from the snapshot arrays. The Node, Way, Road and Building objects are
+    created from the arrays, the node arrays the RoadGraph needs are returned as memory-mapped views instead of being rebuilt from
+    the objects.
+
+    Parameter:
+        - osmMap  : [Map] the empty map
+        - header  : [Dict] the snapshot header
+        - arrays  : [Dict] the snapshot arrays (see readArrays)
+
+    Return: [Dict] the "lat", "lon", "isRoad", "isBuildingCentroid", "indptr" and "indices" arrays of the nodes in the order of
+            Map.allNodes(), to be passed to Map.buildGraph
+    """
+    osmMap.origin = Coordinate(*header["origin"])
+    osmMap.end = Coordinate(*header["end"])
+    osmMap.gridCellHeight = header["gridCellHeight"]
+    osmMap.gridCellWidth = header["gridCellWidth"]
+    osmMap.generateGrid()
+
+    # nodes
+    nodeLat = arrays["nodeLat"].tolist()
+    nodeLon = arrays["nodeLon"].tolist()
+    nodeFlags = arrays["nodeFlags"].tolist()
+    nodeGrid = arrays["nodeGrid"].tolist()
+    nodeIds = unpackStrings(arrays["nodeIds"], arrays["nodeIdsOffsets"])
+    nodeTags = unpackStrings(arrays["nodeTags"], arrays["nodeTagsOffsets"])
+    osmNodeCount = header["osmNodeCount"]
+    nodes = []
+    for i in range(0, len(nodeLat)):
+        node = Node()
+        flags = nodeFlags[i]
+        node.osmId = int(nodeIds[i]) if flags & 4 else nodeIds[i]
+        node.coordinate = Coordinate(nodeLat[i], nodeLon[i])
+        node.isRoad = bool(flags & 1)
+        node.isBuildingCentroid = bool(flags & 2)
+        if nodeTags[i] != "":
+            node.tags = json.loads(nodeTags[i])
+        x, y = nodeGrid[i]
+        if x >= 0:
+            grid = osmMap.grids[x][y]
+            node.grid = grid
+            if i < osmNodeCount:
+                grid.addNode(node)
+        nodes.append(node)
+    pointer = arrays["connectionPointer"].tolist()
+    connections = arrays["connections"].tolist()
+    for i, node in enumerate(nodes):
+        node.connections = [nodes[c] for c in connections[pointer[i]:pointer[i + 1]]]
+    osmMap.nodes = nodes[:osmNodeCount]
+    osmMap.nodesDict = {f"n{node.osmId}": node for node in osmMap.nodes}
+    osmMap.num_nodes = header["num_nodes"]
+
+    # ways
+    wayIds = unpackStrings(arrays["wayIds"], arrays["wayIdsOffsets"])
+    wayTags = unpackStrings(arrays["wayTags"], arrays["wayTagsOffsets"])
+    pointer = arrays["wayNodePointer"].tolist()
+    wayNodes = arrays["wayNodes"].tolist()
+    wayKind = arrays["wayKind"].tolist()
+    ways = []
+    for i in range(0, len(wayIds)):
+        way = Way()
+        way.osmId = wayIds[i]
+        way.tags = json.loads(wayTags[i])
+        way.nodes = [nodes[n] for n in wayNodes[pointer[i]:pointer[i + 1]]]
+        for node in way.nodes:
+            node.addWay(way)
+        ways.append(way)
+        if wayKind[i] == WAY_NATURAL:
+            osmMap.naturals.append(way)
+        elif wayKind[i] == WAY_LEISURE:
+            osmMap.leisures.append(way)
+        elif wayKind[i] == WAY_AMENITY:
+            osmMap.amenities.append(way)
+        elif wayKind[i] == WAY_OTHER:
+            osmMap.others.append(way)
+    osmMap.ways = ways
+    osmMap.waysDict = {f"n{way.osmId}": way for way in ways}
+    osmMap.num_ways = header["num_ways"]
+
+    # roads
+    roadStart = arrays["roadStart"].tolist()
+    roadDestination = arrays["roadDestination"].tolist()
+    roadLength = arrays["roadLength"].tolist()
+    roadWay = arrays["roadWay"].tolist()
+    for i in range(0, len(roadStart)):
+        way = ways[roadWay[i]] if roadWay[i] >= 0 else None
+        road = Road(nodes[roadStart[i]], nodes[roadDestination[i]], way, length = roadLength[i])
+        osmMap.roadsDict[road.name] = road
+        osmMap.roads.append(road)
+        if (road.start.grid is not None):
+            road.start.grid.addRoad(road)
+        if (road.destination.grid is not None):
+            road.destination.grid.addRoad(road)
+    roadNodes = arrays["roadNodes"].tolist()
+    osmMap.roadNodes = [nodes[i] for i in roadNodes]
+    osmMap.roadNodesDict = {node.osmId: node for node in osmMap.roadNodes}
+
+    # buildings
+    buildingWay = arrays["buildingWay"].tolist()
+    buildingId = arrays["buildingId"].tolist()
+    buildingCoordinate = arrays["buildingCoordinate"].tolist()
+    buildingEntry = arrays["buildingEntry"].tolist()
+    buildingNode = arrays["buildingNode"].tolist()
+    buildingEntryNode = arrays["buildingEntryNode"].tolist()
+    buildingRoad = arrays["buildingRoad"].tolist()
+    buildingType = unpackStrings(arrays["buildingType"], arrays["buildingTypeOffsets"])
+    for i in range(0, len(buildingWay)):
+        building = Building(ways[buildingWay[i]], buildingId = buildingId[i], coordinate = Coordinate(*buildingCoordinate[i]))
+        building.setType(buildingType[i] if buildingType[i] != "None" else None)
+        if not np.isnan(buildingEntry[i][0]):
+            building.entryPoint = Coordinate(*buildingEntry[i])
+        if buildingRoad[i] >= 0:
+            building.closestRoad = osmMap.roads[buildingRoad[i]]
+            building.closestRoad.addBuilding(building)
+        if buildingNode[i] >= 0:
+            building.node = nodes[buildingNode[i]]
+            building.node.setBuilding(building)
+        if buildingEntryNode[i] >= 0:
+            building.entryPointNode = nodes[buildingEntryNode[i]]
+        osmMap.addBuilding(building)
+    # the buildings created later must not reuse the restored ids
+    if len(buildingId) > 0:
+        Building.reserveIds(max(buildingId))
+
+    flags = arrays["nodeFlags"]
+    isRoad = (flags & 1) != 0
+    isRoad[arrays["roadNodes"]] = True
+    graphArrays = {}
+    graphArrays["lat"] = arrays["nodeLat"]
+    graphArrays["lon"] = arrays["nodeLon"]
+    graphArrays["isRoad"] = isRoad
+    graphArrays["isBuildingCentroid"] = (flags & 2) != 0
+    graphArrays["indptr"] = arrays["connectionPointer"]
+    graphArrays["indices"] = arrays["connections"]
+    return graphArrays
@@ -0,0 +1,188 @@
+import numpy as np
+from .Projection import LocalProjection
+
+class SegmentIndex():
+    """
+    [Class] SegmentIndex
+    Uniform bucket grid over line segments (for example road segments) in projected meters.
+    The coordinates are projected with a local projection (see Projection.LocalProjection) around the reference coordinate,
+    every segment is registered in every bucket its bounding box overlaps.
+
+    Properties:
+        - reference : (float,float) reference latitude and longitude of the projection
+        - projection: [LocalProjection] the projection
+        - ax, ay    : [np.array] projected start of every segment (meters)
+        - bx, by    : [np.array] projected end of every segment (meters)
+        - cellSize  : [float] bucket size in meters
+        - minX,minY : [float] projected origin of the bucket grid
+        - columns   : [int] number of bucket columns
+        - rows      : [int] number of bucket rows
+        - bucketPointer  : [np.array] CSR pointer, bucket b contains bucketSegments[bucketPointer[b]:bucketPointer[b+1]]
+        - bucketSegments : [np.array] segment indices
+    """
+    def __init__(self, startLat, startLon, endLat, endLon, reference, cellSize = None):
+        """
+        [Constructor]
+        Build the index.
+
+        Parameter:
+            - startLat, startLon : [np.array] coordinate of the start of every segment
+            - endLat, endLon     : [np.array] coordinate of the end of every segment
+            - reference          : (float,float) latitude and longitude used as the origin of the projection
+            - cellSize           : [float] bucket size in meters, chosen from the segment density if None
+        """
+        self.reference = reference
+        self.projection = LocalProjection(reference[0], reference[1])
+        self.ax, self.ay = self.project(np.asarray(startLat, dtype=np.float64), np.asarray(startLon, dtype=np.float64))
+        self.bx, self.by = self.project(np.asarray(endLat, dtype=np.float64), np.asarray(endLon, dtype=np.float64))
+        count = len(self.ax)
+        if count == 0:
+            self.minX, self.minY, self.cellSize, self.columns, self.rows = 0.0, 0.0, 1.0, 1, 1
+            self.bucketPointer = np.zeros(2, dtype=np.int64)
+            self.bucketSegments = np.zeros(0, dtype=np.int32)
+            return
+        lowX = np.minimum(self.ax, self.bx)
+        highX = np.maximum(self.ax, self.bx)
+        lowY = np.minimum(self.ay, self.by)
+        highY = np.maximum(self.ay, self.by)
+        self.minX, self.minY = float(lowX.min()), float(lowY.min())
+        width = max(float(highX.max()) - self.minX, 1.0)
+        height = max(float(highY.max()) - self.minY, 1.0)
+        if cellSize is None:
+            # aim for a handful of segments per bucket
+            cellSize = min(max(np.sqrt(width * height / count) * 2, 25.0), 500.0)
+        self.cellSize = float(cellSize)
+        self.columns = int(width // self.cellSize) + 1
+        self.rows = int(height // self.cellSize) + 1
+
+        # register every segment in every bucket its bounding box overlaps
+        x0, x1 = self.cellX(lowX), self.cellX(highX)
+        y0, y1 = self.cellY(lowY), self.cellY(highY)
+        spanX = x1 - x0 + 1
+        spanY = y1 - y0 + 1
+        perSegment = spanX * spanY
+        segments = np.repeat(np.arange(count, dtype=np.int32), perSegment)
+        local = np.arange(int(perSegment.sum()), dtype=np.int64) - np.repeat(np.cumsum(perSegment) - perSegment, perSegment)
+        cx = np.repeat(x0, perSegment) + local % np.repeat(spanX, perSegment)
+        cy = np.repeat(y0, perSegment) + local // np.repeat(spanX, perSegment)
+        buckets = cy * self.columns + cx
+        order = np.argsort(buckets, kind="stable")
+        self.bucketSegments = segments[order]
+        counts = np.bincount(buckets, minlength=self.columns * self.rows)
+        self.bucketPointer = np.zeros(self.columns * self.rows + 1, dtype=np.int64)
+        self.bucketPointer[1:] = np.cumsum(counts)
+
+    def project(self, lat, lon):
+        """
+        [Method] project
+        Project coordinates into meters around the reference coordinate.
+
+        Parameter:
+            - lat, lon : [np.array] coordinates
+
+        Return: ([np.array],[np.array]) x (east) and y (north) in meters
+        """
+        return self.projection.project(lat, lon)
+
+    def cellX(self, x):
+        return np.clip(((x - self.minX) // self.cellSize).astype(np.int64), 0, self.columns - 1)
+
+    def cellY(self, y):
+        return np.clip(((y - self.minY) // self.cellSize).astype(np.int64), 0, self.rows - 1)
+
+    def pointToSegment(self, px, py, segments):
+        """
+        [Method] pointToSegment
+        Vectorized projection of points onto segments.
+
+        Parameter:
+            - px, py   : [np.array] projected points
+            - segments : [np.array] segment index for every point
+
+        Return: ([np.array],[np.array]) distance in meters and position of the closest point along the segment (0 = start, 1 = end)
+        """
+        ax, ay = self.ax[segments], self.ay[segments]
+        dx, dy = self.bx[segments] - ax, self.by[segments] - ay
+        lengthSquared = dx * dx + dy * dy
+        safeLength = np.where(lengthSquared > 0, lengthSquared, 1.0)
+        t = np.where(lengthSquared > 0, ((px - ax) * dx + (py - ay) * dy) / safeLength, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        ex = ax + t * dx - px
+        ey = ay + t * dy - py
+        return np.sqrt(ex * ex + ey * ey), t
+
+    def nearest(self, lat, lon):
+        """
+        [Method] nearest
+        Find the nearest segment of every point in one batched pass. Buckets are searched in growing rings around each point
+        until no unsearched bucket can contain a closer segment.
+
+        Parameter:
+            - lat, lon : [np.array] coordinates of the points
+
+        Return: ([np.array],[np.array],[np.array]) nearest segment index (-1 if the index is empty), distance in meters,
+                position of the closest point along the segment (0 = start, 1 = end)
+        """
+        px, py = self.project(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        count = len(px)
+        best = np.full(count, -1, dtype=np.int64)
+        bestDistance = np.full(count, np.inf)
+        bestT = np.zeros(count)
+        if count == 0 or len(self.ax) == 0:
+            return best, bestDistance, bestT
+        # the rings are centered on the (possibly virtual, outside of the grid) bucket of every point
+        cx = np.floor((px - self.minX) / self.cellSize).astype(np.int64)
+        cy = np.floor((py - self.minY) / self.cellSize).astype(np.int64)
+        outside = np.maximum(np.maximum(-cx, cx - (self.columns - 1)), np.maximum(-cy, cy - (self.rows - 1)))
+        lastRing = max(self.columns, self.rows) + max(int(outside.max()), 0)
+        active = np.arange(count)
+        ring = 0
+        while len(active) > 0 and ring <= lastRing:
+            offsets = ringOffsets(ring)
+            pointIds = np.repeat(active, len(offsets))
+            bx = np.repeat(cx[active], len(offsets)) + np.tile(offsets[:, 0], len(active))
+            by = np.repeat(cy[active], len(offsets)) + np.tile(offsets[:, 1], len(active))
+            valid = (bx >= 0) & (bx < self.columns) & (by >= 0) & (by < self.rows)
+            pointIds, buckets = pointIds[valid], (by * self.columns + bx)[valid]
+            starts = self.bucketPointer[buckets]
+            sizes = self.bucketPointer[buckets + 1] - starts
+            if sizes.sum() > 0:
+                candidatePoints = np.repeat(pointIds, sizes)
+                local = np.arange(int(sizes.sum()), dtype=np.int64) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+                candidates = self.bucketSegments[np.repeat(starts, sizes) + local]
+                distances, t = self.pointToSegment(px[candidatePoints], py[candidatePoints], candidates)
+                # keep the closest candidate of every point, ties are broken by the lowest segment index
+                order = np.lexsort((candidates, distances, candidatePoints))
+                candidatePoints, candidates, distances, t = candidatePoints[order], candidates[order], distances[order], t[order]
+                first = np.ones(len(candidatePoints), dtype=bool)
+                first[1:] = candidatePoints[1:] != candidatePoints[:-1]
+                candidatePoints, candidates, distances, t = candidatePoints[first], candidates[first], distances[first], t[first]
+                better = (distances < bestDistance[candidatePoints]) | ((distances == bestDistance[candidatePoints]) & (candidates < best[candidatePoints]))
+                candidatePoints, candidates, distances, t = candidatePoints[better], candidates[better], distances[better], t[better]
+                best[candidatePoints] = candidates
+                bestDistance[candidatePoints] = distances
+                bestT[candidatePoints] = t
+            # every segment that was not searched yet is at least ring * cellSize meters away
+            active = active[bestDistance[active] > ring * self.cellSize]
+            ring += 1
+        return best, bestDistance, bestT
+
+def ringOffsets(ring):
+    """
+    [Function] ringOffsets
+    Bucket offsets at an exact Chebyshev distance from the center bucket.
+
+    Parameter:
+        - ring : [int] the distance (0 is the center bucket)
+
+    Return: [np.array] (n,2) array of (dx,dy) offsets
+    """
+    if ring == 0:
+        return np.zeros((1, 2), dtype=np.int64)
+    span = np.arange(-ring, ring + 1, dtype=np.int64)
+    top = np.stack([span, np.full(len(span), ring)], axis=1)
+    bottom = np.stack([span, np.full(len(span), -ring)], axis=1)
+    inner = np.arange(-ring + 1, ring, dtype=np.int64)
+    left = np.stack([np.full(len(inner), -ring), inner], axis=1)
+    right = np.stack([np.full(len(inner), ring), inner], axis=1)
+    return np.concatenate([top, bottom, left, right])
@@ -7,6 +7,7 @@ class Way():
         - osmId : Open Street Map ID.
         - nodes : List of Nodes included in this way.
         - tags : A dictionary of the Map Feature of this object (check Open Street Map - Map Features).
+        - gaps : Positions in nodes where nodes of the Open Street Map way are missing (not loaded or clipped), nodes[i-1] and nodes[i] are not adjacent.
     """
     
     def __init__(self):
@@ -17,6 +18,7 @@ class Way():
         self.osmId = ""
         self.nodes = []    
         self.tags = {}
+        self.gaps = []
         
     def fill(self, osmWay, nodes):
         """
@@ -29,16 +31,22 @@ class Way():
         Parameter:
             - osmWay = osmium way node.
             - nodes = list to fill our version of Nodes.
+        
+        Nodes that are not in the dictionary (outside of the clip area or of the extract) are skipped and recorded in gaps.
         """
         self.osmId = f"{osmWay.id}"
 
+        missing = False
         for node in osmWay.nodes:
-            temp = nodes[f"n{node.ref}"]
+            temp = nodes.get(f"n{node.ref}")
             if (temp is not None):
+                if missing and len(self.nodes) > 0:
+                    self.gaps.append(len(self.nodes))
+                missing = False
                 self.nodes.append(temp)
                 temp.addWay(self)
             else:
-                print("\n\nNode not Found\n\n")
+                missing = True
             
         for tag in osmWay.tags:
             self.tags[tag.k] = tag.v
@@ -1,18 +1,66 @@
+import math
 import random
 from .Infection import Infection 
+from .Population import Population, column, INFECTION_STATUSES, STATUSES, ACTIVITIES, GENDERS
+from .AgentCoordinate import AgentCoordinate
 class Agent:
     """
     [Class] Agent
-    
+    Thin view over the row of this agent in a Population: the fields listed under Population Properties are read from and
+    written to the typed arrays of the population, the other ones are kept in the object.
     
     Properties:
         - home : [] the building the house is in
-        - currentLocation : [Coordinate] the agents that live inside this home
-        - infection_status : [string] SEIR (Susceptible, Exposed, Infectious, Recovered)
-        - age :[int] Age
+        - currentLocation : [AgentCoordinate] current location, kept in the lat and lon columns of the population
         - mainJob : [Job] job
+        - population = [Population] the population holding the fields of this agent
+        - row = [int] row of this agent in the population
+        
+    Population Properties:
+        - infectionStatus : [string] SEIR (Susceptible, Exposed, Infectious, Recovered)
+        - status : [string] health status (Normal, Symptomatics, Severe)
+        - activities : [string] current activity (see Population.ACTIVITIES)
+        - gender, age, risk, vaccinated, speed
+        - hunger, hungerCap, hungerReduction, hair, hairCap, idle, energy, eatingOutPref : needs of the agent
+        - currentNode : [Node] current node, stored as its graph index
+        - distanceToDestination : [float] distance to the destination of the current route, None if there is no path
     """
-    def __init__(self,agentId, osmMap,age,job,gender = None):
+    infectionStatus = column("infectionStatus", INFECTION_STATUSES)
+    status = column("status", STATUSES)
+    activities = column("activities", ACTIVITIES)
+    gender = column("gender", GENDERS)
+    vaccinated = column("vaccinated")
+    risk = column("risk")
+    age = column("age")
+    hunger = column("hunger")
+    hungerCap = column("hungerCap")
+    hungerReduction = column("hungerReduction")
+    hair = column("hair")
+    hairCap = column("hairCap")
+    idle = column("idle")
+    energy = column("energy")
+    eatingOutPref = column("eatingOutPref")
+    speed = column("speed")
+
+    def __init__(self,agentId, osmMap,age,job,gender = None,population = None):
+        """
+        [Constructor]
+        Initialize an agent
+
+        Parameter:
+            - agentId = [int] id of the agent, also its row in the population
+            - osmMap = [Map] the map
+            - age = [int] age
+            - job = [JobClass] the job class the job of the agent is generated from
+            - gender = [string] "M" or "F", random if None
+            - population = [Population] the population holding the fields of the agent, a population of one agent is created if None
+        """
+        if population is None:
+            population = Population(1)
+            self.row = 0
+        else:
+            self.row = agentId
+        self.population = population
         self.home = None
         
         if (gender is None):
@@ -49,6 +97,34 @@ class Agent:
         self.activities = "idle"
         self.vaccinated = False
         
+    @property
+    def currentNode(self):
+        """
+        [Property] currentNode
+        Return: [Node] the current node of the agent, None if it has none
+        """
+        index = self.population.node[self.row]
+        if index < 0:
+            return None
+        return self.osmMap.graph.node(int(index))
+    
+    @currentNode.setter
+    def currentNode(self,node):
+        self.population.node[self.row] = -1 if node is None else node.graphIndex
+        
+    @property
+    def distanceToDestination(self):
+        """
+        [Property] distanceToDestination
+        Return: [float] distance to the destination of the current route in meters, None if there is no path
+        """
+        distance = self.population.distance[self.row].item()
+        return None if math.isnan(distance) else distance
+    
+    @distanceToDestination.setter
+    def distanceToDestination(self,distance):
+        self.population.distance[self.row] = math.nan if distance is None else distance
+        
     def setVaccinated(self, vaccinated = True):
         """
         [Method] setVaccinated
@@ -68,7 +144,7 @@ class Agent:
             - home = [Home] the home object
         """
         self.home = home
-        self.currentLocation = home.coordinate().newCoordinateWithTranslation()
+        self.currentLocation = AgentCoordinate(self.population, self.row, home.coordinate().lat, home.coordinate().lon)
         self.currentNode = home.node()
         
     def setMovementSequence(self, activeSequence):
@@ -77,7 +153,7 @@ class Agent:
         set the movement sequence for this agent
 
         Parameter =
-            - home = [MovementSequence] the sequence calculated by pathfinding function
+            - activeSequence = [RouteCursor] the cursor on the route calculated by pathfinding function
         """
         self.activeSequence = activeSequence
         
@@ -93,7 +169,42 @@ class Agent:
         """
         return self.speed
     
-    def checkSchedule(self,day,hour,steps=1):    
+    def requestPath(self,building,requests=None):
+        """
+        [Method] requestPath
+        Ask for the route to a building. Without a request list the path is found right away, otherwise (self, building) is added
+        to the list and the caller sets the route later with setPath (see Map.findPaths).
+
+        Parameter:
+            - building = [Building] the destination
+            - requests = [array] list of pending (agent, building) routing requests or None
+        """
+        if requests is None:
+            self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,building)
+        else:
+            requests.append((self,building))
+            
+    def setPath(self,distance,activeSequence):
+        """
+        [Method] setPath
+        Set the route found for a request added by requestPath
+
+        Parameter:
+            - distance = [float] distance to the destination in meters
+            - activeSequence = [RouteCursor] the cursor on the route (None if there is no path)
+        """
+        self.distanceToDestination = distance
+        self.activeSequence = activeSequence
+        
+    def isTravelling(self):
+        """
+        [Method] isTravelling
+        return:
+            - [Bool] True if the agent has a route it did not finish yet (checkSchedule does not plan a new activity)
+        """
+        return self.activeSequence is not None and not self.activeSequence.finished
+        
+    def checkSchedule(self,day,hour,steps=1,requests=None):    
         """
         [Method] checkSchedule
         Check what kind of activity the agent will do at current point. If there's an activity, we will generate a movement sequence, if not return None. This also set the type of activity the agents will do. 
@@ -102,9 +213,10 @@ class Agent:
             - day = [int] current simulated day (0-7) 0 = Monday, 7 = Sunday
             - hour = [int] current simulated hour
             - steps = [int] step length in seconds
+            - requests = [array] list the routing requests are added to so they can be resolved in bulk (see requestPath), None to find the path right away
 
         return:
-            - [MovementSequence] the movement sequence for the activity the agent will do
+            - the extracted route for the activity the agent will do (see Route.extract), None if there is no new route
 
         Important: This method is being used by the StepThread.py which is a subclass of multiprocessing class. Hence why the method returns the movement sequence instead of just simply setting the sequence to the agents. In short, this method is not called by main thread but by subthread. 
         """    
@@ -113,7 +225,7 @@ class Agent:
             if self.status == "Symptomatics":
                 if self.currentNode != self.home.node():       
                     #print("I'm sick, I need to go home")
-                    self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.home.building)
+                    self.requestPath(self.home.building,requests)
                     self.activities = "going home"
                 elif self.hunger <= self.hungerCap:
                     #print("I'm sick, so I eat at home")
@@ -122,7 +234,7 @@ class Agent:
                     self.activities = "eat at home"
                 elif self.home.groceries < len(self.home.occupants) * 2:
                     #print("I'm sick, but fridge are empty. I need to go to retailer")
-                    self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.faveRetailer)
+                    self.requestPath(self.faveRetailer,requests)
                     self.activities = "do groceries"
                     #self.home.buyGroceries()
                     #self.idle = 4800
@@ -130,7 +242,7 @@ class Agent:
                 if not self.currentNode.isBuildingCentroid or self.currentNode.building.type != "hospital":
                     self.activities = "go to hospital"
                     #print("I'm sick, I need to go to hospital")
-                    self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.osmMap.getRandomBuilding("hospital"))
+                    self.requestPath(self.osmMap.getRandomBuilding("hospital"),requests)
                 elif self.hunger <= self.hungerCap:
                     #print("I'm sick, so I eat at hospital")
                     #hunger = 1.0
@@ -139,14 +251,14 @@ class Agent:
                 if self.currentNode != self.mainJob.building.node:     
                     self.activities = "go to work"            
                     #print(f"I'm {self.mainJob.getName()} Go to work at {self.mainJob.building.type}")
-                    self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.mainJob.building)
+                    self.requestPath(self.mainJob.building,requests)
             elif self.idle <= 0:
                 if self.hunger <= self.hungerCap:
                     whereToEatProbability = random.randint(0,100)/100.0
                     if (whereToEatProbability <= self.eatingOutPref):
                         #print(f"agent id {self.agentId} is eating outside") 
                         self.activities = "go to restaurant"            
-                        self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.osmMap.getRandomBuilding("restaurant"))
+                        self.requestPath(self.osmMap.getRandomBuilding("restaurant"),requests)
                         #self.idle = 4800
                         #hunger = 1.0
                     else:
@@ -160,26 +272,26 @@ class Agent:
                     #print("going to barbershop")
                     self.activities = "go to barbershop"            
 
-                    self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.faveBarber)
+                    self.requestPath(self.faveBarber,requests)
                     #self.hair = float(random.randint(0,int(self.hairCap/2)))
                     #self.idle = 4800
                 elif self.home.groceries < len(self.home.occupants) * 2:
                     #print("go to retail")
                     self.activities = "do groceries"          
-                    self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.faveRetailer)
+                    self.requestPath(self.faveRetailer,requests)
                     #self.home.buyGroceries()
                     #self.idle = 4800
                 elif self.currentNode != self.home.node():       
                     #print("go home")
                     self.activities = "going home"  
-                    self.distanceToDestination,self.activeSequence = self.osmMap.findPath(self,self.home.building)
+                    self.requestPath(self.home.building,requests)
             
         if (self.activeSequence is not None and self.activeSequence.new):
             return self.activeSequence.extract()
         return None
                 #gohome    
                 
-    def step(self,day,hour,steps=1):
+    def step(self,day,hour,steps=1,move=True):
         """
         [Method] step
         The actual step function used to trigger the movement sequence and move the agent position in the map.
@@ -188,6 +300,7 @@ class Agent:
             - day = [int] current simulated day (0-7) 0 = Monday, 7 = Sunday
             - hour = [int] current simulated hour
             - steps = [int] step length in seconds
+            - move = [Bool] move the agent along its route, False when the Simulator moves all the agents at once (see Movement)
         """    
         if (self.activities == "eat at home" and self.idle <= 0):
             self.home.consumeGroceries()
@@ -217,15 +330,15 @@ class Agent:
         self.hunger -= self.hungerReduction/(24*(3600/steps))
         self.idle -= steps
         
-        if self.activeSequence is not None and self.idle <= 0:
+        if move and self.activeSequence is not None and self.idle <= 0:
             #after recalculate
-            leftOver = steps * self.getSpeed()
-            
-            while leftOver > 0 and not self.activeSequence.finished:
-                leftOver = self.activeSequence.step(leftOver)
-                self.currentNode.removeAgent(self)
-                self.currentNode = self.activeSequence.currentNode
-                self.currentNode.addAgent(self)
+            if not self.activeSequence.finished:
+                # the cursor may pass several nodes in one step, only the node reached at the end of the step is updated
+                self.activeSequence.step(steps * self.getSpeed())
+                if self.activeSequence.currentNode is not self.currentNode:
+                    self.currentNode.removeAgent(self)
+                    self.currentNode = self.activeSequence.currentNode
+                    self.currentNode.addAgent(self)
             self.transition = self.activeSequence.getVector(self.currentLocation)
             self.currentLocation.translate(lat = self.transition[0], lon = self.transition[1])
       
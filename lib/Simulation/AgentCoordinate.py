@@ -0,0 +1,32 @@
+from lib.Map.Coordinate import Coordinate
+from .Population import column
+
+class AgentCoordinate(Coordinate):
+    """
+    [Class] AgentCoordinate
+    Current location of an agent, a Coordinate whose latitude and longitude are kept in the lat and lon columns of the
+    Population so the movement kernel moves the agents in bulk (see Movement).
+
+    Properties:
+        - population : [Population] the population holding the location
+        - row        : [int] row of the agent in the population
+        - lat        : [float] latitude
+        - lon        : [float] longitude
+    """
+    lat = column("lat")
+    lon = column("lon")
+
+    def __init__(self, population, row, lat = 0.0, lon = 0.0):
+        """
+        [Constructor]
+        Initialize the location of an agent
+
+        Parameter:
+            - population : [Population] the population holding the location
+            - row        : [int] row of the agent in the population
+            - lat        : [float] latitude
+            - lon        : [float] longitude
+        """
+        self.population = population
+        self.row = row
+        Coordinate.__init__(self, lat, lon)
@@ -117,7 +117,7 @@ class BasicInfectionModel:
         """
         gradient = 0.05 - self.roadInfectionRate / 2.0
         for stranger in infectiousAgents:
-            distance = stranger.currentLocation.calculateDistance(agent.currentLocation)                
+            distance = stranger.currentLocation.calculateDistance(agent.currentLocation, self.osmMap.projection, self.osmMap.precision)
             infectionProbability = ((gradient* distance) + self.roadInfectionRate)/(24 * 3600/ stepSize)
             if infectionProbability > 0 and random.uniform(0.0,1.0) < infectionProbability: # infect
                 agent.infection = Infection(stranger, 
@@ -1,4 +1,5 @@
 import random
+from .Population import Population, column
 class Home:
     """
     [Class] Home
@@ -8,15 +9,28 @@ class Home:
         - building: [Building] the building the house is in
         - occupants :[List of Agent] the agents that live inside this home
         - agents : [List of Agent] the agents that is currently inside this home
+        - groceries : [int] stock of food, kept in the home row of the population
+        - population : [Population] the population holding the fields of this home
+        - row : [int] row of this home in the population
     """
-    def __init__(self,building,homeId):
+    groceries = column("groceries")
+
+    def __init__(self,building,homeId,population = None):
         """
         [Constructor]
         Initialize an empty home
 
         Parameter:
             - building: [Building] the building the house is in
-        """
+            - homeId: [int] id of the home, also its row in the population
+            - population: [Population] the population holding the fields of the home, a population of one home is created if None
+        """
+        if population is None:
+            population = Population(0, 1)
+            self.row = 0
+        else:
+            self.row = homeId
+        self.population = population
         self.homeId = homeId
         self.building = building
         self.occupants = []
@@ -0,0 +1,197 @@
+import numpy as np
+
+# gap in meters between two packed routes, it keeps the search of an agent inside its own route
+ROUTE_GAP = 1.0
+INITIAL_CAPACITY = 1 << 16
+
+class Movement():
+    """
+    [Class] Movement
+    Batch movement kernel of the agents of a Population. The routes of the travelling agents are packed one after the other in
+    two arrays (node indices and cumulative distances shifted by a base per route, so the packed distances keep increasing) and
+    the progress of every agent is kept in typed arrays. One step advances every moving agent by speed * stepSize with a single
+    searchsorted over the packed distances, interpolates the positions into the lat and lon columns of the population and
+    returns the node changes and arrivals in bulk, so the Python work is proportional to the number of events.
+    The RouteCursor of an agent is only brought up to date on its events (see RouteCursor.setProgress).
+
+    Properties:
+        - population : [Population] the population moved
+        - graph      : [RoadGraph] the graph the routes belong to
+        - indices    : [np.array] int32 packed graph indices of the nodes of the routes
+        - cumulative : [np.array] float64 packed cumulative distances of the routes, shifted by the base of every route
+        - used       : [int] number of packed nodes
+        - nextBase   : [float] base of the next packed route
+        - routes     : [Dict] id of a Route -> (route, packed position, base) of the packed routes
+        - start      : [np.array] int64 packed position of the route of every agent, -1 if the agent has no route
+        - length     : [np.array] int32 number of nodes of the route of every agent
+        - base       : [np.array] float64 base of the route of every agent
+        - end        : [np.array] float64 length of the route of every agent in meters
+        - traveled   : [np.array] float64 distance traveled along the route
+        - position   : [np.array] int32 position in the route of the last node reached
+        - finished   : [np.array] bool is the whole route traveled?
+    """
+    def __init__(self, population, graph, capacity = INITIAL_CAPACITY):
+        """
+        [Constructor]
+        Initialize the kernel without any route
+
+        Parameter:
+            - population : [Population] the population moved
+            - graph      : [RoadGraph] the graph the routes belong to
+            - capacity   : [int] initial number of packed nodes, the arrays grow when needed
+        """
+        self.population = population
+        self.graph = graph
+        self.indices = np.zeros(capacity, dtype = np.int32)
+        self.cumulative = np.zeros(capacity, dtype = np.float64)
+        self.used = 0
+        self.nextBase = 0.0
+        self.routes = {}
+        count = population.agentCount
+        self.start = np.full(count, -1, dtype = np.int64)
+        self.length = np.zeros(count, dtype = np.int32)
+        self.base = np.zeros(count, dtype = np.float64)
+        self.end = np.zeros(count, dtype = np.float64)
+        self.traveled = np.zeros(count, dtype = np.float64)
+        self.position = np.zeros(count, dtype = np.int32)
+        self.finished = np.zeros(count, dtype = np.bool_)
+
+    def attach(self, row, route):
+        """
+        [Method] attach
+        Give a new route to an agent, its progress starts at the origin
+
+        Parameter:
+            - row   : [int] row of the agent in the population
+            - route : [Route] the route
+        """
+        entry = self.routes.get(id(route))
+        if entry is None:
+            entry = self.pack(route)
+        route, start, base = entry
+        self.start[row] = start
+        self.length[row] = len(route)
+        self.base[row] = base
+        self.end[row] = route.cumulative[-1]
+        self.traveled[row] = 0.0
+        self.position[row] = 0
+        self.finished[row] = False
+
+    def pack(self, route):
+        """
+        [Method] pack
+        Add a route to the packed arrays, the routes of the agents that arrived are dropped first if there is no room left
+
+        Parameter:
+            - route : [Route] the route
+
+        Return: (Route, int, float) the route, its packed position and its base
+        """
+        if self.used + len(route) > len(self.indices):
+            self.compact()
+        if self.used + len(route) > len(self.indices):
+            capacity = len(self.indices)
+            while self.used + len(route) > capacity:
+                capacity *= 2
+            self.indices = np.resize(self.indices, capacity)
+            self.cumulative = np.resize(self.cumulative, capacity)
+        return self.append(route)
+
+    def append(self, route):
+        """
+        [Method] append
+        Write a route after the packed routes, there must be room for it
+
+        Parameter:
+            - route : [Route] the route
+
+        Return: (Route, int, float) the route, its packed position and its base
+        """
+        start = self.used
+        count = len(route)
+        base = self.nextBase
+        self.indices[start:start + count] = route.indices
+        self.cumulative[start:start + count] = route.cumulative + base
+        self.used += count
+        self.nextBase = base + float(route.cumulative[-1]) + ROUTE_GAP
+        entry = (route, start, base)
+        self.routes[id(route)] = entry
+        return entry
+
+    def compact(self):
+        """
+        [Method] compact
+        Pack again only the routes of the agents that did not arrive, the agents that arrived lose their route
+        """
+        active = np.nonzero((self.start >= 0) & ~self.finished)[0]
+        self.start[self.finished] = -1
+        byStart = {start: route for route, start, base in self.routes.values()}
+        starts, inverse = np.unique(self.start[active], return_inverse = True)
+        self.routes = {}
+        self.used = 0
+        self.nextBase = 0.0
+        newStarts = np.zeros(len(starts), dtype = np.int64)
+        newBases = np.zeros(len(starts), dtype = np.float64)
+        # the routes are copied from the Route objects, so the packed arrays can be overwritten in order
+        for k, start in enumerate(starts):
+            route, newStarts[k], newBases[k] = self.append(byStart[int(start)])
+        self.start[active] = newStarts[inverse]
+        self.base[active] = newBases[inverse]
+
+    def step(self, steps):
+        """
+        [Method] step
+        Move every agent that has a route it did not finish and is not idle (idle <= 0 in the population)
+
+        Parameter:
+            - steps : [int] step length in seconds
+
+        return :
+            - changed  : [np.array] rows of the agents that reached another node
+            - previous : [np.array] graph index of the node they left
+            - current  : [np.array] graph index of the node they reached (already written in the node column)
+            - arrived  : [np.array] rows of the agents that finished their route during this step
+        """
+        population = self.population
+        rows = np.nonzero((self.start >= 0) & ~self.finished & (population.idle <= 0))[0]
+        if len(rows) == 0:
+            empty = np.zeros(0, dtype = np.int64)
+            return empty, empty, empty, empty
+        traveled = self.traveled[rows]
+        end = self.end[rows]
+        distances = population.speed[rows] * steps
+        # same rule as RouteCursor.step: the agent arrives when the step goes past the end of the route
+        arrived = (traveled >= end) | (traveled + distances > end)
+        traveled = np.where(arrived, end, traveled + distances)
+        self.traveled[rows] = traveled
+        self.finished[rows] = arrived
+
+        start = self.start[rows]
+        last = start + self.length[rows] - 1
+        key = self.base[rows] + traveled
+        found = np.searchsorted(self.cumulative[:self.used], key, side = "right") - 1
+        found = np.minimum(np.maximum(found, start), last)
+        self.position[rows] = found - start
+
+        nodes = self.indices[found]
+        following = np.minimum(found + 1, last)
+        nextNodes = self.indices[following]
+        segment = self.cumulative[following] - self.cumulative[found]
+        progress = np.divide(key - self.cumulative[found], segment, out = np.zeros(len(rows)), where = segment > 0)
+        lat, lon = self.graph.lat, self.graph.lon
+        population.lat[rows] = lat[nodes] + progress * (lat[nextNodes] - lat[nodes])
+        population.lon[rows] = lon[nodes] + progress * (lon[nextNodes] - lon[nodes])
+
+        previous = population.node[rows]
+        moved = nodes != previous
+        changed = rows[moved]
+        population.node[changed] = nodes[moved]
+        return changed, previous[moved], nodes[moved], rows[arrived]
+
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] memory used by the arrays in bytes (the Route objects are not included)
+        """
+        return self.indices.nbytes + self.cumulative.nbytes + self.start.nbytes + self.length.nbytes + self.base.nbytes + \
+               self.end.nbytes + self.traveled.nbytes + self.position.nbytes + self.finished.nbytes
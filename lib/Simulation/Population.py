@@ -0,0 +1,148 @@
+"""
+Struct of arrays store of the agents and their homes.
+
+Every field of the agents that changes during the simulation (and the small fixed ones read every step) is kept in one typed
+NumPy array per field, the row of an agent is its id. The strings are stored as int8 codes (see the code tables below). Agent
+and Home are thin views over one row (see column), so the phases of the Simulator can work on whole columns at once.
+When the population is shared the arrays live in one multiprocessing.shared_memory block, the StepThreads forked from the
+Simulator then read and write the same rows in place.
+"""
+import numpy as np
+from multiprocessing import shared_memory
+
+INFECTION_STATUSES = ["Susceptible", "Exposed", "Infectious", "Recovered"]
+STATUSES = ["Normal", "Symptomatics", "Severe"]
+ACTIVITIES = ["idle", "going home", "eat at home", "do groceries", "go to hospital", "eat at hospital", "go to work",
+              "go to restaurant", "go to barbershop"]
+GENDERS = ["M", "F"]
+
+AGENT_FIELDS = [
+    ("infectionStatus", np.int8),
+    ("status", np.int8),
+    ("activities", np.int8),
+    ("gender", np.int8),
+    ("travelling", np.int8),
+    ("vaccinated", np.bool_),
+    ("risk", np.int8),
+    ("age", np.int16),
+    ("node", np.int32),
+    ("hunger", np.float64),
+    ("hungerCap", np.float64),
+    ("hungerReduction", np.float64),
+    ("hair", np.float64),
+    ("hairCap", np.float64),
+    ("idle", np.float64),
+    ("energy", np.float64),
+    ("eatingOutPref", np.float64),
+    ("speed", np.float64),
+    ("distance", np.float64),
+    ("lat", np.float64),
+    ("lon", np.float64),
+]
+HOME_FIELDS = [
+    ("groceries", np.int32),
+]
+
+class Population():
+    """
+    [Class] Population
+    Typed arrays of the agent and home fields
+
+    Properties:
+        - agentCount : [int] number of agent rows
+        - homeCount  : [int] number of home rows
+        - memory     : [SharedMemory] the block holding the arrays, None if the population is not shared
+        - <field>    : [np.array] one array per entry of AGENT_FIELDS (agentCount rows) and HOME_FIELDS (homeCount rows)
+            | node = graph index of the current node, -1 if none
+            | distance = distance to the destination in meters, nan if there is no path
+            | lat, lon = current location (see AgentCoordinate)
+            | travelling = 1 if the agent has a route it did not finish (set by the Simulator before the pathfinding)
+    """
+    def __init__(self, agentCount, homeCount = None, shared = False):
+        """
+        [Constructor]
+        Allocate the arrays. A shared population must be created before the StepThreads are started so the workers inherit it.
+
+        Parameter:
+            - agentCount : [int] number of agents
+            - homeCount  : [int] number of homes, agentCount if None (every home has at least one occupant)
+            - shared     : [Bool] allocate the arrays in shared memory
+        """
+        self.agentCount = agentCount
+        self.homeCount = agentCount if homeCount is None else homeCount
+        fields = [(name, dtype, self.agentCount) for name, dtype in AGENT_FIELDS]
+        fields += [(name, dtype, self.homeCount) for name, dtype in HOME_FIELDS]
+        self.memory = None
+        if shared:
+            offsets = []
+            size = 0
+            for name, dtype, count in fields:
+                offsets.append(size)
+                # keep every array aligned on 8 bytes
+                size += (np.dtype(dtype).itemsize * count + 7) // 8 * 8
+            self.memory = shared_memory.SharedMemory(create = True, size = max(size, 1))
+            for (name, dtype, count), offset in zip(fields, offsets):
+                setattr(self, name, np.ndarray((count,), dtype = dtype, buffer = self.memory.buf, offset = offset))
+        else:
+            for name, dtype, count in fields:
+                setattr(self, name, np.zeros(count, dtype = dtype))
+        self.node[:] = -1
+
+    def count(self, name, codes):
+        """
+        [Method] count
+        Count the rows of every code of a coded column
+
+        Parameter:
+            - name  : [string] name of the column, for example "infectionStatus"
+            - codes : [array] the code table of the column, for example INFECTION_STATUSES
+
+        Return: [Dict] value -> number of agents
+        """
+        counts = np.bincount(getattr(self, name), minlength = len(codes))
+        return {value: int(counts[code]) for code, value in enumerate(codes)}
+
+    def close(self):
+        """
+        [Method] close
+        Release the shared block, the agents cannot be used anymore. Nothing is done if the population is not shared.
+        """
+        if self.memory is None:
+            return
+        for name, dtype in AGENT_FIELDS + HOME_FIELDS:
+            setattr(self, name, None)
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] memory used by the arrays in bytes
+        """
+        return sum(np.dtype(dtype).itemsize for name, dtype in AGENT_FIELDS) * self.agentCount + \
+               sum(np.dtype(dtype).itemsize for name, dtype in HOME_FIELDS) * self.homeCount
+
+def column(name, codes = None):
+    """
+    [Function] column
+    Property reading and writing one row of a column of the Population, for the classes viewing a row (self.population, self.row)
+
+    Parameter:
+        - name  : [string] name of the column
+        - codes : [array] code table of the column, the property then reads and writes the values of the table
+
+    Return: [property] the property
+    """
+    if codes is None:
+        def getter(self):
+            return getattr(self.population, name)[self.row].item()
+        def setter(self, value):
+            getattr(self.population, name)[self.row] = value
+    else:
+        lookup = {value: code for code, value in enumerate(codes)}
+        def getter(self):
+            return codes[getattr(self.population, name)[self.row]]
+        def setter(self, value):
+            getattr(self.population, name)[self.row] = lookup[value]
+    return property(getter, setter)
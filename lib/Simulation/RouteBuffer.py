@@ -0,0 +1,123 @@
+import numpy as np
+from multiprocessing import shared_memory
+from lib.Map.Route import Route
+
+# number of route nodes every StepThread can write per hour
+DEFAULT_CAPACITY = 1 << 20
+
+class RouteBuffer():
+    """
+    [Class] RouteBuffer
+    Preallocated multiprocessing.shared_memory buffers the StepThreads write the new routes of an hour in. The node indices
+    and cumulative distances of the routes are written one after the other in the segment of the thread and every agent
+    gets the offset and the length of its run, so the Simulator attaches the routes without pickling or recomputing them.
+    The routes that do not fit in the segment are left to the caller (see StepThread.step).
+
+    Properties:
+        - memory     : [SharedMemory] the block holding the arrays
+        - capacity   : [int] number of route nodes of the segment of one thread
+        - offset     : [np.array] int64 position of the route of every agent (indexed by agent id), -1 if it got no new route
+        - length     : [np.array] int32 number of nodes of the route of every agent
+        - indices    : [np.array] int32 graph indices of the route nodes, segment i of capacity nodes belongs to thread i
+        - cumulative : [np.array] float64 distance from the origin of every route node
+        - used       : [int] number of nodes written in the segment of this process during the current hour
+    """
+    def __init__(self, agentCount, threadCount, capacity = DEFAULT_CAPACITY):
+        """
+        [Constructor]
+        Allocate the buffers, they must be created before the StepThreads are started so the workers inherit them
+
+        Parameter:
+            - agentCount  : [int] number of agents (the agent ids go from 0 to agentCount - 1)
+            - threadCount : [int] number of StepThreads, each one gets its own segment
+            - capacity    : [int] number of route nodes of one segment
+        """
+        self.capacity = capacity
+        nodes = capacity * threadCount
+        size = agentCount * 8 + nodes * 8 + (agentCount * 4 + 7) // 8 * 8 + nodes * 4
+        self.memory = shared_memory.SharedMemory(create = True, size = max(size, 1))
+        self.offset = np.ndarray((agentCount,), dtype = np.int64, buffer = self.memory.buf, offset = 0)
+        self.cumulative = np.ndarray((nodes,), dtype = np.float64, buffer = self.memory.buf, offset = agentCount * 8)
+        self.length = np.ndarray((agentCount,), dtype = np.int32, buffer = self.memory.buf, offset = agentCount * 8 + nodes * 8)
+        self.indices = np.ndarray((nodes,), dtype = np.int32, buffer = self.memory.buf,
+                                  offset = agentCount * 8 + nodes * 8 + (agentCount * 4 + 7) // 8 * 8)
+        self.offset[:] = -1
+        self.used = 0
+
+    def clear(self, agentId):
+        """
+        [Method] clear
+        Mark an agent as having no new route
+
+        Parameter:
+            - agentId : [int] id of the agent
+        """
+        self.offset[agentId] = -1
+
+    def write(self, segment, agentId, route):
+        """
+        [Method] write
+        Write the route of an agent in the segment of a thread. The first write of an hour must be preceded by rewind().
+
+        Parameter:
+            - segment : [int] position of the thread
+            - agentId : [int] id of the agent
+            - route   : [Route] the route
+
+        Return: [Bool] False if the segment is full, the route is not written
+        """
+        count = len(route)
+        if self.used + count > self.capacity:
+            self.offset[agentId] = -1
+            return False
+        start = segment * self.capacity + self.used
+        self.indices[start:start + count] = route.indices
+        self.cumulative[start:start + count] = route.cumulative
+        self.offset[agentId] = start
+        self.length[agentId] = count
+        self.used += count
+        return True
+
+    def rewind(self):
+        """
+        [Method] rewind
+        Start writing at the beginning of the segment again, the routes of the previous hour are overwritten
+        """
+        self.used = 0
+
+    def read(self, graph, agentId, totalDistance = None):
+        """
+        [Method] read
+        Get the route written for an agent, the arrays are copied out of the shared buffers
+
+        Parameter:
+            - graph         : [RoadGraph] the graph the route belongs to
+            - agentId       : [int] id of the agent
+            - totalDistance : [float] distance reported for the route, the last cumulative distance if None
+
+        Return: [Route] the route, None if the agent got no new route
+        """
+        start = int(self.offset[agentId])
+        if start < 0:
+            return None
+        end = start + int(self.length[agentId])
+        return Route(graph, self.indices[start:end], self.cumulative[start:end], totalDistance)
+
+    def close(self):
+        """
+        [Method] close
+        Release the shared block, the StepThreads must be stopped first
+        """
+        self.offset = None
+        self.length = None
+        self.indices = None
+        self.cumulative = None
+        self.memory.close()
+        self.memory.unlink()
+
+    def nbytes(self):
+        """
+        [Method] nbytes
+        Return: [int] size of the shared block in bytes
+        """
+        return self.memory.size
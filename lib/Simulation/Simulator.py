@@ -1,6 +1,7 @@
 import csv
 import random
 import multiprocessing
+import numpy as np
 #from atpbar import flush
 from .JobClass import JobClass
 from .Agent import Agent, getAgentKeys
@@ -8,13 +9,16 @@ from .Home import Home
 from .Infection import Infection
 from .BasicInfectionModel import BasicInfectionModel
 from .StepThread import StepThread
+from .Population import Population, INFECTION_STATUSES
+from .RouteBuffer import RouteBuffer
+from .Movement import Movement
 import os
 from os.path import join
-from lib.Map.MovementSequence import reconstruct
+from lib.Map.Route import restore
+from lib.Map.RouteCursor import RouteCursor
 import datetime
 import csv
 from pathlib import Path
-import time
 
 summaryFieldnames = [
     'Day',
@@ -81,12 +85,17 @@ class Simulator:
         - reportInterval = [int] how many step do we want to wait before we extract the data
         - reportCooldown = [int] the current value of report interval
         - infectionModel = [InfectionModel] the infection model
+        - population = [Population] shared memory arrays holding the fields of the agents and homes, read and written in place by the StepThreads
+        - movement = [Movement] batch movement kernel moving the travelling agents along their routes
+        - routeCacheStats = [Dictionary] counters of the map's route cache, whose routes are sent to every StepThread: the hits, misses, cached failures and rejected unreachable requests and the pathfinding time in seconds summed over the requests of all the StepThreads (and the route store hits and misses when the map has a route store), and the evictions of the map's cache
         
     Don't Access Properties:
-        - returnDict = [array] (DO NOT USE) array of dictionary that was returned by the thread 
-        - activitiesDict = [array] (DO NOT USE) array of dictionary that was returned by the thread 
-        - queue = [array] (DO NOT USE) array of queues that was returned by the thread 
-        - threads = [array] (DO NOT USE) array of StepThreads that was returned by the thread 
+        - threads = [array] (DO NOT USE) array of the long-lived StepThreads, started on the first step 
+        - results = [multiprocessing.Queue] (DO NOT USE) queue the StepThreads put their results in 
+        - barrier = [multiprocessing.Barrier] (DO NOT USE) barrier the StepThreads and the simulator wait on every hour 
+        - routeBuffer = [RouteBuffer] (DO NOT USE) shared memory buffers the StepThreads write the new routes in 
+        - newRoutes = [array] (DO NOT USE) for every StepThread, the new routes of the other threads sent with its next work item 
+        - newFailures = [array] (DO NOT USE) for every StepThread, the new failures of the other threads sent with its next work item 
         
     """
     def __init__(self, osmMap, jobCSVPath, agentNum = 1000, threadNumber = 4, infectedAgent = 5, vaccinationPercentage = 0.0, reportPath="report", reportInterval=10, infectionModel = None):
@@ -134,18 +143,29 @@ class Simulator:
         self.history ["Recovered"] = []
         self.timeStamp = []
         self.threadNumber = threadNumber
-        self.returnDict = None
-        self.activitiesDict = None
         self.lastHour = -1
         self.vaccinationPercentage = vaccinationPercentage
-        self.generateAgents(agentNum, infectedAgent)
+        self.population = None
+        self.movement = None
+        try:
+            self.generateAgents(agentNum, infectedAgent)
+        except BaseException:
+            # the shared memory of the population is not released by the garbage collector
+            if self.population is not None:
+                self.population.close()
+            raise
         self.splitAgentsForThreading()
         self.infectionHistory = []
-        self.queue = []
         self.threads = []
+        self.results = None
+        self.barrier = None
+        self.routeBuffer = None
+        self.newRoutes = []
+        self.newFailures = []
         self.reportPath = self.createReportDir(reportPath)
         self.reportInterval = reportInterval
         self.reportCooldown = reportInterval
+        self.routeCacheStats = {"hits": 0, "misses": 0, "evictions": 0, "failures": 0, "rejected": 0, "time": 0.0}
         if infectionModel is None:
             self.infectionModel = BasicInfectionModel(self,self.osmMap)
         else:
@@ -183,6 +203,9 @@ class Simulator:
         houses.extend(self.osmMap.buildingsDict['apartments'])
         #last line of defense, if somehow the building doesn't have node, remove it
         agentId = 0
+        # allocated before the StepThreads are forked so they share it
+        self.population = Population(count, shared = True)
+        self.movement = Movement(self.population, self.osmMap.graph)
         for x in houses:
             if x.node is None:
                 houses.remove(x)
@@ -193,7 +216,7 @@ class Simulator:
             temp = int(x.populationProportion*count/float(total))
             ageRange = x.maxAge - x.minAge
             for i in range(0,temp):             
-                agent = Agent(agentId, self.osmMap,x.minAge+random.randint(0,ageRange),x)
+                agent = Agent(agentId, self.osmMap,x.minAge+random.randint(0,ageRange),x,population = self.population)
                 agentId +=1         
                 self.agents.append(agent)
                 self.unshuffledAgents.append(agent)
@@ -201,7 +224,7 @@ class Simulator:
             x = self.jobClasses[0]
             temp = int(x.populationProportion*count/float(total))
             ageRange = x.maxAge - x.minAge
-            agent = Agent(agentId, self.osmMap,x.minAge+random.randint(0,ageRange),x)
+            agent = Agent(agentId, self.osmMap,x.minAge+random.randint(0,ageRange),x,population = self.population)
             agentId +=1         
             self.agents.append(agent)
             self.unshuffledAgents.append(agent)
@@ -225,7 +248,7 @@ class Simulator:
                 building = random.choice(houses)
                 if (building.type == "house"):
                     houses.remove(building)
-                home = Home(building,houseId)
+                home = Home(building,houseId,self.population)
                 houseId += 1
                 if "home" not in building.content.keys():                 
                     building.content["home"] = []   
@@ -277,52 +300,53 @@ class Simulator:
         print("Week = {} Day = {} Current Time = {:02d}:{:02d}".format(week,day,hour,minutes))
         if (self.lastHour != hour):
             self.lastHour = hour
-            ###############################################################################################
-            # Generate Threads
-            # Do not refactor into other function
-            # ref : https://stackoverflow.com/questions/49391569/python3-process-object-never-joins
-            ###############################################################################################
-            threads = []
-            i = 1
-            manager = multiprocessing.Manager()
-            returnDicts = [] #if not working, probably this must be allocated locally
-            activitiesDicts = [] #if not working, probably this must be allocated locally
-            for chunkOfAgent in self.agentChunks:
-                returnDict = manager.dict()
-                activitiesDict = manager.dict()
-                returnDicts.append(returnDict)
-                activitiesDicts.append(activitiesDict)
-                thread = StepThread(f"Thread {i}",chunkOfAgent,self.stepCount,returnDict,activitiesDict)
-                threads.append(thread)
-                i += 1  
-            ###############################################################################################
-            # Generate Threads end
-            ###############################################################################################
-
-            
-            for thread in threads:
-                thread.daemon = True
-                thread.setStateToStep(stepSize)
-                thread.start()
-            time.sleep(30) # sleep for 20 second to help the threads starts their work
-            # wait for all thread to finish running
-            for i in range(0,len(threads)):
-                threads[i].join()
-                    
-            for returnDict in returnDicts:
+            if len(self.threads) == 0:
+                self.startStepThreads()
+            # only the agents that are not travelling plan a new activity, the workers read and write their fields in place
+            for agent in self.agents:
+                self.population.travelling[agent.row] = agent.isTravelling()
+            for i, thread in enumerate(self.threads):
+                thread.tasks.put((self.stepCount, stepSize, self.newRoutes[i], self.newFailures[i]))
+                self.newRoutes[i] = []
+                self.newFailures[i] = []
+            # wait for every thread to queue its results
+            self.barrier.wait()
+            segments = {thread.name: i for i, thread in enumerate(self.threads)}
+            returnDicts = {}
+            statsDicts = []
+            evictions = self.osmMap.routeCache.evictions
+            for thread in self.threads:
+                name, returnDict, failures, statsDict = self.results.get()
+                returnDicts[segments[name]] = returnDict
+                statsDicts.append(statsDict)
+                for origin, destination in failures:
+                    if self.osmMap.shareFailure(origin, destination):
+                        self.broadcast(segments[name], [], [(origin, destination)])
+            for segment, chunkOfAgent in enumerate(self.agentChunks):
+                for agent in chunkOfAgent:
+                    if not self.population.travelling[agent.row]:
+                        route = self.routeBuffer.read(self.osmMap.graph, agent.agentId, agent.distanceToDestination)
+                        if route is not None:
+                            self.attachRoute(segment, agent, route)
+            # the routes that did not fit in the route buffer
+            for segment, returnDict in returnDicts.items():
                 for key in returnDict.keys():
-                    self.unshuffledAgents[int(key)].activeSequence = reconstruct(self.osmMap.roadNodesDict, returnDict[key][0], returnDict[key][1])
-            for activitiesDict in activitiesDicts:
-                for key in activitiesDict.keys():
-                    self.unshuffledAgents[int(key)].activities = activitiesDict[key]
+                    self.attachRoute(segment, self.unshuffledAgents[key], restore(self.osmMap.graph, returnDict[key]))
+            for statsDict in statsDicts:
+                for key in statsDict.keys():
+                    # the caches of the threads are copies of the map's cache, only the evictions of the map's cache are counted
+                    if key != "evictions":
+                        self.routeCacheStats[key] = self.routeCacheStats.get(key, 0) + statsDict[key]
+            self.routeCacheStats["evictions"] += self.osmMap.routeCache.evictions - evictions
+            self.osmMap.flushRouteStore()
+            self.printRouteCacheStats()
             #flush()
             self.lastHour = hour
-            
-            self.threads = []
                 
         #print("Finished checking activity, proceeding to move agents")
         for x in self.agents:
-            x.step(day,hour,stepSize)
+            x.step(day,hour,stepSize,move = False)
+        self.moveAgents(stepSize)
         #print("Finished moving agents, proceeding to check for infection")
         for agent in self.agents:
             self.infectionModel.infect(agent,stepSize,self.stepCount)
@@ -341,6 +365,57 @@ class Simulator:
             self.reportCooldown = self.reportInterval
         self.reportCooldown -= 1
         
+    def attachRoute(self, segment, agent, route):
+        """
+        [Method] attachRoute
+        method to give an agent the route found by a StepThread. The route is kept in the map's cache (and route store) so the
+        agents taking it share one object, a route that was not cached yet is sent to the other threads with their next work item.
+        
+        Parameter:
+            - segment = [int] position of the thread that found the route
+            - agent = [Agent] the agent
+            - route = [Route] the route
+        """
+        shared = self.osmMap.shareRoute(route)
+        if shared is route:
+            self.broadcast(segment, [(route.indices, route.cumulative, route.totalDistance)], [])
+        agent.setPath(shared.totalDistance, RouteCursor(shared))
+        self.movement.attach(agent.row, shared)
+    
+    def broadcast(self, segment, routes, failures):
+        """
+        [Method] broadcast
+        method to queue new routes and failures for every StepThread except the one that found them
+        
+        Parameter:
+            - segment = [int] position of the thread that found them
+            - routes = [array] routes in the form of Route.extract
+            - failures = [array] (origin, destination) graph indices of the pairs without a route
+        """
+        for i in range(len(self.threads)):
+            if i != segment:
+                self.newRoutes[i].extend(routes)
+                self.newFailures[i].extend(failures)
+    
+    def moveAgents(self, stepSize):
+        """
+        [Method] moveAgents
+        method to move all the travelling agents at once with the movement kernel and apply its events: the agents that
+        reached another node change node, the cursors of the agents with an event are brought up to date
+        
+        Parameter: 
+            - stepSize = step length in seconds
+        """
+        changed, previous, current, arrived = self.movement.step(stepSize)
+        graph = self.osmMap.graph
+        for row, left, reached in zip(changed.tolist(), previous.tolist(), current.tolist()):
+            agent = self.unshuffledAgents[row]
+            graph.node(left).removeAgent(agent)
+            graph.node(reached).addAgent(agent)
+        for row in np.union1d(changed, arrived).tolist():
+            self.unshuffledAgents[row].activeSequence.setProgress(float(self.movement.traveled[row]), int(self.movement.position[row]),
+                                                                  bool(self.movement.finished[row]))
+        
     def currentHour(self):
         """
         [Method] currentHour
@@ -356,6 +431,21 @@ class Simulator:
         minutes = int(self.stepCount/60)%60
         return day,hour, minutes
     
+    def printRouteCacheStats(self):
+        """
+        [Method] printRouteCacheStats
+        method to print the route cache counters and the time spent in pathfinding to command line
+        """
+        stats = self.routeCacheStats
+        requests = stats["hits"] + stats["misses"]
+        hitRate = 100.0 * stats["hits"] / requests if requests > 0 else 0.0
+        print(f"Route cache: {len(self.osmMap.routeCache)} routes, {self.osmMap.routeCache.bytes} bytes, "
+              f"hits = {stats['hits']} ({hitRate:.1f}%), misses = {stats['misses']}, evictions = {stats['evictions']}, "
+              f"cached failures = {stats['failures']}, rejected unreachable = {stats['rejected']}, "
+              f"pathfinding time = {stats['time']:.2f} s")
+        if self.osmMap.routeStore is not None:
+            print(f"Route store: hits = {stats.get('storeHits', 0)}, misses = {stats.get('storeMisses', 0)}, writes = {self.osmMap.routeStore.writes}")
+    
     def printInfectionLocation(self):
         """
         [Method] printInfectionLocation
@@ -386,12 +476,7 @@ class Simulator:
         result["Day"] = day
         result["Hour"] = hour
         result["Minutes"] = minutes
-        result["Susceptible"] = 0
-        result["Infectious"] = 0
-        result["Exposed"] = 0
-        result["Recovered"] = 0
-        for x in self.agents:
-            result[x.infectionStatus] += 1
+        result.update(self.population.count("infectionStatus", INFECTION_STATUSES))
         for x in result.keys():
             if x in self.history.keys():
                 self.history[x].append(result[x])
@@ -400,6 +485,37 @@ class Simulator:
         
         return result
     
+    def startStepThreads(self):
+        """
+        [Method] startStepThreads
+        method to start the long-lived StepThreads, one per chunk of agents. They are forked once with the map and the agents
+        in memory and then receive one work item per simulated hour. The route buffer is allocated first so they inherit it.
+        """
+        if self.routeBuffer is None:
+            self.routeBuffer = RouteBuffer(len(self.unshuffledAgents), len(self.agentChunks))
+        self.results = multiprocessing.Queue()
+        self.barrier = multiprocessing.Barrier(len(self.agentChunks) + 1)
+        self.threads = []
+        self.newRoutes = [[] for chunkOfAgent in self.agentChunks]
+        self.newFailures = [[] for chunkOfAgent in self.agentChunks]
+        for i, chunkOfAgent in enumerate(self.agentChunks):
+            thread = StepThread(f"Thread {i + 1}",chunkOfAgent,multiprocessing.Queue(),self.results,self.barrier,self.population,self.routeBuffer,i,self.osmMap)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+    
+    def stopStepThreads(self):
+        """
+        [Method] stopStepThreads
+        method to ask the StepThreads to stop, wait for them and release the route buffer
+        """
+        for thread in self.threads:
+            thread.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self.releaseRouteBuffer()
+    
     def killStepThreads(self):
         """
         [Method] killStepThreads
@@ -407,6 +523,25 @@ class Simulator:
         """
         for thread in self.threads:
             thread.terminate()
+        self.threads = []
+        self.releaseRouteBuffer()
+    
+    def releaseRouteBuffer(self):
+        """
+        [Method] releaseRouteBuffer
+        method to release the shared memory of the route buffer once the StepThreads are gone
+        """
+        if self.routeBuffer is not None:
+            self.routeBuffer.close()
+            self.routeBuffer = None
+    
+    def close(self):
+        """
+        [Method] close
+        method to stop the StepThreads and release the shared memory of the population, the agents cannot be used anymore
+        """
+        self.stopStepThreads()
+        self.population.close()
             
     def extract(self):
         """
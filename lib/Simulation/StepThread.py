@@ -1,134 +1,166 @@
 #import threading
-import multiprocessing 
+import multiprocessing
+import time
+from lib.Map.Route import restore
 
 #class StepThread(threading.Thread):
 class StepThread(multiprocessing.Process):
     """
     [Class] StepThread
-    Class for doing pathfinding in multithreading like process.
-    
+    Long-lived worker process doing the pathfinding of one chunk of agents. The process is started once, after the map and the
+    agents are loaded, so it is forked with the map and the shared Population already in memory. Every simulated hour it
+    receives a work item, plans the activities of the agents of its chunk that are not travelling (their fields are read and
+    written in place in the population), writes the new routes in its segment of the shared RouteBuffer and waits on the
+    barrier shared with the Simulator. The work item carries the routes and failures the other threads found during the
+    previous hour, they are added to the route cache of the map first so every thread sees the routes of the whole pool.
+
     Properties:
         - name = [string] name of this thread
         - agents = [array] array of agents
-        - stepCount = [int] current step count which represent how many simulated seconds from the beggining of the simulation
-        - stepValue = [int] how many step forward do we want to 
-        - timeStamp = [array]  the timestamp of the history proporties
-        - threadNumber = [int] how many thread this simulator allowed to create when doing pathfinding
-        - activitiesDict = [dict] dictionary to store the activity type of the agent during this hour. key = agent's id
-        - returnDict = [dict] dictionary to store the extracted movement sequence of the agent. key = agent's id
-        
+        - tasks = [multiprocessing.Queue] work items of this thread: (stepCount, stepValue, routes, failures), None to stop
+            | routes = routes found by the other threads during the previous hour: (indices, cumulative, totalDistance) like Route.extract
+            | failures = (origin, destination) graph indices of the pairs without a route found by the other threads
+        - results = [multiprocessing.Queue] queue shared by the threads for the results: (name, returnDict, failures, statsDict)
+            | returnDict = dictionary of the extracted routes that did not fit in the RouteBuffer (see Route.extract). key = agent's id
+            | failures = list of the (origin, destination) graph indices of the requests without a route, the Simulator saves them (see Map.shareFailure)
+            | statsDict = route cache counters of this hour and the pathfinding time in seconds
+        - barrier = [multiprocessing.Barrier] barrier shared by the threads and the Simulator, waited on once the results are queued
+        - population = [Population] shared population the agents are views of
+        - routeBuffer = [RouteBuffer] shared buffers the new routes are written in
+        - segment = [int] position of this thread, the segment of routeBuffer it writes in
+        - osmMap = [Map] the map used to resolve the routing requests in bulk and whose route cache is reported in statsDict (None to let every agent find its own path)
+        - stepCount = [int] step count of the current work item
+        - stepValue = [int] how many step forward do we want to
+
     Deprecated Properties:
         - state = [string] current state (Deprecated, will be removed soon)
-        - finished = [boolean] flag if the process is finished or not 
-        
-    TO DO: remove unused pipeline
+        - finished = [boolean] flag if the process is finished or not
     """
-    def __init__(self, name, agents,stepCount,returnDict,activitiesDict):
+    def __init__(self, name, agents, tasks, results, barrier, population, routeBuffer, segment, osmMap = None):
         """
-        [Constructor] 
+        [Constructor]
         Constructor for StepThread class
 
         Parameters:
             - name = [string] name of this thread
             - agents = [array] array of agents
-            - stepCount = [int] current step count
-            - returnDict = [dict] dictionary to store the extracted movement sequence of the agent. key = agent's id
-            - activitiesDict = [dict] dictionary to store the activity type of the agent during this hour. key = agent's id
+            - tasks = [multiprocessing.Queue] work items of this thread
+            - results = [multiprocessing.Queue] queue shared by the threads for the results
+            - barrier = [multiprocessing.Barrier] barrier shared by the threads and the Simulator
+            - population = [Population] shared population the agents are views of
+            - routeBuffer = [RouteBuffer] shared buffers the new routes are written in
+            - segment = [int] position of this thread, the segment of routeBuffer it writes in
+            - osmMap = [Map] the map used to resolve the routing requests in bulk and whose route cache is reported in statsDict (None to let every agent find its own path)
         """
         #threading.Thread.__init__(self)
         multiprocessing.Process.__init__(self)
         self.name = name
         self.agents = agents
+        self.tasks = tasks
+        self.results = results
+        self.barrier = barrier
+        self.population = population
+        self.routeBuffer = routeBuffer
+        self.segment = segment
+        self.osmMap = osmMap
         self.state = "step"
-        self.stepCount = stepCount
-        self.stepValue = 24*3600
-        self.activitiesDict = activitiesDict
-        self.returnDict = returnDict
+        self.stepCount = 0
+        self.stepValue = 3600
         self.finished = False
-        
-    def setStateToStep(self,stepValue):
-        """
-        [Method] setStateToStep 
-        mark that the stepthread is going to do pathfinding 
 
-        Parameters:
-            - stepValue : [int] How many seconds we want to step forward
-        """
-        self.state = "step"
-        self.stepValue = stepValue
-        
-    def setStateToInfect(self,stepValue):
-        """
-        [Method] setStateToInfect 
-        DEPRECATED
-        """
-        self.state = "infect"
-        self.stepValue = stepValue
-        
-    def setStateToFinalize(self,stepValue):
-        """
-        [Method] setStateToFinalize 
-        DEPRECATED
-        """
-        self.state = "finalize"
-        self.stepValue = stepValue
-        
     def run(self):
         """
-        [Method] run 
-        main function that the MultiProcess class will run
-        
-        TO DO: remove unused pipeline
-        """
-        #voodoo line, do not remove, this helps to trigger the progress bar correctly
-        print(' ', end='', flush=True)
-        if self.state == "step":
-            self.step()
-        elif self.state == "infect":
-            self.infect()
-        else:
-            self.finalize()
-        #self.confirmationQueue.task_done()
+        [Method] run
+        main function that the MultiProcess class will run: process the work items until None is received
+        """
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            self.stepCount, self.stepValue, routes, failures = task
+            try:
+                self.importRoutes(routes, failures)
+                returnDict, failures, statsDict = self.step()
+                self.results.put((self.name, returnDict, failures, statsDict))
+            except BaseException:
+                # release the Simulator waiting on the barrier
+                self.barrier.abort()
+                raise
+            self.barrier.wait()
         self.finished = True
-        print(f'{self.name} finished')
 
     def step(self):
         """
-        [Method] step 
-        pathfind function
-        
-        TO DO: merge with run
+        [Method] step
+        pathfind function, the planned activities and distances are written in the shared population and the new routes in the
+        route buffer
+
+        return:
+            - returnDict = [dict] extracted routes of the agents whose new route did not fit in the route buffer. key = agent's id
+            - failures = [array] (origin, destination) graph indices of the requests cached as having no route
+            - statsDict = [dict] route cache counters of this work item and the pathfinding time in seconds
         """
         day, hour = self.currentHour()
-        for i in range(0,len(self.agents)):
-            result = self.agents[i].checkSchedule(day,hour,self.stepValue)
-            self.activitiesDict[f"{self.agents[i].agentId}"] = self.agents[i].activities
-            if result is not None:
-                self.returnDict[f"{self.agents[i].agentId}"] = result
-        
-           
-    def infect(self):
-        """
-        [Method] infect 
-        DEPRECATED
-        """
-        for i in atpbar(range(len(self.agents)), name= f"{self.name} Infect Function"):
-            self.agents[i].checkInfection(self.stepValue)
+        startTime = time.perf_counter()
+        if self.osmMap is not None:
+            startStats = self.osmMap.routeStats()
+        returnDict = {}
+        failures = set()
+        planned = []
+        # with the map the routing requests of the hour are collected first and resolved in bulk by Map.findPaths
+        requests = [] if self.osmMap is not None else None
+        for agent in self.agents:
+            if self.population.travelling[agent.row]:
+                continue
+            # the route of the copy held by this process is outdated, the Simulator keeps the agent's cursor
+            agent.activeSequence = None
+            agent.checkSchedule(day,hour,self.stepValue,requests)
+            planned.append(agent)
+        if requests:
+            paths = self.osmMap.findPaths([(agent.currentNode, building) for agent, building in requests])
+            for (agent, building), (distance, sequence) in zip(requests, paths):
+                agent.setPath(distance, sequence)
+                if sequence is None and agent.currentNode is not None and building is not None and building.node is not None:
+                    # the route store is only written by the Simulator, the failures are returned like the routes
+                    key = (agent.currentNode.graphIndex, building.node.graphIndex)
+                    if self.osmMap.routeCache.isFailure(key[0], key[1]):
+                        failures.add(key)
+        self.routeBuffer.rewind()
+        for agent in planned:
+            if agent.activeSequence is None:
+                self.routeBuffer.clear(agent.agentId)
+            elif not self.routeBuffer.write(self.segment, agent.agentId, agent.activeSequence.route):
+                returnDict[agent.agentId] = agent.activeSequence.extract()
+        statsDict = {}
+        if self.osmMap is not None:
+            stats = self.osmMap.routeStats()
+            for key in stats.keys():
+                statsDict[key] = stats[key] - startStats[key]
+        statsDict["time"] = time.perf_counter() - startTime
+        return returnDict, list(failures), statsDict
 
-    def finalize(self):
-        """
-        [Method] finalize 
-        DEPRECATED
+    def importRoutes(self, routes, failures):
         """
-        for i in atpbar(range(len(self.agents)), name= f"{self.name} Finalize Function"):
-            self.agents[i].finalize(self.stepValue)
-                     
+        [Method] importRoutes
+        Add the routes and failures found by the other threads to the route cache of the map, the hit and miss counters are not changed
+
+        Parameters:
+            - routes = [array] routes in the form of Route.extract
+            - failures = [array] (origin, destination) graph indices of the pairs without a route
+        """
+        if self.osmMap is None:
+            return
+        for extracted in routes:
+            self.osmMap.routeCache.share(restore(self.osmMap.graph, extracted))
+        for origin, destination in failures:
+            self.osmMap.routeCache.putFailure(origin, destination)
+
     def currentHour(self):
         """
         [Method] currentHour
         method to return the current tiem
-        
-        return: 
+
+        return:
             - day = [int] current simulated day (0-6) 0 = Monday, 6 = Sunday
             - hour = [int] current simulated hour
         """
@@ -48,7 +48,13 @@ def main():
     
     # Load the data
     gridSize = (c["gridHeight"], c["gridWidth"])
-    osmMap = mmap.readFile(c["OSMfile"], c["buildConnFile"], gridSize, c["buildingConfigPath"])
+    osmMap = mmap.readFile(c["OSMfile"], c["buildConnFile"], gridSize, c["buildingConfigPath"], c.get("snapshotFile"), c.get("distancePrecision", "projected"),
+                           bbox=c.get("clipBoundingBox"), polygon=c.get("clipPolygon"), layers=c.get("layers"), contractionFile=c.get("contractionFile"), landmarkFile=c.get("landmarkFile"))
+    osmMap.setSearchEngine(c.get("searchEngine", "tree"))
+    osmMap.setRouteTreeMemory(c.get("routeTreeMemoryMB", 256) * 1024 * 1024)
+    osmMap.setRouteCacheMemory(c.get("routeCacheMemoryMB", 64) * 1024 * 1024)
+    if c.get("routeStoreFile"):
+        osmMap.openRouteStore(c["routeStoreFile"])
     # Start Simulator
     sim = Simulator(
         osmMap, 
@@ -66,6 +72,8 @@ def main():
     app = Controller(model=sim, view=view)
     app.main_loop()
     sim.extract()
+    sim.close()
+    osmMap.closeRouteStore()
 
 if __name__ == "__main__":
     main()